@@ -1,14 +1,45 @@
 """
 YOLO屏幕监控应用 - 主入口
 使用YOLO模型实时监控和识别电脑屏幕内容
+
+用法:
+    python main.py                 启动实时覆盖层监控（--config 配置文件，修改后自动热更新）
+    python main.py headless ...    无界面运行，检测结果写入文件/套接字（不加载PyQt5）
+    python main.py benchmark ...   运行基准测试（python main.py benchmark -h 查看参数）
+    python main.py batch ...       离线批量分析屏幕录像
+    python main.py serve ...       启动本地推理服务（多个监控共用一份模型）
+    python main.py tune ...        在本机上自动调优，生成性能档案（--profile 名称 启动时加载）
+    python main.py annotate ...    检测录像并导出标注视频（--benchmark 测标注绘制帧率）
+    python main.py postprocess ... 对比NumPy后处理和ultralytics后处理的结果与耗时
+    python main.py regress ...     和黄金输出比较精度、和基线比较速度（--update 录制）
+    python main.py capture-probe   探测各个捕获后端的帧龄和开销
 """
+import argparse
+import importlib
 import sys
-from src.screen_monitor_app import ScreenMonitorApp
-from src.yolo_detector import YOLODetector
+from src.screen_monitor_app import ScreenMonitorApp, create_detector
 from src.screen_capture import ScreenCapture
+from src.capture_recorder import CaptureRecorder, CaptureReplayer
+from src.frame_bus import FrameBus
+from src.detection_sinks import create_sink
+from src.annotation import AnnotatedVideoWriter, AnnotationRenderer
 from src.config import AppConfig, default_config
+from src.thread_layout import apply_thread_layout
+from src.buffer_pool import default_buffer_pool
 from src.logger import default_logger, setup_logger
 
+# 子命令 -> 模块（模块需要提供 main(argv) -> int）
+COMMANDS = {
+    "benchmark": "src.benchmark",
+    "batch": "src.batch_analysis",
+    "serve": "src.inference_server",
+    "tune": "src.auto_tuner",
+    "annotate": "src.annotation",
+    "postprocess": "src.postprocess",
+    "regress": "src.regression",
+    "capture-probe": "src.capture_backends",
+}
+
 
 def create_app_from_config(config: AppConfig = default_config) -> ScreenMonitorApp:
     """
@@ -22,32 +53,181 @@ def create_app_from_config(config: AppConfig = default_config) -> ScreenMonitorA
     """
     default_logger.info("开始创建应用实例...")
 
-    # 创建检测器
-    detector = YOLODetector(
-        model_path=config.detector.model_path,
-        confidence_threshold=config.detector.confidence_threshold,
-        iou_threshold=config.detector.iou_threshold,
-        classes=config.detector.classes
-    )
+    # 叠加 python main.py tune 生成的性能档案
+    if config.profile:
+        config = config.with_profile(config.profile)
+        default_logger.info(
+            f"已加载性能档案 {config.profile}: {config.detector.model_path} @ {config.detector.imgsz}, "
+            f"{config.screen.fps_limit} FPS, {config.threads.torch_threads or '默认'} 线程"
+        )
+
+    # 线程数和CPU绑定要在加载模型之前设置（torch的线程池在第一次推理时创建）
+    apply_thread_layout(config.threads)
+
+    # 创建检测器（配置了推理服务时用远程检测器，本进程不加载模型~）
+    detector = create_detector(config.detector)
 
-    # 创建屏幕捕获器
-    capture = ScreenCapture(monitor=config.screen.monitor_region)
+    # 帧缓冲池（捕获、录制、绘制共用）
+    default_buffer_pool.enabled = config.buffer_pool.enabled
+    default_buffer_pool.max_bytes = config.buffer_pool.max_mb * 1024 * 1024
+
+    # 创建屏幕捕获器（设置了回放目录时用录制的帧代替~）
+    record_config = config.capture_record
+    if record_config.replay_path:
+        capture = CaptureReplayer(
+            record_config.replay_path,
+            pacing=record_config.replay_pacing,
+            loop=record_config.replay_loop
+        )
+    else:
+        capture = ScreenCapture(
+            monitor=config.screen.monitor_region,
+            backend=config.screen.capture_backend,
+            framerate=config.screen.fps_limit
+        )
+        if config.frame_bus.enabled:
+            width, height = capture.get_monitor_size()
+            capture.frame_bus = FrameBus(
+                name=config.frame_bus.name,
+                max_frame_bytes=width * height * 3,
+                slots=config.frame_bus.slots,
+                max_consumers=config.frame_bus.max_consumers
+            )
+
+    if record_config.enabled:
+        capture = CaptureRecorder(
+            capture,
+            record_config.path,
+            fmt=record_config.format,
+            quality=record_config.quality,
+            max_buffer_mb=record_config.max_buffer_mb
+        )
+
+    # 标注视频导出（可选~）
+    video_writer = None
+    video_config = config.annotated_video
+    if video_config.enabled:
+        video_writer = AnnotatedVideoWriter(
+            video_config.path,
+            fps=video_config.fps or config.screen.fps_limit,
+            frame_size=capture.get_monitor_size(),
+            fourcc=video_config.fourcc,
+            renderer=AnnotationRenderer(
+                show_confidence=config.detector.show_confidence,
+                show_class_name=config.detector.show_class_name
+            ),
+            max_queue=video_config.max_queue
+        )
 
     # 创建应用（透明覆盖模式，直接在屏幕上绘制哦~）
     app = ScreenMonitorApp(
         detector=detector,
         capture=capture,
         fps_limit=config.screen.fps_limit,
+        frame_policy=config.screen.frame_policy,
+        smoother_config=config.smoother,
+        thread_config=config.threads,
+        video_writer=video_writer,
+        governor_config=config.governor,
+        metrics_config=config.metrics,
+        tracing_config=config.tracing,
+        detection_log_config=config.detection_log,
         enable_mouse_control=config.mouse.enabled,
-        mouse_target_percent=config.mouse.target_percent
+        mouse_target_percent=config.mouse.target_percent,
+        overlay_config=config.overlay,
+        sinks=[create_sink(spec) for spec in config.headless.sinks] if config.headless.enabled else None
     )
 
+    if isinstance(capture, CaptureRecorder):
+        app.register_queue("capture_recorder", capture.queue_depth)
+    app.config = config  # 热更新时和这份配置比较
+
     default_logger.info("应用实例创建完成")
     return app
 
 
+def run_command(command: str, argv: list) -> int:
+    """
+    运行子命令
+
+    Args:
+        command: 子命令名称
+        argv: 子命令参数
+
+    Returns:
+        进程退出码
+    """
+    module = importlib.import_module(COMMANDS[command])
+    return module.main(argv)
+
+
+def build_parser(headless: bool = False) -> argparse.ArgumentParser:
+    """
+    命令行参数
+
+    Args:
+        headless: 是否为 headless 子命令
+
+    Returns:
+        参数解析器
+    """
+    if headless:
+        parser = argparse.ArgumentParser(prog="main.py headless", description="无界面运行屏幕监控 喵~")
+        parser.add_argument("--sink", action="append", dest="sinks",
+                            help="检测输出，可重复: jsonl:<path>（jsonl:- 为标准输出）或 unix:<socket path>")
+        parser.add_argument("--max-frames", type=int, default=None, help="处理这么多帧后退出")
+        parser.add_argument("--replay", default=None, help="用捕获录制目录代替屏幕捕获")
+    else:
+        parser = argparse.ArgumentParser(prog="main.py", description="YOLO屏幕监控 喵~")
+    parser.add_argument("--config", default=None,
+                        help="配置文件（JSON，装了PyYAML也可以用YAML），运行中修改会自动热更新")
+    parser.add_argument("--profile", default=None, help="性能档案名（python main.py tune 生成）")
+    return parser
+
+
+def apply_headless_args(args: argparse.Namespace, config: AppConfig) -> AppConfig:
+    """
+    把 headless 子命令参数写入配置
+
+    Args:
+        args: build_parser(headless=True) 解析的参数
+        config: 要修改的配置
+
+    Returns:
+        修改后的配置
+    """
+    config.headless.enabled = True
+    if args.sinks:
+        config.headless.sinks = args.sinks
+    if args.max_frames is not None:
+        config.headless.max_frames = args.max_frames
+    if args.replay:
+        config.capture_record.replay_path = args.replay
+    return config
+
+
 def main():
     """主函数"""
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        sys.exit(run_command(sys.argv[1], sys.argv[2:]))
+
+    argv = sys.argv[1:]
+    headless = bool(argv) and argv[0] == "headless"
+    args = build_parser(headless).parse_args(argv[1:] if headless else argv)
+
+    def apply_args(loaded: AppConfig) -> AppConfig:
+        """命令行参数优先于配置文件"""
+        if args.profile:
+            loaded.profile = args.profile
+        return apply_headless_args(args, loaded) if headless else loaded
+
+    def adjust_reloaded(loaded: AppConfig) -> AppConfig:
+        """热更新读到的配置也要套用命令行参数和性能档案，才能和运行中的配置比较"""
+        loaded = apply_args(loaded)
+        return loaded.with_profile(loaded.profile) if loaded.profile else loaded
+
+    config = apply_args(AppConfig.load(args.config) if args.config else default_config)
+
     # 设置日志
     logger = setup_logger(
         name="YOLOMonitor",
@@ -61,8 +241,13 @@ def main():
 
     try:
         # 方式1: 使用默认配置
-        app = create_app_from_config()
-        app.run()
+        app = create_app_from_config(config)
+        if args.config:
+            app.watch_config(args.config, adjust=adjust_reloaded)
+        if config.headless.enabled:
+            app.run_headless(max_frames=config.headless.max_frames)
+        else:
+            app.run()
 
         # 方式2: 使用自定义配置
         # config = AppConfig()
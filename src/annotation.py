@@ -0,0 +1,541 @@
+"""
+标注导出模块 - 喵把检测框画进录像里，满帧率导出也不卡~ 🎀
+AnnotationRenderer 直接在帧上原地绘制：检测框用 cv2.rectangle，标签按 (类别, 置信度档位)
+预渲染成小图缓存起来，之后每次只是一次切片拷贝，不再每帧调用 getTextSize / putText；
+AnnotatedVideoWriter 把帧拷进缓冲池，在后台线程里绘制并交给 cv2.VideoWriter 编码，帧循环只付一次拷贝
+
+用法:
+    python main.py annotate recordings/capture --output annotated.mp4 --model yolo26n.pt
+    python main.py annotate --benchmark --sizes 1920x1080 3840x2160
+"""
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import cv2
+import numpy as np
+from .buffer_pool import default_buffer_pool
+from .yolo_detector import DetectionResult, YOLODetector
+from .logger import default_logger
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+
+class AnnotationRenderer:
+    """
+    标注绘制器 (｡♥‿♥｡)
+    画出来和 YOLODetector.draw_detections 一样（标签是纯色背景，缓存的小图直接贴上去就行~）
+    """
+
+    def __init__(
+        self,
+        show_confidence: bool = True,
+        show_class_name: bool = True,
+        confidence_step: float = 0.01,
+        cache_size: int = 512,
+        font_scale: float = 0.5,
+        box_thickness: int = 2,
+        colors: Optional[Sequence[Tuple[int, int, int]]] = None
+    ):
+        """
+        初始化绘制器
+
+        Args:
+            show_confidence: 是否显示置信度
+            show_class_name: 是否显示类别名称
+            confidence_step: 置信度档位（0.01 时和逐个绘制一样显示两位小数，调大可以提高缓存命中率）
+            cache_size: 标签小图缓存的最大数量
+            font_scale: 字体缩放
+            box_thickness: 检测框线宽
+            colors: 按类别ID循环使用的颜色，None则使用 YOLODetector.DEFAULT_COLORS
+        """
+        self.show_confidence = show_confidence
+        self.show_class_name = show_class_name
+        self.confidence_step = confidence_step
+        self.cache_size = cache_size
+        self.font_scale = font_scale
+        self.box_thickness = box_thickness
+        self.colors = list(colors or YOLODetector.DEFAULT_COLORS)
+        self._decimals = max(0, int(round(-np.log10(confidence_step))))
+        self._glyphs: "OrderedDict[Tuple, Tuple[np.ndarray, int]]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _label_text(self, detection: DetectionResult, show_confidence: bool, show_class_name: bool) -> Tuple:
+        """标签的缓存键和文字"""
+        bucket = round(detection.confidence / self.confidence_step) * self.confidence_step
+        parts = []
+        if show_class_name:
+            parts.append(detection.class_name)
+        if show_confidence:
+            parts.append(f"{bucket:.{self._decimals}f}")
+        key = (detection.class_id, detection.class_name, round(bucket, self._decimals),
+               show_confidence, show_class_name)
+        return key, " ".join(parts)
+
+    def _glyph(
+        self,
+        detection: DetectionResult,
+        show_confidence: bool,
+        show_class_name: bool
+    ) -> Optional[Tuple[np.ndarray, int]]:
+        """
+        取出（或渲染）标签小图
+
+        Returns:
+            (BGR小图（纯色背景+白字）, 文字高度)，没有文字时为None
+        """
+        key, label = self._label_text(detection, show_confidence, show_class_name)
+        if not label:
+            return None
+        cached = self._glyphs.get(key)
+        if cached is not None:
+            self._glyphs.move_to_end(key)
+            self.cache_hits += 1
+            return cached
+
+        self.cache_misses += 1
+        (width, height), baseline = cv2.getTextSize(label, FONT, self.font_scale, 1)
+        # 和 draw_detections 的两次绘制一样：矩形 (0, 0)-(width, height+baseline+5)，文字基线在 height+5
+        glyph = np.empty((height + baseline + 6, width + 1, 3), dtype=np.uint8)
+        glyph[:] = self.colors[detection.class_id % len(self.colors)]
+        cv2.putText(glyph, label, (0, height + 5), FONT, self.font_scale, (255, 255, 255), 1)
+        self._glyphs[key] = (glyph, height)
+        while len(self._glyphs) > self.cache_size:
+            self._glyphs.popitem(last=False)  # 淘汰最久没用的
+        return glyph, height
+
+    def draw(
+        self,
+        frame: np.ndarray,
+        detections: List[DetectionResult],
+        show_confidence: Optional[bool] = None,
+        show_class_name: Optional[bool] = None
+    ) -> np.ndarray:
+        """
+        在帧上原地绘制检测结果
+
+        Args:
+            frame: BGR帧（会被修改）
+            detections: 检测结果列表
+            show_confidence: 覆盖构造时的设置，None表示不覆盖
+            show_class_name: 覆盖构造时的设置，None表示不覆盖
+
+        Returns:
+            同一个 frame
+        """
+        show_confidence = self.show_confidence if show_confidence is None else show_confidence
+        show_class_name = self.show_class_name if show_class_name is None else show_class_name
+        frame_height, frame_width = frame.shape[:2]
+
+        for detection in detections:
+            x1, y1, x2, y2 = detection.box
+            color = self.colors[detection.class_id % len(self.colors)]
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, self.box_thickness)
+
+            cached = self._glyph(detection, show_confidence, show_class_name)
+            if cached is None:
+                continue
+            glyph, label_height = cached
+            glyph_height, glyph_width = glyph.shape[:2]
+            # 标签底边贴在框的上边，框太靠上时往下挪（和原来的逐个绘制一致）
+            top = max(y1, label_height + 10) - glyph_height + 1
+            # 裁掉超出画面的部分
+            src_x, src_y = max(0, -x1), max(0, -top)
+            dst_x1, dst_y1 = max(0, x1), max(0, top)
+            dst_x2 = min(frame_width, x1 + glyph_width)
+            dst_y2 = min(frame_height, top + glyph_height)
+            if dst_x2 <= dst_x1 or dst_y2 <= dst_y1:
+                continue
+            frame[dst_y1:dst_y2, dst_x1:dst_x2] = glyph[
+                src_y:src_y + dst_y2 - dst_y1, src_x:src_x + dst_x2 - dst_x1
+            ]
+        return frame
+
+    def get_stats(self) -> Dict[str, int]:
+        """标签缓存统计"""
+        return {"glyphs": len(self._glyphs), "hits": self.cache_hits, "misses": self.cache_misses}
+
+
+def draw_uncached(
+    frame: np.ndarray,
+    detections: List[DetectionResult],
+    colors: Sequence[Tuple[int, int, int]] = YOLODetector.DEFAULT_COLORS
+) -> np.ndarray:
+    """
+    逐个绘制（不用缓存，每个标签都 getTextSize + putText），基准测试的对照组
+
+    Args:
+        frame: BGR帧（不会被修改）
+        detections: 检测结果列表
+        colors: 按类别ID循环使用的颜色
+
+    Returns:
+        绘制后的新图像
+    """
+    frame = frame.copy()
+    for detection in detections:
+        x1, y1, x2, y2 = detection.box
+        color = colors[detection.class_id % len(colors)]
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+        label = f"{detection.class_name} {detection.confidence:.2f}"
+        (label_width, label_height), baseline = cv2.getTextSize(label, FONT, 0.5, 1)
+        y1_label = max(y1, label_height + 10)
+        cv2.rectangle(frame, (x1, y1_label - label_height - baseline - 5), (x1 + label_width, y1_label), color, -1)
+        cv2.putText(frame, label, (x1, y1_label - baseline), FONT, 0.5, (255, 255, 255), 1)
+    return frame
+
+
+class AnnotatedVideoWriter:
+    """
+    标注视频导出器 (｡♥‿♥｡)
+    write() 只把帧拷进缓冲池就返回，绘制和编码都在后台线程里做~
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fps: float,
+        frame_size: Tuple[int, int],
+        fourcc: str = "mp4v",
+        renderer: Optional[AnnotationRenderer] = None,
+        max_queue: int = 8,
+        block: bool = False
+    ):
+        """
+        初始化导出器
+
+        Args:
+            path: 输出视频路径
+            fps: 视频帧率
+            frame_size: (width, height)，尺寸不一致的帧会被丢弃并计数
+            fourcc: 编码器四字符码（"mp4v"、"avc1"、"MJPG" ...）
+            renderer: 标注绘制器，None则使用默认设置
+            max_queue: 等待编码的最大帧数
+            block: 队列满时是否等待（离线导出用True保证不丢帧，实时运行用False）
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.frame_size = tuple(frame_size)
+        self.renderer = renderer or AnnotationRenderer()
+        self.block = block
+        self._writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, self.frame_size)
+        if not self._writer.isOpened():
+            raise RuntimeError(f"无法创建视频文件: {path}（fourcc={fourcc}）")
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self.frames_written = 0
+        self.dropped_frames = 0
+        self.encode_seconds = 0.0
+
+        self._thread = threading.Thread(target=self._encode_loop, name="AnnotatedVideoWriter", daemon=True)
+        self._thread.start()
+        default_logger.info(f"标注视频导出: {path} ({frame_size[0]}x{frame_size[1]} @ {fps:.1f} FPS, {fourcc})")
+
+    def write(self, frame: np.ndarray, detections: List[DetectionResult]) -> bool:
+        """
+        排队一帧（帧会被拷贝，调用方之后可以随意复用它）
+
+        Args:
+            frame: BGR帧
+            detections: 这一帧的检测结果
+
+        Returns:
+            是否成功排队
+        """
+        if (frame.shape[1], frame.shape[0]) != self.frame_size:
+            self.dropped_frames += 1
+            return False
+        if not self.block and self._queue.full():
+            self.dropped_frames += 1
+            return False
+        buffer = default_buffer_pool.acquire(frame.shape, frame.dtype)
+        np.copyto(buffer, frame)
+        self._queue.put((buffer, list(detections)))
+        return True
+
+    def queue_depth(self) -> int:
+        """当前等待编码的帧数"""
+        return self._queue.qsize()
+
+    def _encode_loop(self):
+        """后台线程：原地绘制 -> 编码 -> 归还缓冲区"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            buffer, detections = item
+            start = time.perf_counter()
+            try:
+                self._writer.write(self.renderer.draw(buffer, detections))
+                self.frames_written += 1
+            except Exception as e:
+                # 不能让线程退出：写入方可能正阻塞在满队列上
+                self.dropped_frames += 1
+                default_logger.error(f"标注视频编码失败: {e}")
+            finally:
+                default_buffer_pool.release(buffer)
+            self.encode_seconds += time.perf_counter() - start
+
+    def close(self):
+        """写完剩下的帧并关闭视频文件"""
+        self._queue.put(None)
+        self._thread.join()
+        self._writer.release()
+        default_logger.info(
+            f"标注视频导出结束: {self.frames_written} 帧 | 丢弃 {self.dropped_frames} 帧 | {self.path}"
+        )
+
+
+def iter_source_frames(source: str) -> Tuple[Iterator[np.ndarray], float, Tuple[int, int]]:
+    """
+    逐帧读取捕获录制目录或视频文件（不会一次性读进内存）
+
+    Args:
+        source: 捕获录制目录或视频文件
+
+    Returns:
+        (帧迭代器, 帧率, (width, height))
+    """
+    path = Path(source)
+    if (path / "meta.json").exists():
+        from .capture_recorder import CaptureReplayer
+        replayer = CaptureReplayer(str(path), pacing="none")
+        fps = (len(replayer) - 1) / replayer.duration if replayer.duration > 0 else 30.0
+        first = replayer.decode(0)[1]
+
+        def frames():
+            for _, frame in replayer:
+                yield frame
+            replayer.close()
+        return frames(), fps, (first.shape[1], first.shape[0])
+
+    video = cv2.VideoCapture(str(path))
+    if not video.isOpened():
+        raise ValueError(f"无法打开视频: {source}")
+    fps = video.get(cv2.CAP_PROP_FPS) or 30.0
+    size = (int(video.get(cv2.CAP_PROP_FRAME_WIDTH)), int(video.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+
+    def frames():
+        while True:
+            ok, frame = video.read()
+            if not ok:
+                break
+            yield frame
+        video.release()
+    return frames(), fps, size
+
+
+def export_annotated(
+    source: str,
+    output: str,
+    detector_kwargs: Dict,
+    fourcc: str = "mp4v",
+    fps: Optional[float] = None,
+    max_frames: Optional[int] = None
+) -> Dict:
+    """
+    检测并导出标注视频
+
+    Args:
+        source: 捕获录制目录或视频文件
+        output: 输出视频路径
+        detector_kwargs: YOLODetector参数
+        fourcc: 编码器四字符码
+        fps: 输出帧率，None表示和输入一致
+        max_frames: 最多处理的帧数
+
+    Returns:
+        运行统计
+    """
+    frames, source_fps, size = iter_source_frames(source)
+    detector = YOLODetector(**detector_kwargs)
+    writer = AnnotatedVideoWriter(output, fps or source_fps, size, fourcc=fourcc, block=True)
+
+    start = time.perf_counter()
+    count = 0
+    for frame in frames:
+        writer.write(frame, detector.detect(frame))
+        count += 1
+        if max_frames is not None and count >= max_frames:
+            break
+    writer.close()
+    elapsed = time.perf_counter() - start
+    stats = {
+        "frames": count,
+        "elapsed_s": elapsed,
+        "throughput_fps": count / elapsed if elapsed > 0 else 0.0,
+        "renderer": writer.renderer.get_stats(),
+        "output": output,
+    }
+    default_logger.info(f"🎬 导出完成: {count} 帧, {stats['throughput_fps']:.1f} FPS -> {output}")
+    return stats
+
+
+def synthetic_detections(size: Tuple[int, int], count: int, seed: int = 0) -> List[List[DetectionResult]]:
+    """
+    生成一段缓慢移动的合成检测结果（基准测试用）
+
+    Args:
+        size: 画面尺寸 (width, height)
+        count: 每帧检测数量
+
+    Returns:
+        60帧的检测结果，第i帧用 sequence[i % 60]
+    """
+    rng = np.random.default_rng(seed)
+    width, height = size
+    base = rng.uniform([0, 0], [width * 0.8, height * 0.8], size=(count, 2))
+    box_size = rng.uniform(40, min(width, height) * 0.3, size=(count, 2))
+    confidences = rng.uniform(0.5, 0.99, size=count)
+    names = ["person", "car", "dog", "cat", "bicycle"]
+    sequence = []
+    for step in range(60):
+        offset = np.array([np.sin(step / 10), np.cos(step / 10)]) * 20
+        frame_detections = []
+        for i in range(count):
+            x1, y1 = (base[i] + offset).astype(int)
+            x2, y2 = (base[i] + offset + box_size[i]).astype(int)
+            confidence = float(np.clip(confidences[i] + rng.normal(0, 0.01), 0, 1))
+            frame_detections.append(DetectionResult(
+                box=(int(x1), int(y1), int(x2), int(y2)), confidence=confidence,
+                class_id=i % len(names), class_name=names[i % len(names)]
+            ))
+        sequence.append(frame_detections)
+    return sequence
+
+
+def benchmark_annotation(
+    sizes: List[Tuple[int, int]],
+    frames: int = 120,
+    detections_per_frame: int = 10,
+    fourcc: str = "mp4v",
+    output_dir: Optional[str] = None
+) -> List[Dict]:
+    """
+    比较逐个绘制（draw_uncached，改动前 draw_detections 的做法）和缓存绘制的帧率，以及带后台编码的导出帧率
+
+    Args:
+        sizes: 画面尺寸列表 [(width, height)]
+        frames: 每项测试的帧数
+        detections_per_frame: 每帧检测数量
+        fourcc: 导出测试的编码器
+        output_dir: 导出测试视频的目录，None表示不测导出
+
+    Returns:
+        每个尺寸一条结果（单位都是帧/秒）
+    """
+    from .benchmark import synthetic_frames
+
+    results = []
+    for width, height in sizes:
+        source = synthetic_frames(4, (width, height))
+        detections = synthetic_detections((width, height), detections_per_frame)
+        result = {"size": f"{width}x{height}", "detections_per_frame": detections_per_frame}
+
+        # 原来的做法：整帧拷贝 + 每个标签 getTextSize/putText
+        start = time.perf_counter()
+        for i in range(frames):
+            draw_uncached(source[i % len(source)], detections[i % len(detections)])
+        result["uncached_fps"] = frames / (time.perf_counter() - start)
+
+        # 缓存绘制：借缓冲区拷贝 + 原地绘制
+        renderer = AnnotationRenderer()
+        start = time.perf_counter()
+        for i in range(frames):
+            buffer = default_buffer_pool.acquire(source[0].shape, np.uint8)
+            np.copyto(buffer, source[i % len(source)])
+            renderer.draw(buffer, detections[i % len(detections)])
+            default_buffer_pool.release(buffer)
+        result["renderer_fps"] = frames / (time.perf_counter() - start)
+        result["speedup"] = result["renderer_fps"] / result["uncached_fps"]
+
+        # 只算绘制本身（帧已经在自己的缓冲区里，导出线程就是这样）
+        scratch = [frame.copy() for frame in source]
+        start = time.perf_counter()
+        for i in range(frames):
+            renderer.draw(scratch[i % len(scratch)], detections[i % len(detections)])
+        result["renderer_in_place_fps"] = frames / (time.perf_counter() - start)
+
+        # 导出：帧循环只付一次拷贝，绘制+编码在后台线程
+        if output_dir:
+            path = str(Path(output_dir) / f"annotation_{width}x{height}.mp4")
+            writer = AnnotatedVideoWriter(path, 30.0, (width, height), fourcc=fourcc, block=True)
+            start = time.perf_counter()
+            for i in range(frames):
+                writer.write(source[i % len(source)], detections[i % len(detections)])
+            submit_elapsed = time.perf_counter() - start
+            writer.close()
+            elapsed = time.perf_counter() - start
+            result["export_fps"] = frames / elapsed
+            result["export_submit_fps"] = frames / submit_elapsed
+
+        default_logger.info(
+            f"🖍️ {result['size']}: 逐个绘制 {result['uncached_fps']:.1f} FPS | "
+            f"renderer {result['renderer_fps']:.1f} FPS ({result['speedup']:.1f}x) | "
+            f"原地绘制 {result['renderer_in_place_fps']:.0f} FPS"
+            + (f" | 导出 {result['export_fps']:.1f} FPS" if "export_fps" in result else "")
+        )
+        results.append(result)
+    return results
+
+
+def _parse_size(text: str) -> Tuple[int, int]:
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """命令行参数"""
+    parser = argparse.ArgumentParser(prog="main.py annotate", description="导出标注视频 / 标注绘制基准测试 喵~")
+    parser.add_argument("source", nargs="?", help="捕获录制目录或视频文件")
+    parser.add_argument("--output", default="recordings/annotated.mp4", help="输出视频路径")
+    parser.add_argument("--model", default="yolo26n.pt", help="模型路径")
+    parser.add_argument("--imgsz", type=int, default=640, help="输入尺寸")
+    parser.add_argument("--conf", type=float, default=0.5, help="置信度阈值")
+    parser.add_argument("--classes", type=int, nargs="*", default=[0], help="检测类别（不填表示所有类别）")
+    parser.add_argument("--fourcc", default="mp4v", help="编码器四字符码")
+    parser.add_argument("--fps", type=float, default=None, help="输出帧率（默认和输入一致）")
+    parser.add_argument("--max-frames", type=int, default=None, help="最多处理的帧数")
+    parser.add_argument("--benchmark", action="store_true", help="只测标注绘制和导出的帧率（合成帧）")
+    parser.add_argument("--sizes", type=_parse_size, nargs="+", default=[(1920, 1080), (3840, 2160)],
+                        help="基准测试的画面尺寸，例如 1920x1080 3840x2160")
+    parser.add_argument("--frames", type=int, default=120, help="基准测试每项的帧数")
+    parser.add_argument("--detections", type=int, default=10, help="基准测试每帧的检测数量")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    标注导出命令入口
+
+    Returns:
+        进程退出码
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.benchmark:
+        output_dir = str(Path(args.output).parent)
+        results = benchmark_annotation(args.sizes, args.frames, args.detections, args.fourcc, output_dir)
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        return 0
+    if not args.source:
+        parser.error("需要 source（或者使用 --benchmark）")
+    export_annotated(
+        args.source,
+        args.output,
+        dict(model_path=args.model, confidence_threshold=args.conf,
+             classes=args.classes or None, imgsz=args.imgsz),
+        fourcc=args.fourcc,
+        fps=args.fps,
+        max_frames=args.max_frames
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
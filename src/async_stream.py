@@ -0,0 +1,219 @@
+"""
+异步订阅模块 - 喵把检测结果送进主人的asyncio服务里~ 🎀
+`async for batch in monitor.stream()` 就能拿到每帧的检测结果，不用跑Qt事件循环
+
+结构:
+    帧循环（捕获+推理+平滑）跑在一个执行器线程里，事件循环只负责分发，
+    DetectionStream 作为普通的检测输出挂在帧循环后面，每帧只推理一次，
+    然后把同一个 DetectionBatch 交给所有订阅者
+
+背压：每个订阅者只保留最近 max_pending 帧，消费太慢时丢掉最旧的（过期的帧没有意义），
+帧循环本身不会因为某个订阅者慢而停下来~
+没有订阅者时帧循环暂停，有人订阅时再继续
+"""
+import asyncio
+import weakref
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+from .detection_sinks import DetectionSink
+from .yolo_detector import DetectionResult
+from .logger import default_logger
+
+
+@dataclass
+class DetectionBatch:
+    """
+    一帧的检测结果 (｡♥‿♥｡)
+    所有订阅者拿到的是同一个对象，请不要修改它哦~
+    """
+    # 帧序号
+    frame: int
+    # 捕获时间（Unix秒）
+    timestamp: float
+    # 捕获到分发的延迟（秒）
+    latency: float
+    # 平滑后的检测结果
+    detections: List[DetectionResult]
+    # build_message() 生成的消息（可以直接JSON序列化）
+    message: Dict
+
+
+class DetectionSubscription:
+    """
+    一个订阅者 (｡♥‿♥｡)
+    用 async for 逐帧读取；break 之后没人引用它就会自动退订，也可以显式 aclose()
+    """
+
+    def __init__(self, stream: "DetectionStream", max_pending: int = 1):
+        """
+        Args:
+            stream: 所属的检测流
+            max_pending: 最多积压几帧，超出时丢掉最旧的
+        """
+        self._stream = stream
+        self.max_pending = max(1, max_pending)
+        self._pending: Deque[DetectionBatch] = deque()
+        self._wakeup = asyncio.Event()
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        self.received = 0
+        self.dropped = 0
+
+    def _push(self, batch: DetectionBatch):
+        """放入一帧（事件循环线程调用）"""
+        if self._closed:
+            return
+        if len(self._pending) >= self.max_pending:
+            self._pending.popleft()
+            self.dropped += 1
+            self._stream.dropped += 1
+        self._pending.append(batch)
+        self._wakeup.set()
+
+    def _finish(self, error: Optional[BaseException] = None):
+        """检测流结束了，读完积压的帧后停止迭代（有错误则抛出）"""
+        self._closed = True
+        self._error = error
+        self._wakeup.set()
+
+    def __aiter__(self) -> "DetectionSubscription":
+        return self
+
+    async def __anext__(self) -> DetectionBatch:
+        self._stream._ensure_running()
+        while not self._pending:
+            if self._closed:
+                if self._error is not None:
+                    raise self._error
+                raise StopAsyncIteration
+            self._wakeup.clear()
+            await self._wakeup.wait()
+        self.received += 1
+        return self._pending.popleft()
+
+    async def aclose(self):
+        """退订"""
+        self._stream._unsubscribe(self)
+        self._pending.clear()
+        self._finish()
+
+    async def __aenter__(self) -> "DetectionSubscription":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+
+class DetectionStream(DetectionSink):
+    """
+    检测流 (｡♥‿♥｡)
+    作为检测输出接收帧循环的结果，再分发给所有订阅者；
+    第一个订阅者开始读取时启动 producer（ScreenMonitorApp 的异步帧循环）~
+    """
+
+    name = "stream"
+
+    def __init__(self, producer: Callable[["DetectionStream"], Awaitable[None]]):
+        """
+        Args:
+            producer: 异步帧循环，只要 has_subscribers() 为真就一直处理帧，返回时表示暂停或结束
+        """
+        self._producer = producer
+        self._subscribers: "weakref.WeakSet[DetectionSubscription]" = weakref.WeakSet()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self.finished = False
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, max_pending: int = 1) -> DetectionSubscription:
+        """
+        新建一个订阅者
+
+        Args:
+            max_pending: 最多积压几帧
+
+        Returns:
+            DetectionSubscription
+        """
+        subscription = DetectionSubscription(self, max_pending)
+        if self.finished:
+            subscription._finish()
+        else:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def has_subscribers(self) -> bool:
+        """是否还有订阅者"""
+        return len(self._subscribers) > 0
+
+    def _unsubscribe(self, subscription: DetectionSubscription):
+        self._subscribers.discard(subscription)
+
+    def _ensure_running(self):
+        """有订阅者在等时确保帧循环在跑（事件循环线程调用）"""
+        if self.finished or (self._task is not None and not self._task.done()):
+            return
+        self._loop = asyncio.get_running_loop()
+        self._task = self._loop.create_task(self._run())
+
+    async def _run(self):
+        """运行帧循环；它返回时如果还有订阅者，说明捕获源结束或应用停止了"""
+        error = None
+        try:
+            await self._producer(self)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            default_logger.error(f"异步帧循环出错: {e}", exc_info=True)
+            error = e
+        if error is not None or self.has_subscribers():
+            self.close(error)
+
+    def emit(self, message: Dict, detections: List[DetectionResult]):
+        """帧循环线程调用：把这一帧转交给事件循环线程分发"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        batch = DetectionBatch(
+            frame=message["frame"],
+            timestamp=message["timestamp"],
+            latency=message.get("latency_ms", 0.0) / 1000,
+            detections=detections,
+            message=message
+        )
+        try:
+            loop.call_soon_threadsafe(self._publish, batch)
+        except RuntimeError:
+            pass  # 事件循环已经关闭
+
+    def _publish(self, batch: DetectionBatch):
+        self.published += 1
+        for subscription in list(self._subscribers):
+            subscription._push(batch)
+
+    async def wait_stopped(self):
+        """等帧循环停下来"""
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        获取分发统计
+
+        Returns:
+            {subscribers, published, dropped}
+        """
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "dropped": self.dropped,
+        }
+
+    def close(self, error: Optional[BaseException] = None):
+        """结束检测流：所有订阅者读完积压的帧后停止迭代"""
+        self.finished = True
+        for subscription in list(self._subscribers):
+            subscription._finish(error)
+        self._subscribers = weakref.WeakSet()
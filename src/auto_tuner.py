@@ -0,0 +1,346 @@
+"""
+自动调优模块 - 喵在主人的电脑上把每种配置都试一遍，挑出最合适的~ 🎀
+在代表性的帧集合上扫描 模型 × 输入尺寸 × 推理后端 × 线程数，
+在满足延迟目标和精度下限的组合里选精度最高的（精度相同选更快的），
+结果写成性能档案（profiles/<name>.json），启动时用 --profile <name> 加载
+
+精度是相对参考配置（候选里最大的模型 + 最大输入尺寸）的F1，
+没有人工标注也能比较“换小模型/小尺寸以后漏了多少”
+
+用法:
+    python main.py tune --models yolo26n.pt yolo26s.pt --imgsz 320 480 640 --threads 2 4 \\
+        --latency-ms 50 --min-accuracy 0.8 --name laptop
+    python main.py --profile laptop
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from .benchmark import environment_info, export_model, load_frames, run_benchmark, set_thread_count
+from .yolo_detector import DetectionResult, YOLODetector
+from .logger import default_logger
+
+
+def box_iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """
+    两组框两两之间的IOU
+
+    Args:
+        boxes_a: (N, 4) x1, y1, x2, y2
+        boxes_b: (M, 4)
+
+    Returns:
+        (N, M) IOU矩阵
+    """
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)), dtype=np.float32)
+    a = boxes_a[:, None, :].astype(np.float32)
+    b = boxes_b[None, :, :].astype(np.float32)
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = inter_w * inter_h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-6)
+
+
+def matched_ious(
+    reference: Sequence[DetectionResult],
+    candidate: Sequence[DetectionResult],
+    iou_threshold: float = 0.5
+) -> List[float]:
+    """
+    按类别贪心匹配两组检测结果（候选按置信度从高到低，各找IOU最大的未匹配参考框）
+
+    Args:
+        reference: 参考检测结果（当作真值）
+        candidate: 待评估的检测结果
+        iou_threshold: 算作匹配的最小IOU
+
+    Returns:
+        每个匹配对的IOU
+    """
+    ious = []
+    for class_id in {d.class_id for d in reference} | {d.class_id for d in candidate}:
+        ref = [d for d in reference if d.class_id == class_id]
+        cand = sorted((d for d in candidate if d.class_id == class_id), key=lambda d: -d.confidence)
+        if not ref or not cand:
+            continue
+        iou = box_iou_matrix(np.array([d.box for d in cand]), np.array([d.box for d in ref]))
+        used = np.zeros(len(ref), dtype=bool)
+        for row in iou:
+            row = np.where(used, -1.0, row)
+            best = int(row.argmax())
+            if row[best] >= iou_threshold:
+                used[best] = True
+                ious.append(float(row[best]))
+    return ious
+
+
+def match_detections(
+    reference: Sequence[DetectionResult],
+    candidate: Sequence[DetectionResult],
+    iou_threshold: float = 0.5
+) -> Tuple[int, int, int]:
+    """
+    按类别贪心匹配两组检测结果
+
+    Args:
+        reference: 参考检测结果（当作真值）
+        candidate: 待评估的检测结果
+        iou_threshold: 算作匹配的最小IOU
+
+    Returns:
+        (匹配数, 多检数, 漏检数)
+    """
+    matched = len(matched_ious(reference, candidate, iou_threshold))
+    return matched, len(candidate) - matched, len(reference) - matched
+
+
+def detection_f1(
+    reference: List[List[DetectionResult]],
+    candidate: List[List[DetectionResult]],
+    iou_threshold: float = 0.5
+) -> Dict[str, float]:
+    """
+    逐帧比较两组检测结果
+
+    Returns:
+        {precision, recall, f1}（两边都没有检测时记为1）
+    """
+    tp = fp = fn = 0
+    for ref, cand in zip(reference, candidate):
+        m, extra, missed = match_detections(ref, cand, iou_threshold)
+        tp, fp, fn = tp + m, fp + extra, fn + missed
+    precision = tp / (tp + fp) if tp + fp else 1.0
+    recall = tp / (tp + fn) if tp + fn else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {"precision": precision, "recall": recall, "f1": f1}
+
+
+def _detect_all(detector: YOLODetector, frames: List[np.ndarray]) -> List[List[DetectionResult]]:
+    return [detector.detect(frame) for frame in frames]
+
+
+def select_best(
+    results: List[Dict],
+    latency_ms: float,
+    min_accuracy: float,
+    percentile: str = "p95_ms"
+) -> Tuple[Optional[Dict], bool]:
+    """
+    选出最合适的配置
+
+    Args:
+        results: tune() 的逐配置结果
+        latency_ms: 延迟目标（毫秒）
+        min_accuracy: 精度（F1）下限
+        percentile: 用哪个延迟分位数和目标比较
+
+    Returns:
+        (最佳结果, 是否满足目标)；都不满足时退而求其次选延迟最低的
+    """
+    valid = [r for r in results if "error" not in r]
+    if not valid:
+        return None, False
+    feasible = [
+        r for r in valid
+        if r["latency"][percentile] <= latency_ms and r["accuracy"]["f1"] >= min_accuracy
+    ]
+    if feasible:
+        return max(feasible, key=lambda r: (round(r["accuracy"]["f1"], 3), r["throughput_fps"])), True
+    return min(valid, key=lambda r: r["latency"][percentile]), False
+
+
+def tune(
+    frames: List[np.ndarray],
+    models: List[str],
+    imgsz_list: List[int],
+    backends: List[str],
+    threads_list: List[int],
+    confidence_threshold: float = 0.5,
+    classes: Optional[List[int]] = None,
+    accuracy_frames: int = 30,
+    warmup: int = 3
+) -> List[Dict]:
+    """
+    扫描所有候选组合，测延迟/吞吐和相对参考配置的精度
+
+    Args:
+        frames: 代表性帧集合
+        models: 候选模型（按从小到大排列，最后一个作为精度参考）
+        imgsz_list: 候选输入尺寸
+        backends: 候选推理后端
+        threads_list: 候选线程数
+        confidence_threshold: 置信度阈值
+        classes: 检测类别
+        accuracy_frames: 用来算精度的帧数
+        warmup: 预热帧数
+
+    Returns:
+        每个组合一条结果（含 config / latency / throughput_fps / accuracy）
+    """
+    accuracy_set = frames[:accuracy_frames]
+    reference_config = {"model": models[-1], "imgsz": max(imgsz_list)}
+    default_logger.info(f"🎯 精度参考: {reference_config['model']} @ {reference_config['imgsz']}")
+    set_thread_count(max(threads_list))
+    reference_detector = YOLODetector(
+        model_path=models[-1], confidence_threshold=confidence_threshold,
+        classes=classes, imgsz=reference_config["imgsz"]
+    )
+    reference = _detect_all(reference_detector, accuracy_set)
+    del reference_detector
+
+    results = []
+    for model_path, imgsz, backend, threads in itertools.product(models, imgsz_list, backends, threads_list):
+        config = {"model": model_path, "imgsz": imgsz, "backend": backend, "threads": threads}
+        default_logger.info(f"🔧 调优候选: {config}")
+        try:
+            set_thread_count(threads)
+            exported = export_model(model_path, backend, imgsz)
+            detector = YOLODetector(
+                model_path=exported, confidence_threshold=confidence_threshold,
+                classes=classes, imgsz=imgsz
+            )
+            result = run_benchmark(detector, frames, warmup=warmup)
+            result["accuracy"] = detection_f1(reference, _detect_all(detector, accuracy_set))
+            result["model_path"] = exported
+        except Exception as e:
+            default_logger.error(f"候选 {config} 测试失败: {e}", exc_info=True)
+            results.append({"config": config, "error": str(e)})
+            continue
+
+        default_logger.info(
+            f"   -> {result['throughput_fps']:.1f} FPS | p95 {result['latency']['p95_ms']:.1f} ms | "
+            f"F1 {result['accuracy']['f1']:.3f}"
+        )
+        results.append({"config": config, **result})
+    return results
+
+
+def build_profile(
+    name: str,
+    best: Dict,
+    met_target: bool,
+    targets: Dict,
+    results: List[Dict],
+    fps_headroom: float = 0.8,
+    max_fps: int = 60
+) -> Dict:
+    """
+    生成性能档案
+
+    Args:
+        name: 档案名
+        best: select_best() 选出的结果
+        met_target: 是否满足目标
+        targets: 调优目标（记录用）
+        results: 全部候选结果（记录用）
+        fps_headroom: 帧率上限取实测吞吐的多少（留余量给捕获和绘制）
+        max_fps: 帧率上限的上限
+
+    Returns:
+        档案字典，"config" 部分会叠加到 AppConfig 上
+    """
+    fps_limit = int(max(1, min(max_fps, best["throughput_fps"] * fps_headroom)))
+    return {
+        "name": name,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "environment": environment_info(),
+        "targets": targets,
+        "met_target": met_target,
+        "config": {
+            "detector": {
+                "model_path": best["model_path"],
+                "imgsz": best["config"]["imgsz"],
+            },
+            "threads": {
+                "torch_threads": best["config"]["threads"],
+                "opencv_threads": best["config"]["threads"],
+            },
+            "screen": {"fps_limit": fps_limit},
+            "governor": {"reduced_fps": min(10, fps_limit)},
+        },
+        "selected": {key: best[key] for key in ("config", "latency", "throughput_fps", "accuracy")},
+        "candidates": [
+            {key: r[key] for key in ("config", "latency", "throughput_fps", "accuracy", "error") if key in r}
+            for r in results
+        ],
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """命令行参数"""
+    parser = argparse.ArgumentParser(prog="main.py tune", description="在本机上自动调优并生成性能档案 喵~")
+    parser.add_argument("--source", default=None, help="代表性帧：捕获录制目录、图片目录或视频文件（默认合成帧）")
+    parser.add_argument("--frames", type=int, default=60, help="帧数")
+    parser.add_argument("--size", type=int, nargs=2, default=(1920, 1080), metavar=("W", "H"), help="合成帧尺寸")
+    parser.add_argument("--models", nargs="+", default=["yolo26n.pt", "yolo26s.pt"],
+                        help="候选模型（从小到大，最后一个作为精度参考）")
+    parser.add_argument("--imgsz", type=int, nargs="+", default=[320, 480, 640], help="候选输入尺寸")
+    parser.add_argument("--backends", nargs="+", default=["pytorch"], help="候选推理后端（pytorch/onnx/openvino/...）")
+    cpu_count = os.cpu_count() or 1
+    parser.add_argument("--threads", type=int, nargs="+",
+                        default=sorted({max(1, cpu_count // 2), cpu_count}), help="候选线程数")
+    parser.add_argument("--conf", type=float, default=0.5, help="置信度阈值")
+    parser.add_argument("--classes", type=int, nargs="*", default=[0], help="检测类别（不填表示所有类别）")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="p95单帧延迟目标（毫秒）")
+    parser.add_argument("--min-accuracy", type=float, default=0.8, help="相对参考配置的F1下限")
+    parser.add_argument("--accuracy-frames", type=int, default=30, help="算精度用的帧数")
+    parser.add_argument("--name", default="default", help="档案名")
+    parser.add_argument("--profile-dir", default="profiles", help="档案目录")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    调优命令入口
+
+    Returns:
+        进程退出码（找不到满足目标的配置时为1，但仍会写出最接近的档案）
+    """
+    args = build_parser().parse_args(argv)
+    frames = load_frames(args.source, args.frames, tuple(args.size))
+    default_logger.info(f"调优帧集合: {len(frames)} 帧 ({args.source or '合成帧'})")
+
+    results = tune(
+        frames,
+        models=args.models,
+        imgsz_list=args.imgsz,
+        backends=args.backends,
+        threads_list=args.threads,
+        confidence_threshold=args.conf,
+        classes=args.classes or None,
+        accuracy_frames=args.accuracy_frames
+    )
+    best, met_target = select_best(results, args.latency_ms, args.min_accuracy)
+    if best is None:
+        default_logger.error("所有候选配置都失败了，没有生成档案")
+        return 1
+
+    targets = {"latency_p95_ms": args.latency_ms, "min_accuracy_f1": args.min_accuracy}
+    profile = build_profile(args.name, best, met_target, targets, results)
+    path = Path(args.profile_dir) / f"{args.name}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(profile, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    selected = profile["config"]
+    message = (
+        f"{best['config']} -> {best['throughput_fps']:.1f} FPS, p95 {best['latency']['p95_ms']:.1f} ms, "
+        f"F1 {best['accuracy']['f1']:.3f}, 帧率上限 {selected['screen']['fps_limit']}"
+    )
+    if met_target:
+        default_logger.info(f"✨ 最佳配置: {message}")
+    else:
+        default_logger.warning(f"没有候选同时满足延迟和精度目标，选了延迟最低的: {message}")
+    default_logger.info(f"性能档案已保存: {path}（启动时加 --profile {args.name}）")
+    return 0 if met_target else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
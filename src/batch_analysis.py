@@ -0,0 +1,332 @@
+"""
+离线批量分析模块 - 喵帮主人分析录好的屏幕视频~ 🎀
+把视频切成若干段交给进程池处理（每个进程有自己的 YOLODetector），
+每段单独平滑并带少量重叠帧预热，最后按跟踪ID拼接，检测结果写成列式文件
+
+用法:
+    python main.py batch recording.mp4 --output detections.npz --workers 4
+    python main.py batch recording.mp4 --output detections.parquet   # 需要安装 pyarrow
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import cv2
+import numpy as np
+from .detection_smoother import DetectionSmoother
+from .config import ThreadConfig
+from .thread_layout import apply_thread_counts
+from .logger import default_logger
+
+# 输出文件的列
+COLUMNS = ("frame", "timestamp", "x1", "y1", "x2", "y2", "confidence", "class_id", "track_id")
+
+# 每个工作进程自己的检测器（由进程池初始化函数创建）
+_worker_detector = None
+
+
+def plan_chunks(total_frames: int, chunk_size: int, overlap: int) -> List[Tuple[int, int, int]]:
+    """
+    把视频切分成若干段
+
+    Args:
+        total_frames: 总帧数
+        chunk_size: 每段帧数
+        overlap: 每段开头额外读取的预热帧数（只用于平滑器热身，不输出）
+
+    Returns:
+        [(预热起点, 输出起点, 输出终点)]，区间左闭右开
+    """
+    chunks = []
+    for start in range(0, total_frames, chunk_size):
+        end = min(start + chunk_size, total_frames)
+        chunks.append((max(0, start - overlap), start, end))
+    return chunks
+
+
+def _init_worker(detector_kwargs: Dict, threads: int):
+    """进程池初始化：限制线程数并加载模型"""
+    global _worker_detector
+    apply_thread_counts(ThreadConfig(torch_threads=threads, opencv_threads=threads, blas_threads=threads))
+    from .yolo_detector import YOLODetector
+    _worker_detector = YOLODetector(**detector_kwargs)
+
+
+def _process_chunk(video_path: str, warm_start: int, start: int, end: int, smoother_kwargs: Dict) -> Dict:
+    """
+    在工作进程中处理一段视频
+
+    Args:
+        video_path: 视频路径
+        warm_start: 预热起点帧
+        start: 输出起点帧
+        end: 输出终点帧（不含）
+        smoother_kwargs: DetectionSmoother参数
+
+    Returns:
+        包含各列数组、类别名和耗时的字典
+    """
+    video = cv2.VideoCapture(video_path)
+    video.set(cv2.CAP_PROP_POS_FRAMES, warm_start)
+    smoother = DetectionSmoother(**smoother_kwargs)
+
+    rows = []
+    chunk_start = time.perf_counter()
+    for frame_index in range(warm_start, end):
+        ok, frame = video.read()
+        if not ok:
+            break
+        smoothed = smoother.smooth(_worker_detector.detect(frame))
+        if frame_index < start:
+            continue  # 重叠帧只用来预热平滑器
+        for d in smoothed:
+            rows.append((frame_index, *d.box, d.confidence, d.class_id, d.track_id))
+    video.release()
+
+    data = np.array(rows, dtype=np.float64).reshape(-1, 8)
+    return {
+        "start": start,
+        "end": end,
+        "frame": data[:, 0].astype(np.int64),
+        "boxes": data[:, 1:5].astype(np.int32),
+        "confidence": data[:, 5].astype(np.float32),
+        "class_id": data[:, 6].astype(np.int32),
+        "track_id": data[:, 7].astype(np.int64),
+        "class_names": dict(_worker_detector.model.names),
+        "frames_processed": end - warm_start,
+        "elapsed_s": time.perf_counter() - chunk_start,
+    }
+
+
+def _stitch_track_ids(chunks: List[Dict], iou_threshold: float = 0.3) -> np.ndarray:
+    """
+    拼接各段的跟踪ID（相邻两段在边界帧上按IOU匹配同类目标）
+
+    Args:
+        chunks: 按起点排序的各段结果
+        iou_threshold: 认为是同一目标的最小IOU
+
+    Returns:
+        拼接后全局唯一的跟踪ID数组（按段顺序拼接）
+    """
+    next_global_id = 0
+    prev_boundary: List[Tuple[Tuple[int, int, int, int], int, int]] = []  # (box, class_id, global_id)
+    stitched = []
+
+    for chunk in chunks:
+        local_ids = chunk["track_id"]
+        mapping: Dict[int, int] = {}
+
+        # 边界匹配：上一段最后一帧 vs 这一段第一帧
+        first_mask = chunk["frame"] == chunk["start"]
+        candidates = [
+            (tuple(box), int(cls), int(tid))
+            for box, cls, tid in zip(chunk["boxes"][first_mask], chunk["class_id"][first_mask], local_ids[first_mask])
+        ]
+        pairs = []
+        for i, (box, cls, _) in enumerate(candidates):
+            for j, (prev_box, prev_cls, _) in enumerate(prev_boundary):
+                if cls == prev_cls:
+                    iou = DetectionSmoother._calculate_iou(box, prev_box)
+                    if iou >= iou_threshold:
+                        pairs.append((iou, i, j))
+        used_local, used_prev = set(), set()
+        for _, i, j in sorted(pairs, reverse=True):
+            if i in used_local or j in used_prev:
+                continue
+            used_local.add(i)
+            used_prev.add(j)
+            mapping[candidates[i][2]] = prev_boundary[j][2]
+
+        # 剩下的局部ID分配新的全局ID
+        for local_id in np.unique(local_ids):
+            if int(local_id) not in mapping:
+                mapping[int(local_id)] = next_global_id
+                next_global_id += 1
+        next_global_id = max([next_global_id] + [g + 1 for g in mapping.values()])
+
+        global_ids = np.array([mapping[int(t)] for t in local_ids], dtype=np.int64)
+        stitched.append(global_ids)
+
+        last_mask = chunk["frame"] == chunk["end"] - 1
+        prev_boundary = [
+            (tuple(box), int(cls), int(gid))
+            for box, cls, gid in zip(chunk["boxes"][last_mask], chunk["class_id"][last_mask], global_ids[last_mask])
+        ]
+
+    return np.concatenate(stitched) if stitched else np.zeros(0, dtype=np.int64)
+
+
+def write_detections(path: str, columns: Dict[str, np.ndarray], class_names: Dict[int, str]):
+    """
+    把检测结果写成列式文件
+
+    Args:
+        path: 输出路径（.npz；.parquet/.arrow/.feather 需要安装 pyarrow）
+        columns: 列名 -> 数组
+        class_names: 类别ID -> 类别名
+    """
+    suffix = Path(path).suffix.lower()
+    if suffix in (".parquet", ".arrow", ".feather"):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise RuntimeError("写入Parquet/Arrow需要安装 pyarrow，或者改用 .npz 输出")
+        table = pa.table(columns)
+        table = table.replace_schema_metadata({
+            "class_names": json.dumps({str(k): v for k, v in class_names.items()}, ensure_ascii=False)
+        })
+        if suffix == ".parquet":
+            import pyarrow.parquet as pq
+            pq.write_table(table, path, compression="zstd")
+        else:
+            import pyarrow.feather as feather
+            feather.write_feather(table, path, compression="zstd")
+    else:
+        ids = np.array(sorted(class_names), dtype=np.int32)
+        names = np.array([class_names[i] for i in ids])
+        np.savez_compressed(path, class_name_ids=ids, class_names=names, **columns)
+
+
+def analyze_video(
+    video_path: str,
+    output_path: str,
+    detector_kwargs: Dict,
+    workers: int = None,
+    chunk_size: int = 600,
+    overlap: int = 15,
+    smoother_kwargs: Optional[Dict] = None
+) -> Dict:
+    """
+    用进程池批量分析一个视频
+
+    Args:
+        video_path: 视频路径
+        output_path: 输出文件路径
+        detector_kwargs: YOLODetector参数（每个进程各自加载模型）
+        workers: 进程数，None表示CPU核数
+        chunk_size: 每段帧数
+        overlap: 每段的预热重叠帧数
+        smoother_kwargs: DetectionSmoother参数
+
+    Returns:
+        运行统计
+    """
+    video = cv2.VideoCapture(video_path)
+    if not video.isOpened():
+        raise ValueError(f"无法打开视频: {video_path}")
+    total_frames = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = video.get(cv2.CAP_PROP_FPS) or 30.0
+    video.release()
+
+    workers = workers or os.cpu_count() or 1
+    threads = max(1, (os.cpu_count() or 1) // workers)  # 避免线程超订
+    chunks = plan_chunks(total_frames, chunk_size, overlap)
+    smoother_kwargs = smoother_kwargs or {}
+
+    default_logger.info(
+        f"批量分析: {video_path} ({total_frames} 帧, {fps:.1f} FPS) | "
+        f"{len(chunks)} 段 × {chunk_size} 帧 | {workers} 进程 × {threads} 线程"
+    )
+
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(detector_kwargs, threads)
+    ) as pool:
+        futures = [
+            pool.submit(_process_chunk, video_path, warm_start, chunk_start, chunk_end, smoother_kwargs)
+            for warm_start, chunk_start, chunk_end in chunks
+        ]
+        for i, future in enumerate(futures):
+            results.append(future.result())
+            default_logger.info(f"  - 第 {i + 1}/{len(chunks)} 段完成")
+    elapsed = time.perf_counter() - start
+
+    frames = np.concatenate([r["frame"] for r in results]) if results else np.zeros(0, dtype=np.int64)
+    boxes = np.concatenate([r["boxes"] for r in results]) if results else np.zeros((0, 4), dtype=np.int32)
+    columns = {
+        "frame": frames,
+        "timestamp": frames / fps,
+        "x1": boxes[:, 0],
+        "y1": boxes[:, 1],
+        "x2": boxes[:, 2],
+        "y2": boxes[:, 3],
+        "confidence": np.concatenate([r["confidence"] for r in results]) if results else np.zeros(0, np.float32),
+        "class_id": np.concatenate([r["class_id"] for r in results]) if results else np.zeros(0, np.int32),
+        "track_id": _stitch_track_ids(results),
+    }
+    class_names = results[0]["class_names"] if results else {}
+    write_detections(output_path, columns, class_names)
+
+    processed = sum(r["frames_processed"] for r in results)
+    worker_time = sum(r["elapsed_s"] for r in results)
+    stats = {
+        "frames": total_frames,
+        "detections": int(len(frames)),
+        "tracks": int(len(np.unique(columns["track_id"]))),
+        "elapsed_s": elapsed,
+        "throughput_fps": total_frames / elapsed if elapsed > 0 else 0.0,
+        "per_worker_fps": processed / worker_time if worker_time > 0 else 0.0,
+        "workers": workers,
+    }
+    default_logger.info(
+        f"📼 批量分析完成: {stats['detections']} 个检测, {stats['tracks']} 条轨迹 | "
+        f"总吞吐 {stats['throughput_fps']:.1f} FPS ({workers} 进程) | "
+        f"单进程 {stats['per_worker_fps']:.1f} FPS | 结果: {output_path}"
+    )
+    return stats
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """命令行参数"""
+    parser = argparse.ArgumentParser(prog="batch", description="离线批量分析屏幕录像")
+    parser.add_argument("video", help="视频文件路径")
+    parser.add_argument("--output", required=True, help="输出文件（.npz / .parquet / .arrow）")
+    parser.add_argument("--workers", type=int, default=None, help="进程数（默认CPU核数）")
+    parser.add_argument("--chunk-size", type=int, default=600, help="每段帧数")
+    parser.add_argument("--overlap", type=int, default=15, help="每段的预热重叠帧数")
+    parser.add_argument("--model", default="yolo26n.pt", help="模型路径")
+    parser.add_argument("--imgsz", type=int, default=640, help="输入尺寸")
+    parser.add_argument("--conf", type=float, default=0.5, help="置信度阈值")
+    parser.add_argument("--classes", type=int, nargs="*", default=[0], help="检测类别（不填表示所有类别）")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    批量分析命令入口
+
+    Args:
+        argv: 命令行参数
+
+    Returns:
+        进程退出码
+    """
+    args = build_parser().parse_args(argv)
+    analyze_video(
+        args.video,
+        args.output,
+        detector_kwargs={
+            "model_path": args.model,
+            "confidence_threshold": args.conf,
+            "classes": args.classes or None,
+            "imgsz": args.imgsz,
+        },
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        overlap=args.overlap
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,449 @@
+"""
+基准测试模块 - 喵帮主人可重复地测量流水线性能~ 🎀
+在固定的帧集合（录制的图片/视频或合成帧）上驱动 YOLODetector、DetectionSmoother
+和离屏覆盖层，扫描模型/输入尺寸/后端/线程数组合，输出机器可读的JSON报告
+
+用法:
+    python main.py benchmark --models yolo26n.pt yolo26s.pt --imgsz 320 640 --threads 1 4
+    python -m src.benchmark --source recordings/ --output bench.json
+"""
+import argparse
+import gc
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import cv2
+import numpy as np
+from .yolo_detector import DetectionResult, YOLODetector
+from .detection_smoother import DetectionSmoother
+from .metrics import PipelineMetrics
+from .metrics_server import process_rss_bytes
+from .config import ThreadConfig
+from .thread_layout import apply_thread_counts, apply_thread_layout, describe_thread_layout
+from .logger import default_logger
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".bmp", ".webp"}
+
+
+def synthetic_frames(count: int, size: Tuple[int, int] = (1920, 1080), seed: int = 0) -> List[np.ndarray]:
+    """
+    生成可复现的合成帧（渐变背景 + 随机色块）
+
+    Args:
+        count: 帧数
+        size: (width, height)
+        seed: 随机种子
+
+    Returns:
+        BGR帧列表
+    """
+    width, height = size
+    rng = np.random.default_rng(seed)
+    gradient = np.linspace(0, 255, width, dtype=np.uint8)[None, :, None]
+    base = np.broadcast_to(gradient, (height, width, 3)).copy()
+
+    frames = []
+    for _ in range(count):
+        frame = base.copy()
+        for _ in range(8):
+            x1, y1 = int(rng.integers(0, width - 50)), int(rng.integers(0, height - 50))
+            x2, y2 = x1 + int(rng.integers(20, 400)), y1 + int(rng.integers(20, 400))
+            color = tuple(int(c) for c in rng.integers(0, 256, 3))
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, -1)
+        frames.append(frame)
+    return frames
+
+
+def load_frames(
+    source: Optional[str],
+    count: int = 100,
+    size: Tuple[int, int] = (1920, 1080)
+) -> List[np.ndarray]:
+    """
+    加载基准测试帧集合
+
+    Args:
+        source: 捕获录制目录、图片目录或视频文件，None则生成合成帧
+        count: 最多加载的帧数
+        size: 合成帧尺寸 (width, height)
+
+    Returns:
+        BGR帧列表
+    """
+    if source is None:
+        return synthetic_frames(count, size)
+
+    path = Path(source)
+    frames = []
+    if (path / "meta.json").exists():
+        # 捕获录制目录
+        from .capture_recorder import CaptureReplayer
+        replayer = CaptureReplayer(str(path), pacing="none")
+        for _, frame in replayer:
+            frames.append(frame)
+            if len(frames) >= count:
+                break
+        replayer.close()
+    elif path.is_dir():
+        for image_path in sorted(path.iterdir()):
+            if image_path.suffix.lower() not in IMAGE_SUFFIXES:
+                continue
+            frame = cv2.imread(str(image_path))
+            if frame is not None:
+                frames.append(frame)
+            if len(frames) >= count:
+                break
+    else:
+        video = cv2.VideoCapture(str(path))
+        while len(frames) < count:
+            ok, frame = video.read()
+            if not ok:
+                break
+            frames.append(frame)
+        video.release()
+
+    if not frames:
+        raise ValueError(f"没有从 {source} 读到任何帧")
+    return frames
+
+
+_exported_models: Dict[Tuple[str, str, int], str] = {}
+
+
+def export_model(model_path: str, backend: str, imgsz: int) -> str:
+    """
+    把模型导出到指定推理后端（结果会缓存，同一组合只导出一次）
+
+    Args:
+        model_path: 原始 .pt 模型路径
+        backend: "pytorch" 或 ultralytics 支持的导出格式（onnx、openvino、torchscript等）
+        imgsz: 导出时的输入尺寸
+
+    Returns:
+        可直接传给 YOLODetector 的模型路径
+    """
+    if backend in ("pytorch", "pt"):
+        return model_path
+    key = (model_path, backend, imgsz)
+    if key not in _exported_models:
+        from ultralytics import YOLO
+        default_logger.info(f"正在导出模型: {model_path} -> {backend} (imgsz={imgsz})")
+        _exported_models[key] = str(YOLO(model_path).export(format=backend, imgsz=imgsz))
+    return _exported_models[key]
+
+
+def set_thread_count(threads: int, opencv_threads: Optional[int] = None):
+    """
+    设置推理相关库的线程数
+
+    Args:
+        threads: torch线程数
+        opencv_threads: OpenCV线程数，None表示和torch相同
+    """
+    apply_thread_counts(ThreadConfig(
+        torch_threads=threads,
+        opencv_threads=threads if opencv_threads is None else opencv_threads
+    ))
+
+
+def create_offscreen_overlay():
+    """
+    创建离屏覆盖层（不需要真实显示器）
+
+    Returns:
+        (QApplication, TransparentOverlay)，没有PyQt5时返回 (None, None)
+    """
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        from .screen_overlay import TransparentOverlay, create_overlay_app
+    except ImportError as e:
+        default_logger.warning(f"无法创建离屏覆盖层，跳过绘制阶段: {e}")
+        return None, None
+    qt_app = create_overlay_app()
+    overlay = TransparentOverlay(render_fps=0)
+    overlay.show()
+    return qt_app, overlay
+
+
+def _latency_summary(samples: List[float]) -> Dict[str, float]:
+    """精确的延迟统计（毫秒）"""
+    if not samples:
+        return {}
+    values = np.asarray(samples) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "mean_ms": float(values.mean()),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "max_ms": float(values.max()),
+    }
+
+
+def run_benchmark(
+    detector: YOLODetector,
+    frames: List[np.ndarray],
+    overlay=None,
+    qt_app=None,
+    warmup: int = 5,
+    iterations: int = 1,
+    trace_alloc: bool = False,
+    outputs: Optional[List[Tuple[List[DetectionResult], List[DetectionResult]]]] = None
+) -> Dict:
+    """
+    在帧集合上跑一遍完整流水线（检测 → 平滑 → 覆盖层绘制）
+
+    Args:
+        detector: 检测器
+        frames: 帧集合
+        overlay: 离屏覆盖层，None则跳过绘制
+        qt_app: 覆盖层所属的QApplication
+        warmup: 预热帧数（不计入统计）
+        iterations: 帧集合重复次数
+        trace_alloc: 是否用tracemalloc统计内存分配（有额外开销）
+        outputs: 传入列表时收集第一轮每帧的 (检测结果, 平滑后结果)，回归测试用
+
+    Returns:
+        单个配置的测试结果
+    """
+    smoother = DetectionSmoother()
+    metrics = PipelineMetrics()
+    if overlay is not None:
+        overlay.metrics = metrics
+
+    # 预热（模型第一次推理会慢很多）
+    for frame in frames[:warmup]:
+        smoother.smooth(detector.detect(frame))
+    smoother = DetectionSmoother()
+
+    if trace_alloc:
+        tracemalloc.start()
+
+    latencies = []
+    detection_total = 0
+    # 进程的峰值RSS在整个扫描里只增不减（释放的内存分配器也不一定还给系统），
+    # 所以每个配置只报告自己这一轮里逐帧采样到的RSS增长
+    rss_start = peak_rss = process_rss_bytes()
+    start = time.perf_counter()
+    for iteration in range(iterations):
+        for frame in frames:
+            frame_start = time.perf_counter()
+            detections = detector.detect(frame)
+            stage_start = frame_start
+            for stage, seconds in detector.last_timings.items():
+                metrics.record_span(stage, stage_start, stage_start + seconds)
+                stage_start += seconds
+            with metrics.time_stage("smoothing"):
+                smoothed = smoother.smooth(detections)
+            if overlay is not None:
+                overlay.update_detections(smoothed, capture_time=frame_start)
+                qt_app.processEvents()  # 离屏绘制同步完成
+            latencies.append(time.perf_counter() - frame_start)
+            peak_rss = max(peak_rss, process_rss_bytes())
+            detection_total += len(detections)
+            if outputs is not None and iteration == 0:
+                outputs.append((detections, smoothed))
+    elapsed = time.perf_counter() - start
+
+    alloc = {}
+    if trace_alloc:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        alloc = {"alloc_net_bytes": current, "alloc_peak_bytes": peak}
+
+    frame_count = len(latencies)
+    result = {
+        "frames": frame_count,
+        "elapsed_s": elapsed,
+        "throughput_fps": frame_count / elapsed if elapsed > 0 else 0.0,
+        "latency": _latency_summary(latencies),
+        "stages": {
+            stage: stats for stage, stats in metrics.summary().items() if stats["count"] > 0
+        },
+        "detections_per_frame": detection_total / frame_count if frame_count else 0.0,
+        "rss_bytes": process_rss_bytes(),
+        "rss_growth_bytes": peak_rss - rss_start,
+        "thread_layout": describe_thread_layout(),
+    }
+    result.update(alloc)
+    return result
+
+
+def benchmark_sweep(
+    frames: List[np.ndarray],
+    models: List[str],
+    imgsz_list: List[int],
+    backends: List[str],
+    threads_list: List[int],
+    confidence_threshold: float = 0.5,
+    classes: Optional[List[int]] = None,
+    with_overlay: bool = True,
+    warmup: int = 5,
+    iterations: int = 1,
+    trace_alloc: bool = False,
+    opencv_threads: Optional[int] = None,
+    postprocess: str = "ultralytics"
+) -> List[Dict]:
+    """
+    扫描所有配置组合
+
+    Args:
+        frames: 帧集合
+        models: 模型路径列表
+        imgsz_list: 输入尺寸列表
+        backends: 推理后端列表
+        threads_list: 线程数列表
+        confidence_threshold: 置信度阈值
+        classes: 检测类别
+        with_overlay: 是否包含离屏覆盖层绘制
+        warmup: 每个配置的预热帧数
+        iterations: 帧集合重复次数
+        trace_alloc: 是否统计内存分配
+        opencv_threads: OpenCV线程数，None表示和torch线程数相同
+        postprocess: 后处理方式（"ultralytics" 或 "numpy"）
+
+    Returns:
+        每个配置一条结果
+    """
+    qt_app, overlay = create_offscreen_overlay() if with_overlay else (None, None)
+
+    results = []
+    for model_path, imgsz, backend, threads in itertools.product(models, imgsz_list, backends, threads_list):
+        config = {"model": model_path, "imgsz": imgsz, "backend": backend, "threads": threads,
+                  "postprocess": postprocess}
+        default_logger.info(f"🏁 基准测试: {config}")
+        detector = None  # 先放掉上一个配置的模型，不算进这个配置的内存
+        gc.collect()
+        try:
+            set_thread_count(threads, opencv_threads)
+            detector = YOLODetector(
+                model_path=export_model(model_path, backend, imgsz),
+                confidence_threshold=confidence_threshold,
+                classes=classes,
+                imgsz=imgsz,
+                postprocess=postprocess
+            )
+            result = run_benchmark(
+                detector, frames, overlay, qt_app,
+                warmup=warmup, iterations=iterations, trace_alloc=trace_alloc
+            )
+        except Exception as e:
+            default_logger.error(f"配置 {config} 测试失败: {e}", exc_info=True)
+            results.append({"config": config, "error": str(e)})
+            continue
+
+        default_logger.info(
+            f"   -> {result['throughput_fps']:.1f} FPS | "
+            f"p50 {result['latency']['p50_ms']:.1f} ms | p99 {result['latency']['p99_ms']:.1f} ms"
+        )
+        results.append({"config": config, **result})
+    return results
+
+
+def environment_info() -> Dict:
+    """收集运行环境信息，方便不同版本之间对比"""
+    info = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+    }
+    for module_name in ("torch", "ultralytics", "onnxruntime", "openvino"):
+        try:
+            module = __import__(module_name)
+            info[module_name] = getattr(module, "__version__", "unknown")
+        except ImportError:
+            pass
+    return info
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """命令行参数"""
+    parser = argparse.ArgumentParser(prog="benchmark", description="YOLO屏幕监控流水线基准测试")
+    parser.add_argument("--source", default=None, help="捕获录制目录、图片目录或视频文件（默认生成合成帧）")
+    parser.add_argument("--frames", type=int, default=100, help="帧数")
+    parser.add_argument("--size", type=int, nargs=2, default=(1920, 1080), metavar=("W", "H"), help="合成帧尺寸")
+    parser.add_argument("--models", nargs="+", default=["yolo26n.pt"], help="模型列表")
+    parser.add_argument("--imgsz", type=int, nargs="+", default=[640], help="输入尺寸列表")
+    parser.add_argument("--backends", nargs="+", default=["pytorch"], help="推理后端列表（pytorch/onnx/openvino/...）")
+    parser.add_argument("--threads", type=int, nargs="+", default=[os.cpu_count() or 1], help="线程数列表")
+    parser.add_argument("--opencv-threads", type=int, default=None, help="OpenCV线程数（默认和 --threads 相同）")
+    parser.add_argument("--interop-threads", type=int, default=None, help="torch inter-op 线程数")
+    parser.add_argument("--blas-threads", type=int, default=None, help="BLAS线程数")
+    parser.add_argument("--cpus", default=None, help="把测试线程绑到这些CPU上，例如 0-3（仅Linux）")
+    parser.add_argument("--conf", type=float, default=0.5, help="置信度阈值")
+    parser.add_argument("--classes", type=int, nargs="*", default=[0], help="检测类别（不填表示所有类别）")
+    parser.add_argument("--postprocess", choices=["ultralytics", "numpy"], default="ultralytics", help="后处理方式")
+    parser.add_argument("--warmup", type=int, default=5, help="预热帧数")
+    parser.add_argument("--iterations", type=int, default=1, help="帧集合重复次数")
+    parser.add_argument("--no-overlay", action="store_true", help="不包含覆盖层绘制")
+    parser.add_argument("--trace-alloc", action="store_true", help="用tracemalloc统计内存分配")
+    parser.add_argument("--output", default=None, help="JSON报告输出路径（默认打印到标准输出，日志都在标准错误，可以直接重定向）")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    基准测试命令入口
+
+    Args:
+        argv: 命令行参数
+
+    Returns:
+        进程退出码
+    """
+    args = build_parser().parse_args(argv)
+    apply_thread_layout(ThreadConfig(
+        torch_interop_threads=args.interop_threads,
+        blas_threads=args.blas_threads,
+        pipeline_cpus=args.cpus
+    ))
+    frames = load_frames(args.source, args.frames, tuple(args.size))
+    default_logger.info(f"基准测试帧集合: {len(frames)} 帧 ({args.source or '合成帧'})")
+
+    results = benchmark_sweep(
+        frames,
+        models=args.models,
+        imgsz_list=args.imgsz,
+        backends=args.backends,
+        threads_list=args.threads,
+        confidence_threshold=args.conf,
+        classes=args.classes or None,
+        with_overlay=not args.no_overlay,
+        warmup=args.warmup,
+        iterations=args.iterations,
+        trace_alloc=args.trace_alloc,
+        opencv_threads=args.opencv_threads,
+        postprocess=args.postprocess
+    )
+
+    report = {
+        "environment": environment_info(),
+        "frame_set": {
+            "source": args.source or "synthetic",
+            "frames": len(frames),
+            "resolution": [int(frames[0].shape[1]), int(frames[0].shape[0])],
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+        default_logger.info(f"基准测试报告已保存: {args.output}")
+    else:
+        print(text)
+    return 1 if any("error" in r for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""
+缓冲池模块 - 喵把用过的整帧数组收起来下次再用，不用每帧都重新申请~ 🎀
+捕获、颜色转换、绘制每帧都要一块整帧大小的数组，高分辨率下反复申请释放会推高RSS和分配器压力。
+各阶段从池里按 (形状, dtype) 借缓冲区，用完还回来；池子保留的内存有上限
+
+用法:
+    frame = default_buffer_pool.acquire((1080, 1920, 3), np.uint8)
+    ...
+    default_buffer_pool.release(frame)   # 忘了还也没关系，数组被回收时会自动记账
+"""
+import threading
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+import numpy as np
+from .logger import default_logger
+
+BufferKey = Tuple[Tuple[int, ...], str]
+
+
+class BufferPool:
+    """
+    按形状和dtype复用的缓冲池 (｡♥‿♥｡)
+    常驻内存 = 借出中的 + 池里空闲的；超过上限时先丢掉最久没用的空闲缓冲区，
+    还是不够也照样分配（不能让捕获停下来），只是记一次超额
+    """
+
+    def __init__(self, max_bytes: int = 512 * 1024 * 1024, enabled: bool = True):
+        """
+        初始化缓冲池
+
+        Args:
+            max_bytes: 常驻内存上限（字节）
+            enabled: 关闭时 acquire 每次都新分配，release 什么也不做
+        """
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        # 可重入：持锁淘汰缓冲区时数组会立刻被回收，weakref.finalize 回调会在同一个线程里再次加锁
+        self._lock = threading.RLock()
+        self._free: "OrderedDict[BufferKey, List[np.ndarray]]" = OrderedDict()
+        self._in_use: Dict[int, int] = {}  # id(数组) -> 字节数
+        self._free_bytes = 0
+        self._in_use_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.over_budget = 0
+        self.unreturned = 0
+        self.peak_resident_bytes = 0
+        self._warned_over_budget = False
+
+    @staticmethod
+    def _key(shape, dtype) -> BufferKey:
+        return tuple(int(n) for n in shape), np.dtype(dtype).str
+
+    def acquire(self, shape, dtype=np.uint8) -> np.ndarray:
+        """
+        借一块缓冲区（内容是上次留下的，调用方要整块覆盖）
+
+        Args:
+            shape: 数组形状
+            dtype: 数据类型
+
+        Returns:
+            可写的连续数组
+        """
+        if not self.enabled:
+            return np.empty(shape, dtype=dtype)
+        key = self._key(shape, dtype)
+        with self._lock:
+            buffers = self._free.get(key)
+            if buffers:
+                array = buffers.pop()
+                if not buffers:
+                    del self._free[key]
+                else:
+                    self._free.move_to_end(key)
+                self._free_bytes -= array.nbytes
+                self._in_use[id(array)] = array.nbytes
+                self._in_use_bytes += array.nbytes
+                self.hits += 1
+                return array
+
+            self.misses += 1
+            nbytes = int(np.prod(key[0])) * np.dtype(dtype).itemsize
+            self._evict_locked(self.max_bytes - nbytes)
+            if self._in_use_bytes + self._free_bytes + nbytes > self.max_bytes:
+                self.over_budget += 1
+                if not self._warned_over_budget:
+                    self._warned_over_budget = True
+                    default_logger.warning(
+                        f"缓冲池超过内存上限 {self.max_bytes / 1024 / 1024:.0f} MB（借出未还的缓冲区太多？）"
+                    )
+
+        array = np.empty(key[0], dtype=dtype)
+        with self._lock:
+            self._in_use[id(array)] = array.nbytes
+            self._in_use_bytes += array.nbytes
+            self._update_peak_locked()
+        weakref.finalize(array, self._forget, id(array))
+        return array
+
+    def release(self, array: np.ndarray):
+        """
+        归还缓冲区（不是从池里借的数组会被忽略，重复归还也没关系）
+
+        Args:
+            array: acquire() 得到的数组
+        """
+        if not self.enabled or array is None:
+            return
+        with self._lock:
+            nbytes = self._in_use.pop(id(array), None)
+            if nbytes is None:
+                return
+            self._in_use_bytes -= nbytes
+            self._evict_locked(self.max_bytes - nbytes)
+            if self._in_use_bytes + self._free_bytes + nbytes > self.max_bytes:
+                # 借出的太多，池子里放不下了，这块直接交给GC
+                self.evictions += 1
+                return
+            self._free.setdefault(self._key(array.shape, array.dtype), []).append(array)
+            self._free_bytes += nbytes
+
+    @contextmanager
+    def borrow(self, shape, dtype=np.uint8):
+        """
+        借一块缓冲区，离开 with 时自动归还
+
+        Args:
+            shape: 数组形状
+            dtype: 数据类型
+        """
+        array = self.acquire(shape, dtype)
+        try:
+            yield array
+        finally:
+            self.release(array)
+
+    def _forget(self, array_id: int):
+        """借出的数组没还就被回收了（允许，只是少了一次复用）"""
+        with self._lock:
+            nbytes = self._in_use.pop(array_id, None)
+            if nbytes is not None:
+                self._in_use_bytes -= nbytes
+                self.unreturned += 1
+
+    def _evict_locked(self, target_bytes: int):
+        """丢掉最久没用的空闲缓冲区，直到常驻内存不超过 target_bytes"""
+        while self._free and self._in_use_bytes + self._free_bytes > target_bytes:
+            key, buffers = next(iter(self._free.items()))
+            array = buffers.pop()
+            if not buffers:
+                del self._free[key]
+            self._free_bytes -= array.nbytes
+            self.evictions += 1
+
+    def _update_peak_locked(self):
+        resident = self._in_use_bytes + self._free_bytes
+        if resident > self.peak_resident_bytes:
+            self.peak_resident_bytes = resident
+
+    def clear(self):
+        """丢掉所有空闲缓冲区"""
+        with self._lock:
+            self._free.clear()
+            self._free_bytes = 0
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        获取统计信息
+
+        Returns:
+            命中/未命中、淘汰、超额、借出未还被回收的次数，以及常驻/峰值内存（字节）
+        """
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / requests if requests else 0.0,
+                "evictions": self.evictions,
+                "over_budget": self.over_budget,
+                "unreturned": self.unreturned,
+                "in_use_bytes": self._in_use_bytes,
+                "free_bytes": self._free_bytes,
+                "resident_bytes": self._in_use_bytes + self._free_bytes,
+                "peak_resident_bytes": self.peak_resident_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+# 全局缓冲池（捕获、录制、绘制共用）
+default_buffer_pool = BufferPool()
@@ -0,0 +1,654 @@
+"""
+捕获后端模块 - 喵准备了好几种抓屏方式，启动时挨个试一下，用最快的那个~ 🎀
+ScreenCapture 只管把后端给出的画面转成BGR写进缓冲池，真正抓屏的是这里的后端:
+
+    mss     mss 库（跨平台，默认的做法）
+    xshm    X11 MIT-SHM：X服务器直接把画面写进共享内存，返回的数组就是那块内存，不经过套接字也不拷贝
+    ffmpeg  ffmpeg -f x11grab 子进程，后台线程持续读取 bgr24 原始帧，不用再转颜色
+
+ScreenCapture 和探测都通过 latest() 取帧（同一条路径），它同时给出这帧画面的采样时间:
+mss / xshm 在 grab() 里同步采样，采样时间按 grab 开始算；
+ffmpeg 不等新帧，直接给最新的一帧，采样时间按读完的时刻往前推一个帧周期（x11grab采样 + 管道传输）。
+"auto" 会在配置的捕获区域上给每个可用后端计时，比较的是"帧龄"：采样到BGR帧交到调用方手里的时间。
+报告里另外给出每帧的CPU时间（包括 ffmpeg 子进程），方便权衡~
+xshm / ffmpeg 只需要一个X服务器，在 Xvfb 里就能测试:
+    Xvfb :99 -screen 0 1920x1080x24 &
+    DISPLAY=:99 python main.py capture-probe
+
+用法:
+    python main.py capture-probe --region 0 0 1280 720
+    config.screen.capture_backend = "auto"   # 或 "mss" / "xshm" / "ffmpeg"
+"""
+import argparse
+import ctypes
+import ctypes.util
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+import cv2
+import numpy as np
+from .logger import default_logger
+
+
+def primary_monitor() -> Dict[str, int]:
+    """主显示器的区域 {"top", "left", "width", "height"}"""
+    import mss
+
+    with mss.mss() as sct:
+        monitor = sct.monitors[1]  # 1是主显示器，0是所有显示器
+    return {key: int(monitor[key]) for key in ("top", "left", "width", "height")}
+
+
+class CaptureBackend:
+    """
+    捕获后端基类 (｡♥‿♥｡)
+    grab() 返回 BGRA (H, W, 4) 或 BGR (H, W, 3) 的 uint8 数组，可以是后端内部缓冲区的视图，
+    只保证在下一次 grab() 之前有效
+    """
+
+    name = "base"
+
+    # 是否在后台持续抓取（latest() 直接给最新的一帧，不在调用时采样）
+    continuous = False
+
+    def __init__(self, monitor: Dict[str, int], framerate: int = 60):
+        """
+        初始化捕获后端
+
+        Args:
+            monitor: 捕获区域 {"top", "left", "width", "height"}
+            framerate: 期望的抓取帧率（只有持续抓取的后端会用到）
+        """
+        self.monitor = dict(monitor)
+        self.framerate = framerate
+
+    @classmethod
+    def available(cls) -> Tuple[bool, str]:
+        """
+        不真正抓屏，快速判断这个后端在当前环境能不能用
+
+        Returns:
+            (能否使用, 不能用时的原因)
+        """
+        return True, ""
+
+    def grab(self) -> np.ndarray:
+        raise NotImplementedError
+
+    def latest(self) -> Tuple[np.ndarray, float]:
+        """
+        取现在能拿到的最新画面（ScreenCapture 和探测都走这里），同步后端就是 grab()
+
+        Returns:
+            (画面, 这帧画面的采样时间 time.perf_counter)
+        """
+        sampled = time.perf_counter()
+        return self.grab(), sampled
+
+    def background_cpu_seconds(self) -> float:
+        """后端在本进程之外消耗的CPU时间（秒），比如子进程"""
+        return 0.0
+
+    def set_region(self, monitor: Dict[str, int]):
+        """修改捕获区域"""
+        self.monitor = dict(monitor)
+
+    def close(self):
+        """释放资源"""
+
+
+class MssBackend(CaptureBackend):
+    """mss 库"""
+
+    name = "mss"
+
+    def __init__(self, monitor: Dict[str, int], framerate: int = 60):
+        import mss
+
+        super().__init__(monitor, framerate)
+        self.sct = mss.mss()
+
+    def grab(self) -> np.ndarray:
+        screenshot = self.sct.grab(self.monitor)
+        return np.frombuffer(screenshot.raw, dtype=np.uint8).reshape(screenshot.height, screenshot.width, 4)
+
+    def close(self):
+        self.sct.close()
+
+
+# ---- X11 MIT-SHM（ctypes，不依赖额外的Python包）----
+
+_ZPIXMAP = 2
+_ALL_PLANES = ctypes.c_ulong(~0).value
+_IPC_PRIVATE = 0
+_IPC_CREAT = 0o1000
+_IPC_RMID = 0
+
+
+class _XImage(ctypes.Structure):
+    _fields_ = [
+        ("width", ctypes.c_int), ("height", ctypes.c_int), ("xoffset", ctypes.c_int),
+        ("format", ctypes.c_int), ("data", ctypes.c_void_p), ("byte_order", ctypes.c_int),
+        ("bitmap_unit", ctypes.c_int), ("bitmap_bit_order", ctypes.c_int), ("bitmap_pad", ctypes.c_int),
+        ("depth", ctypes.c_int), ("bytes_per_line", ctypes.c_int), ("bits_per_pixel", ctypes.c_int),
+        ("red_mask", ctypes.c_ulong), ("green_mask", ctypes.c_ulong), ("blue_mask", ctypes.c_ulong),
+        ("obdata", ctypes.c_void_p), ("f", ctypes.c_void_p * 6),
+    ]
+
+
+class _XShmSegmentInfo(ctypes.Structure):
+    _fields_ = [
+        ("shmseg", ctypes.c_ulong), ("shmid", ctypes.c_int),
+        ("shmaddr", ctypes.c_void_p), ("readOnly", ctypes.c_int),
+    ]
+
+
+class _XErrorEvent(ctypes.Structure):
+    _fields_ = [
+        ("type", ctypes.c_int), ("display", ctypes.c_void_p), ("resourceid", ctypes.c_ulong),
+        ("serial", ctypes.c_ulong), ("error_code", ctypes.c_ubyte), ("request_code", ctypes.c_ubyte),
+        ("minor_code", ctypes.c_ubyte),
+    ]
+
+
+_XErrorHandler = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p, ctypes.POINTER(_XErrorEvent))
+_x11 = None
+_x_errors: List[int] = []
+
+
+def _x_error_handler(display, event) -> int:
+    # Xlib 默认的错误处理会直接退出进程，这里只记下来，由调用方抛异常
+    _x_errors.append(event.contents.error_code)
+    return 0
+
+
+_x_error_handler_ref = _XErrorHandler(_x_error_handler)
+
+
+def _load_x11():
+    """加载 libX11 / libXext / libc 并声明用到的函数签名（只做一次）"""
+    global _x11
+    if _x11 is not None:
+        return _x11
+    names = {lib: ctypes.util.find_library(lib) for lib in ("X11", "Xext", "c")}
+    missing = [lib for lib, path in names.items() if not path]
+    if missing:
+        raise OSError(f"找不到动态库: {', '.join('lib' + lib for lib in missing)}")
+    xlib, xext, libc = (ctypes.CDLL(names[lib], use_errno=True) for lib in ("X11", "Xext", "c"))
+
+    def declare(lib, name, restype, *argtypes):
+        function = getattr(lib, name)
+        function.restype = restype
+        function.argtypes = argtypes
+
+    p, u, i, ul = ctypes.c_void_p, ctypes.c_uint, ctypes.c_int, ctypes.c_ulong
+    declare(xlib, "XOpenDisplay", p, ctypes.c_char_p)
+    declare(xlib, "XCloseDisplay", i, p)
+    declare(xlib, "XDefaultScreen", i, p)
+    declare(xlib, "XRootWindow", ul, p, i)
+    declare(xlib, "XDefaultVisual", p, p, i)
+    declare(xlib, "XDefaultDepth", i, p, i)
+    declare(xlib, "XSync", i, p, i)
+    declare(xlib, "XDestroyImage", i, ctypes.POINTER(_XImage))
+    declare(xlib, "XSetErrorHandler", p, _XErrorHandler)
+    declare(xext, "XShmQueryExtension", i, p)
+    declare(xext, "XShmCreateImage", ctypes.POINTER(_XImage),
+            p, p, u, i, p, ctypes.POINTER(_XShmSegmentInfo), u, u)
+    declare(xext, "XShmAttach", i, p, ctypes.POINTER(_XShmSegmentInfo))
+    declare(xext, "XShmDetach", i, p, ctypes.POINTER(_XShmSegmentInfo))
+    declare(xext, "XShmGetImage", i, p, ul, ctypes.POINTER(_XImage), i, i, ul)
+    declare(libc, "shmget", i, i, ctypes.c_size_t, i)
+    declare(libc, "shmat", p, i, p, i)
+    declare(libc, "shmdt", i, p)
+    declare(libc, "shmctl", i, i, i, p)
+
+    xlib.XSetErrorHandler(_x_error_handler_ref)
+    _x11 = (xlib, xext, libc)
+    return _x11
+
+
+class XShmBackend(CaptureBackend):
+    """X11 MIT-SHM 共享内存抓屏（只支持24/32位色深的ZPixmap，也就是几乎所有桌面）"""
+
+    name = "xshm"
+
+    def __init__(self, monitor: Dict[str, int], framerate: int = 60):
+        super().__init__(monitor, framerate)
+        self.xlib, self.xext, self.libc = _load_x11()
+        self.display = self.xlib.XOpenDisplay(None)
+        if not self.display:
+            raise RuntimeError(f"无法连接X服务器（DISPLAY={os.environ.get('DISPLAY')}）")
+        if not self.xext.XShmQueryExtension(self.display):
+            self.xlib.XCloseDisplay(self.display)
+            raise RuntimeError("X服务器不支持 MIT-SHM 扩展")
+        screen = self.xlib.XDefaultScreen(self.display)
+        self.root = self.xlib.XRootWindow(self.display, screen)
+        self.visual = self.xlib.XDefaultVisual(self.display, screen)
+        self.depth = self.xlib.XDefaultDepth(self.display, screen)
+        self.image = None
+        self.segment = None
+        self._array = None
+        try:
+            self._create_image()
+        except Exception:
+            self.xlib.XCloseDisplay(self.display)
+            raise
+
+    @classmethod
+    def available(cls) -> Tuple[bool, str]:
+        if not sys.platform.startswith("linux"):
+            return False, "只支持Linux"
+        if not os.environ.get("DISPLAY"):
+            return False, "没有设置DISPLAY（Wayland会话请用 mss 或 XWayland）"
+        if not all(ctypes.util.find_library(lib) for lib in ("X11", "Xext")):
+            return False, "没有安装 libX11 / libXext"
+        return True, ""
+
+    def _create_image(self):
+        """按当前区域创建共享内存图像，数组直接指向共享内存"""
+        width, height = self.monitor["width"], self.monitor["height"]
+        segment = _XShmSegmentInfo()
+        image = self.xext.XShmCreateImage(
+            self.display, self.visual, self.depth, _ZPIXMAP, None, ctypes.byref(segment), width, height
+        )
+        if not image:
+            raise RuntimeError("XShmCreateImage 失败")
+        if image.contents.bits_per_pixel != 32:
+            self.xlib.XDestroyImage(image)
+            raise RuntimeError(f"不支持 {image.contents.bits_per_pixel} 位像素（需要24/32位色深）")
+        size = image.contents.bytes_per_line * height
+        segment.shmid = self.libc.shmget(_IPC_PRIVATE, size, _IPC_CREAT | 0o600)
+        if segment.shmid < 0:
+            self.xlib.XDestroyImage(image)
+            raise OSError(ctypes.get_errno(), "shmget 失败")
+        address = self.libc.shmat(segment.shmid, None, 0)
+        if address in (None, ctypes.c_void_p(-1).value):
+            self.libc.shmctl(segment.shmid, _IPC_RMID, None)
+            self.xlib.XDestroyImage(image)
+            raise OSError(ctypes.get_errno(), "shmat 失败")
+        segment.shmaddr = address
+        segment.readOnly = 0
+        image.contents.data = address
+
+        _x_errors.clear()
+        attached = self.xext.XShmAttach(self.display, ctypes.byref(segment))
+        self.xlib.XSync(self.display, 0)
+        # 两边都挂上以后就可以标记删除，进程退出（哪怕崩溃）时内核会回收这段共享内存
+        self.libc.shmctl(segment.shmid, _IPC_RMID, None)
+        if not attached or _x_errors:
+            self.libc.shmdt(address)
+            self.xlib.XDestroyImage(image)
+            raise RuntimeError("XShmAttach 失败（远程X连接不支持共享内存）")
+
+        self.image, self.segment = image, segment
+        raw = np.frombuffer((ctypes.c_ubyte * size).from_address(address), dtype=np.uint8)
+        bytes_per_line = image.contents.bytes_per_line
+        self._array = raw.reshape(height, bytes_per_line)[:, :width * 4].reshape(height, width, 4)
+
+    def _destroy_image(self):
+        if self.image is None:
+            return
+        self._array = None
+        self.xext.XShmDetach(self.display, ctypes.byref(self.segment))
+        self.xlib.XSync(self.display, 0)
+        self.libc.shmdt(self.segment.shmaddr)
+        self.xlib.XDestroyImage(self.image)
+        self.image = self.segment = None
+
+    def grab(self) -> np.ndarray:
+        _x_errors.clear()
+        ok = self.xext.XShmGetImage(
+            self.display, self.root, self.image, self.monitor["left"], self.monitor["top"], _ALL_PLANES
+        )
+        if not ok or _x_errors:
+            raise RuntimeError(f"XShmGetImage 失败（捕获区域 {self.monitor} 超出屏幕？）")
+        return self._array
+
+    def set_region(self, monitor: Dict[str, int]):
+        resized = (monitor["width"], monitor["height"]) != (self.monitor["width"], self.monitor["height"])
+        super().set_region(monitor)
+        if resized:
+            self._destroy_image()
+            self._create_image()
+
+    def close(self):
+        if self.display:
+            self._destroy_image()
+            self.xlib.XCloseDisplay(self.display)
+            self.display = None
+
+
+class FfmpegBackend(CaptureBackend):
+    """
+    ffmpeg x11grab 子进程：后台线程不停读取原始帧，grab() 取最新的一帧
+    （三块缓冲区轮换：一块正在写、一块是最新的、一块借给了调用方）
+    """
+
+    name = "ffmpeg"
+    continuous = True
+
+    # 等第一帧的最长时间（秒），ffmpeg启动要一会儿
+    FIRST_FRAME_TIMEOUT = 5.0
+
+    def __init__(self, monitor: Dict[str, int], framerate: int = 60):
+        super().__init__(monitor, framerate)
+        self._process = None
+        self._reader = None
+        self._start()
+
+    @classmethod
+    def available(cls) -> Tuple[bool, str]:
+        if not sys.platform.startswith("linux"):
+            return False, "只支持Linux（x11grab）"
+        if not os.environ.get("DISPLAY"):
+            return False, "没有设置DISPLAY"
+        if shutil.which("ffmpeg") is None:
+            return False, "没有找到ffmpeg"
+        return True, ""
+
+    def _start(self):
+        width, height = self.monitor["width"], self.monitor["height"]
+        self._buffers = [np.empty((height, width, 3), np.uint8) for _ in range(3)]
+        self._cond = threading.Condition()
+        self._latest = None   # 最新完整帧的缓冲区下标
+        self._latest_time = 0.0  # 最新完整帧读完的时间（perf_counter）
+        self._handed = None   # 借给调用方的缓冲区下标
+        self._fresh = False
+        self._error = None
+        self._stopped = False
+        command = [
+            "ffmpeg", "-loglevel", "error", "-nostdin",
+            "-f", "x11grab", "-draw_mouse", "0", "-framerate", str(self.framerate),
+            "-video_size", f"{width}x{height}",
+            "-i", f"{os.environ.get('DISPLAY', ':0')}+{self.monitor['left']},{self.monitor['top']}",
+            "-pix_fmt", "bgr24", "-f", "rawvideo", "-",
+        ]
+        self._process = subprocess.Popen(
+            command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=0
+        )
+        self._reader = threading.Thread(target=self._read_loop, name="ffmpeg-capture", daemon=True)
+        self._reader.start()
+
+    def _read_loop(self):
+        process = self._process
+        stdout = process.stdout
+        write_index = 0
+        while not self._stopped:
+            view = memoryview(self._buffers[write_index]).cast("B")
+            filled = 0
+            while filled < len(view):
+                count = stdout.readinto(view[filled:])
+                if not count:
+                    break
+                filled += count
+            if filled < len(view):
+                if self._stopped:
+                    return
+                stderr = process.stderr.read().decode("utf-8", "replace").strip()
+                with self._cond:
+                    self._error = stderr.splitlines()[-1] if stderr else "ffmpeg 提前退出"
+                    self._cond.notify_all()
+                return
+            with self._cond:
+                self._latest = write_index
+                self._latest_time = time.perf_counter()
+                self._fresh = True
+                write_index = ({0, 1, 2} - {self._latest, self._handed}).pop()
+                self._cond.notify_all()
+
+    def _take(self, wait_fresh: bool) -> Tuple[np.ndarray, float]:
+        """借出最新的一帧；wait_fresh 时先等新帧（最多两帧的时间）"""
+        with self._cond:
+            if self._latest is None:
+                timeout = self.FIRST_FRAME_TIMEOUT
+            else:
+                timeout = 2.0 / self.framerate if wait_fresh else 0.0
+            if timeout > 0:
+                self._cond.wait_for(
+                    lambda: (self._fresh if wait_fresh else self._latest is not None) or self._error is not None,
+                    timeout
+                )
+            if self._error is not None or self._latest is None:
+                raise RuntimeError(f"ffmpeg x11grab 停止了: {self._error or '等第一帧超时'}")
+            self._handed = self._latest
+            self._fresh = False
+            return self._buffers[self._handed], self._latest_time
+
+    def grab(self) -> np.ndarray:
+        # 没有新帧时最多等两帧的时间，还没有就返回上一帧（不让捕获线程卡住）
+        return self._take(wait_fresh=True)[0]
+
+    def latest(self) -> Tuple[np.ndarray, float]:
+        # 不等新帧；读完时画面已经在 x11grab 采样 + 管道里走了差不多一个帧周期
+        frame, arrived = self._take(wait_fresh=False)
+        return frame, arrived - 1.0 / self.framerate
+
+    def background_cpu_seconds(self) -> float:
+        if self._process is None:
+            return 0.0
+        return _process_cpu_seconds(self._process.pid)
+
+    def set_region(self, monitor: Dict[str, int]):
+        super().set_region(monitor)
+        self.close()
+        self._start()
+
+    def close(self):
+        self._stopped = True
+        if self._process is None:
+            return
+        self._process.kill()
+        self._process.wait()
+        if self._reader is not None:
+            self._reader.join(timeout=1.0)
+            self._reader = None
+        self._process.stdout.close()
+        self._process.stderr.close()
+        self._process = None
+
+
+def _process_cpu_seconds(pid: int) -> float:
+    """从 /proc/<pid>/stat 读取某个进程用掉的CPU时间（utime + stime），读不到时返回0"""
+    try:
+        with open(f"/proc/{pid}/stat", "r") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+# 后端注册表（"auto" 按这个顺序探测）
+CAPTURE_BACKENDS = {
+    "mss": MssBackend,
+    "xshm": XShmBackend,
+    "ffmpeg": FfmpegBackend,
+}
+
+
+def create_backend(name: str, monitor: Dict[str, int], framerate: int = 60) -> CaptureBackend:
+    """
+    按名字创建捕获后端
+
+    Args:
+        name: CAPTURE_BACKENDS 里的名字
+        monitor: 捕获区域
+        framerate: 期望的抓取帧率
+
+    Returns:
+        捕获后端
+    """
+    if name not in CAPTURE_BACKENDS:
+        raise ValueError(f"未知的捕获后端 {name}（可选: {', '.join(CAPTURE_BACKENDS)}）")
+    return CAPTURE_BACKENDS[name](monitor, framerate)
+
+
+def probe_backend(backend: CaptureBackend, grabs: int = 20, warmup: int = 3) -> Dict[str, float]:
+    """
+    给一个后端计时，每次都和 ScreenCapture.capture 做一样的事：latest() 取帧并转成BGR
+
+    帧龄（age）= latest() 给出的采样时间到BGR帧就绪，这是"auto"比较的指标
+    （每次取帧前在一帧周期内随机等一下，持续抓取的后端不会总是刚好赶上新帧）
+    开销（cost）= 取帧 + 转BGR本身花的时间；cpu = 每帧的CPU时间（包括后端的子进程）
+
+    Args:
+        backend: 捕获后端
+        grabs: 计时的抓取次数
+        warmup: 预热次数
+
+    Returns:
+        {age_p50_ms, age_p95_ms, cost_p50_ms, cost_p95_ms, cpu_ms_per_frame}
+    """
+    height, width = backend.monitor["height"], backend.monitor["width"]
+    frame = np.empty((height, width, 3), np.uint8)
+    rng = np.random.default_rng(0)
+    ages, costs = [], []
+    cpu_start = background_start = 0.0
+    for i in range(warmup + grabs):
+        if i == warmup:
+            cpu_start, background_start = time.process_time(), backend.background_cpu_seconds()
+        time.sleep(rng.uniform(0, 1.0 / backend.framerate))
+        start = time.perf_counter()
+        raw, sampled = backend.latest()
+        if raw.shape[:2] != (height, width):
+            raise RuntimeError(f"画面尺寸 {raw.shape[1]}x{raw.shape[0]} 和捕获区域 {width}x{height} 不一致")
+        if raw.shape[2] == 4:
+            cv2.cvtColor(raw, cv2.COLOR_BGRA2BGR, dst=frame)
+        else:
+            np.copyto(frame, raw)
+        end = time.perf_counter()
+        if i >= warmup:
+            ages.append(end - sampled)
+            costs.append(end - start)
+    cpu = (time.process_time() - cpu_start) + (backend.background_cpu_seconds() - background_start)
+    ages_ms, costs_ms = np.asarray(ages) * 1000, np.asarray(costs) * 1000
+    return {
+        "age_p50_ms": float(np.percentile(ages_ms, 50)),
+        "age_p95_ms": float(np.percentile(ages_ms, 95)),
+        "cost_p50_ms": float(np.percentile(costs_ms, 50)),
+        "cost_p95_ms": float(np.percentile(costs_ms, 95)),
+        "cpu_ms_per_frame": cpu * 1000 / grabs,
+    }
+
+
+def probe_backends(
+    monitor: Dict[str, int],
+    names: Optional[Sequence[str]] = None,
+    grabs: int = 20,
+    keep_best: bool = False,
+    framerate: int = 60
+) -> Tuple[List[Dict], Optional[CaptureBackend]]:
+    """
+    探测各个后端：能不能用、帧龄和开销（见 probe_backend）
+
+    Args:
+        monitor: 捕获区域
+        names: 要探测的后端，None表示全部
+        grabs: 每个后端计时的抓取次数
+        keep_best: 是否保留帧龄中位数最小的后端实例（其余的都会关掉）
+        framerate: 期望的抓取帧率
+
+    Returns:
+        (每个后端一条结果 {backend, available, error?, age_p50_ms?, ...}, 最快的后端或None)
+    """
+    results = []
+    best, best_p50 = None, float("inf")
+    for name in names or CAPTURE_BACKENDS:
+        usable, reason = CAPTURE_BACKENDS[name].available()
+        if not usable:
+            results.append({"backend": name, "available": False, "error": reason})
+            continue
+        backend = None
+        try:
+            backend = create_backend(name, monitor, framerate)
+            timing = probe_backend(backend, grabs)
+        except Exception as e:
+            if backend is not None:
+                backend.close()
+            results.append({"backend": name, "available": False, "error": str(e)})
+            continue
+        results.append({"backend": name, "available": True, **timing})
+        if keep_best and timing["age_p50_ms"] < best_p50:
+            if best is not None:
+                best.close()
+            best, best_p50 = backend, timing["age_p50_ms"]
+        else:
+            backend.close()
+    return results, best
+
+
+def select_backend(name: str, monitor: Dict[str, int], grabs: int = 20, framerate: int = 60) -> CaptureBackend:
+    """
+    按配置选出捕获后端
+
+    Args:
+        name: "auto" 或 CAPTURE_BACKENDS 里的名字
+        monitor: 捕获区域
+        grabs: "auto" 时每个后端计时的抓取次数
+        framerate: 期望的抓取帧率
+
+    Returns:
+        捕获后端（"auto" 时是帧龄中位数最小的那个）
+    """
+    if name != "auto":
+        return create_backend(name, monitor, framerate)
+    candidates = [n for n, backend_class in CAPTURE_BACKENDS.items() if backend_class.available()[0]]
+    if len(candidates) == 1:
+        return create_backend(candidates[0], monitor, framerate)
+
+    results, best = probe_backends(monitor, candidates, grabs, keep_best=True, framerate=framerate)
+    summary = " | ".join(
+        f"{r['backend']} 帧龄 {r['age_p50_ms']:.1f} ms" if r["available"] else f"{r['backend']} 不可用（{r['error']}）"
+        for r in results
+    )
+    default_logger.info(f"📸 捕获后端探测: {summary}")
+    if best is None:
+        raise RuntimeError(f"没有可用的捕获后端: {summary}")
+    default_logger.info(f"📸 使用捕获后端: {best.name}")
+    return best
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """命令行参数"""
+    parser = argparse.ArgumentParser(prog="main.py capture-probe", description="探测各个捕获后端的帧龄和开销 喵~")
+    parser.add_argument("--region", type=int, nargs=4, default=None, metavar=("LEFT", "TOP", "WIDTH", "HEIGHT"),
+                        help="捕获区域（默认主显示器）")
+    parser.add_argument("--backends", nargs="+", default=None, choices=list(CAPTURE_BACKENDS),
+                        help="要探测的后端（默认全部）")
+    parser.add_argument("--grabs", type=int, default=50, help="每个后端计时的抓取次数")
+    parser.add_argument("--framerate", type=int, default=60, help="ffmpeg x11grab 的抓取帧率")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    捕获后端探测命令入口
+
+    Returns:
+        进程退出码（没有任何可用后端时为1）
+    """
+    args = build_parser().parse_args(argv)
+    if args.region:
+        left, top, width, height = args.region
+        monitor = {"top": top, "left": left, "width": width, "height": height}
+    else:
+        monitor = primary_monitor()
+    results, _ = probe_backends(monitor, args.backends, args.grabs, framerate=args.framerate)
+    for r in results:
+        if r["available"]:
+            default_logger.info(
+                f"📸 {r['backend']}: 帧龄 p50 {r['age_p50_ms']:.2f} / p95 {r['age_p95_ms']:.2f} ms | "
+                f"开销 p50 {r['cost_p50_ms']:.2f} ms | CPU {r['cpu_ms_per_frame']:.2f} ms/帧"
+            )
+        else:
+            default_logger.info(f"📸 {r['backend']}: 不可用（{r['error']}）")
+    print(json.dumps({"monitor": monitor, "results": results}, indent=2, ensure_ascii=False))
+    return 0 if any(r["available"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
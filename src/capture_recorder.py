@@ -0,0 +1,317 @@
+"""
+捕获录制模块 - 喵把主人屏幕上的每一帧都存下来，之后原样回放~ 🎀
+CaptureRecorder 包装 ScreenCapture，在后台线程把帧压缩写盘（内存占用有上限）；
+CaptureReplayer 读取录制结果，按原始节奏把帧重新送进流水线，用来复现性能问题和回归测试
+
+目录布局:
+    <dir>/meta.json    格式、捕获区域、帧数等元信息
+    <dir>/frames.bin   逐帧压缩后的数据（JPEG或无损PNG）首尾相接
+    <dir>/index.bin    每帧一条索引（INDEX_DTYPE）：时间戳 + 偏移 + 长度
+"""
+import json
+import mmap
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+import cv2
+import numpy as np
+from .buffer_pool import default_buffer_pool
+from .logger import default_logger
+
+INDEX_DTYPE = np.dtype([
+    ("timestamp", "<f8"),
+    ("offset", "<u8"),
+    ("length", "<u4"),
+])
+
+FORMATS = {
+    "jpg": (".jpg", cv2.IMWRITE_JPEG_QUALITY),
+    "png": (".png", cv2.IMWRITE_PNG_COMPRESSION),  # 无损
+}
+
+
+class CaptureRecorder:
+    """
+    捕获录制器 (｡♥‿♥｡)
+    用法和 ScreenCapture 一样，capture() 返回画面的同时把它排进写盘队列~
+    队列按字节数限制内存，写不过来时丢帧并计数，绝不阻塞帧循环
+    （捕获的帧处理完就会被缓冲池复用，所以排队的是从缓冲池借来的拷贝，写完再还回去）
+    """
+
+    def __init__(
+        self,
+        capture,
+        path: str,
+        fmt: str = "jpg",
+        quality: int = 90,
+        max_buffer_mb: int = 256
+    ):
+        """
+        初始化录制器
+
+        Args:
+            capture: 被包装的捕获器（ScreenCapture或兼容对象）
+            path: 录制目录
+            fmt: 帧格式，"jpg"（有损，快且小）或 "png"（无损）
+            quality: JPEG质量（0-100）；PNG时表示压缩级别（0-9，越小越快）
+            max_buffer_mb: 等待写盘的帧最多占用的内存（MB）
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"不支持的录制格式: {fmt}")
+        self.capture_source = capture
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.fmt = fmt
+        extension, param = FORMATS[fmt]
+        self._extension = extension
+        self._encode_params = [param, quality if fmt == "jpg" else min(quality, 9)]
+        self.max_buffer_bytes = max_buffer_mb * 1024 * 1024
+
+        self._frames_file = open(self.path / "frames.bin", "wb")
+        self._index_file = open(self.path / "index.bin", "wb")
+        self._offset = 0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._buffered_bytes = 0
+        self._buffer_lock = threading.Lock()
+        self.recorded_frames = 0
+        self.dropped_frames = 0
+        self.encoded_bytes = 0
+        self._start_time = time.time()
+
+        self._thread = threading.Thread(target=self._writer_loop, name="CaptureRecorder", daemon=True)
+        self._thread.start()
+        default_logger.info(f"捕获录制: {self.path} ({fmt}, 缓冲上限 {max_buffer_mb} MB)")
+
+    @property
+    def monitor(self) -> dict:
+        """捕获区域（与 ScreenCapture 保持一致）"""
+        return self.capture_source.monitor
+
+    def capture(self) -> np.ndarray:
+        """
+        捕获当前屏幕画面并排队写盘
+
+        Returns:
+            numpy数组格式的屏幕画面 (BGR格式)
+        """
+        frame = self.capture_source.capture()
+        timestamp = time.time()
+        with self._buffer_lock:
+            if self._buffered_bytes + frame.nbytes > self.max_buffer_bytes:
+                self.dropped_frames += 1
+                return frame
+            self._buffered_bytes += frame.nbytes
+        queued = default_buffer_pool.acquire(frame.shape, frame.dtype)
+        np.copyto(queued, frame)
+        self._queue.put((timestamp, queued))
+        return frame
+
+    def release(self, frame: np.ndarray):
+        """帧处理完了，交给被包装的捕获器归还缓冲区"""
+        if hasattr(self.capture_source, "release"):
+            self.capture_source.release(frame)
+
+    def get_monitor_size(self) -> Tuple[int, int]:
+        """获取当前监控区域的尺寸"""
+        return self.capture_source.get_monitor_size()
+
+    def set_monitor_region(self, top: int, left: int, width: int, height: int):
+        """设置屏幕捕获区域"""
+        self.capture_source.set_monitor_region(top, left, width, height)
+
+    def queue_depth(self) -> int:
+        """当前排队等待写盘的帧数"""
+        return self._queue.qsize()
+
+    def close(self):
+        """写完剩下的帧并关闭文件"""
+        self._queue.put(None)
+        self._thread.join()
+        self._frames_file.close()
+        self._index_file.close()
+        self._write_meta()
+        elapsed = max(time.time() - self._start_time, 1e-6)
+        default_logger.info(
+            f"捕获录制结束: {self.recorded_frames} 帧 | 丢弃 {self.dropped_frames} 帧 | "
+            f"{self.encoded_bytes / 1024 / 1024:.1f} MB ({self.encoded_bytes / elapsed / 1024 / 1024:.1f} MB/s)"
+        )
+
+    def _writer_loop(self):
+        """后台写盘线程：编码 -> 追加数据 -> 追加索引"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            timestamp, frame = item
+            ok, encoded = cv2.imencode(self._extension, frame, self._encode_params)
+            default_buffer_pool.release(frame)
+            with self._buffer_lock:
+                self._buffered_bytes -= frame.nbytes
+            if not ok:
+                self.dropped_frames += 1
+                continue
+            data = encoded.tobytes()
+            self._frames_file.write(data)
+            self._index_file.write(
+                np.array([(timestamp, self._offset, len(data))], dtype=INDEX_DTYPE).tobytes()
+            )
+            self._offset += len(data)
+            self.encoded_bytes += len(data)
+            self.recorded_frames += 1
+            if self.recorded_frames == 1:
+                self._write_meta(frame.shape)
+
+    def _write_meta(self, shape: Optional[Tuple[int, ...]] = None):
+        """写入元信息"""
+        meta_path = self.path / "meta.json"
+        meta = {}
+        if meta_path.exists():
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        meta.update({
+            "format": self.fmt,
+            "monitor": dict(self.monitor),
+            "start_time": self._start_time,
+            "frames": self.recorded_frames,
+            "dropped": self.dropped_frames,
+        })
+        if shape is not None:
+            meta["shape"] = list(shape)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+
+class CaptureReplayer:
+    """
+    捕获回放器 (｡♥‿♥｡)
+    用法和 ScreenCapture 一样，可以直接传给 ScreenMonitorApp~
+
+    节奏模式：
+        "original" 严格按录制时的间隔逐帧返回（流水线快了就等一等）
+        "realtime" 按墙上时钟返回当前应该显示的那一帧（流水线慢了就跳帧）
+        "none"     不控制节奏，尽快逐帧返回（适合基准测试）
+    """
+
+    PACINGS = ("original", "realtime", "none")
+
+    def __init__(self, path: str, pacing: str = "original", loop: bool = False, speed: float = 1.0):
+        """
+        打开录制目录
+
+        Args:
+            path: 录制目录
+            pacing: 节奏模式
+            loop: 播放完是否从头循环
+            speed: 回放速度倍率
+        """
+        if pacing not in self.PACINGS:
+            raise ValueError(f"未知的回放节奏: {pacing}")
+        self.path = Path(path)
+        self.pacing = pacing
+        self.loop = loop
+        self.speed = speed
+
+        with open(self.path / "meta.json", "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.monitor = self.meta.get("monitor") or {}
+
+        index_size = os.path.getsize(self.path / "index.bin")
+        self._index = np.fromfile(self.path / "index.bin", dtype=INDEX_DTYPE,
+                                  count=index_size // INDEX_DTYPE.itemsize)
+        if len(self._index) == 0:
+            raise ValueError(f"录制为空: {path}")
+        self._relative = self._index["timestamp"] - self._index["timestamp"][0]  # 相对第一帧的时间
+        self._frames_file = open(self.path / "frames.bin", "rb")
+        self._frames = mmap.mmap(self._frames_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self._position = 0
+        self._play_start: Optional[float] = None
+        self._last_frame: Optional[np.ndarray] = None
+        self.finished = False
+        default_logger.info(f"捕获回放: {path} ({len(self._index)} 帧, 节奏 {pacing})")
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @property
+    def duration(self) -> float:
+        """录制时长（第一帧到最后一帧，秒）"""
+        return float(self._relative[-1]) if len(self._relative) else 0.0
+
+    def decode(self, position: int) -> Tuple[float, np.ndarray]:
+        """
+        解码指定位置的帧
+
+        Args:
+            position: 帧序号
+
+        Returns:
+            (录制时间戳, BGR帧)
+        """
+        entry = self._index[position]
+        offset, length = int(entry["offset"]), int(entry["length"])
+        data = np.frombuffer(self._frames, dtype=np.uint8, count=length, offset=offset)
+        return float(entry["timestamp"]), cv2.imdecode(data, cv2.IMREAD_COLOR)
+
+    def __iter__(self) -> Iterator[Tuple[float, np.ndarray]]:
+        """不控制节奏地逐帧迭代 (时间戳, 帧)"""
+        for position in range(len(self._index)):
+            yield self.decode(position)
+
+    def capture(self) -> np.ndarray:
+        """
+        按节奏返回下一帧
+
+        Returns:
+            BGR帧（播放结束且不循环时一直返回最后一帧）
+        """
+        if self._position >= len(self._index):
+            if not self.loop:
+                if not self.finished:
+                    self.finished = True
+                    default_logger.info("捕获回放结束")
+                return self._last_frame
+            self._position = 0
+            self._play_start = None
+
+        now = time.perf_counter()
+        if self._play_start is None:
+            self._play_start = now - self._relative_time(self._position)
+
+        if self.pacing == "realtime":
+            # 跳到当前时刻应该显示的那一帧
+            elapsed = (now - self._play_start) * self.speed
+            target = np.searchsorted(self._relative, elapsed, side="right") - 1
+            self._position = int(min(max(target, self._position), len(self._index) - 1))
+        elif self.pacing == "original":
+            wait = self._play_start + self._relative_time(self._position) / self.speed - now
+            if wait > 0:
+                time.sleep(wait)
+
+        _, frame = self.decode(self._position)
+        self._position += 1
+        self._last_frame = frame
+        return frame
+
+    def _relative_time(self, position: int) -> float:
+        """某一帧相对第一帧的录制时间（秒）"""
+        return float(self._relative[position])
+
+    def get_monitor_size(self) -> Tuple[int, int]:
+        """录制时的捕获区域尺寸"""
+        if self.monitor:
+            return self.monitor["width"], self.monitor["height"]
+        height, width = self.meta["shape"][:2]
+        return width, height
+
+    def set_monitor_region(self, top: int, left: int, width: int, height: int):
+        """回放时捕获区域是固定的"""
+        default_logger.warning("回放模式不支持修改捕获区域")
+
+    def close(self):
+        """关闭文件"""
+        self._frames.close()
+        self._frames_file.close()
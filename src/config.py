@@ -1,9 +1,13 @@
 """
 配置文件 - 喵帮主人管理配置~ 🎀
 集中管理应用的所有配置参数
+可以保存成/读取自 JSON（装了PyYAML也支持YAML），配合 ConfigReloader 运行中热更新
 """
-from dataclasses import dataclass, field
-from typing import Optional, Tuple, List
+import json
+import typing
+from dataclasses import dataclass, field, fields, is_dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, List
 
 
 @dataclass
@@ -18,6 +22,50 @@ class ScreenConfig:
     # FPS限制
     fps_limit: int = 30
 
+    # 帧调度策略: "latency" 延迟优先（落后时跳帧，只处理最新画面）
+    #             "throughput" 吞吐优先（落后时补帧，尽量不丢帧）
+    frame_policy: str = "latency"
+
+    # 捕获后端: "auto" 启动时在捕获区域上给每个可用后端计时，选最快的
+    #           "mss" / "xshm"（X11共享内存）/ "ffmpeg"（ffmpeg x11grab子进程）
+    # 对比: python main.py capture-probe
+    capture_backend: str = "auto"
+
+
+@dataclass
+class SmootherConfig:
+    """检测平滑配置（避免检测框闪烁~）"""
+    # 平滑因子（0-1），越小越平滑
+    smooth_factor: float = 0.3
+
+    # 保留的历史帧数
+    history_size: int = 5
+
+    # 匹配相同目标的IOU阈值
+    iou_threshold: float = 0.5
+
+
+@dataclass
+class GovernorConfig:
+    """帧率调节配置（屏幕安静时自动降低帧率，省电~）"""
+    # 是否启用
+    enabled: bool = True
+
+    # 降速档帧率（画面静止或没有目标时）
+    reduced_fps: int = 10
+
+    # 空闲档帧率（画面静止且没有目标时）
+    idle_fps: int = 2
+
+    # 判定画面静止的平均像素差阈值（0-255）
+    static_threshold: float = 2.0
+
+    # 安静多少秒后降速
+    reduce_after: float = 1.0
+
+    # 静止且无目标多少秒后进入空闲
+    idle_after: float = 5.0
+
 
 @dataclass
 class DetectorConfig:
@@ -32,11 +80,22 @@ class DetectorConfig:
     # IOU阈值（用于非极大值抑制）
     iou_threshold: float = 0.45
 
+    # 推理输入尺寸（越小越快，小目标越容易漏检）
+    imgsz: int = 640
+
     # 要检测的特定类别（None表示检测所有类别）
     # 例如: [0] 只检测人，[0, 16] 检测人和狗
     # 类别索引参考: https://docs.ultralytics.com/datasets/detect/coco/#dataset-index
     classes: Optional[List[int]] = field(default_factory=lambda: [0])  # 默认只检测人
 
+    # 后处理方式: "ultralytics" 或 "numpy"
+    # numpy 先只看要检测的类别和置信度挑候选，再解码框、做NMS，结果和ultralytics一致（对比: python main.py postprocess）
+    postprocess: str = "ultralytics"
+
+    # 推理服务地址（设置后使用共享模型的 RemoteDetector，见 python main.py serve）
+    # 例如: "/tmp/yolo_inference.sock" 或 "127.0.0.1:9200"
+    server_address: Optional[str] = None
+
     # 是否显示置信度
     show_confidence: bool = True
 
@@ -44,6 +103,46 @@ class DetectorConfig:
     show_class_name: bool = True
 
 
+@dataclass
+class ThreadConfig:
+    """线程与CPU布局配置（各库的线程池别和捕获、覆盖层抢核心~ None表示保持库的默认值）"""
+    # torch 算子内部并行线程数（intra-op）
+    torch_threads: Optional[int] = None
+
+    # torch 算子之间并行线程数（inter-op，只能在启动时设置）
+    torch_interop_threads: Optional[int] = None
+
+    # OpenCV 线程数（颜色转换、缩放等），0表示单线程
+    opencv_threads: Optional[int] = None
+
+    # NumPy背后BLAS库的线程数（装了threadpoolctl时运行中也能生效）
+    blas_threads: Optional[int] = None
+
+    # 帧循环（捕获、推理、绘制）和torch计算线程绑定的CPU，例如 "2-7"（仅Linux）
+    pipeline_cpus: Optional[str] = None
+
+    # 后台线程（日志、录制、指标、热更新等）绑定的CPU，例如 "0-1"（仅Linux）
+    background_cpus: Optional[str] = None
+
+
+@dataclass
+class OverlayConfig:
+    """透明覆盖窗口配置 (｡♥‿♥｡)"""
+    # 渲染帧率（None表示跟随显示器刷新率，0表示关闭插值、检测完成才重绘）
+    # 渲染与检测解耦：检测10 FPS时画面依然可以按60 FPS平滑移动~
+    render_fps: Optional[int] = None
+
+    # 插值模式: "interpolate" 在最近两次跟踪状态之间插值（延迟一个检测周期，最平滑）
+    #           "extrapolate" 按速度向前外推（无额外延迟，快速变向时会有过冲）
+    interpolation: str = "interpolate"
+
+    # 外推时最多向前预测多少个检测周期
+    max_extrapolation: float = 1.0
+
+    # 标签精灵缓存的最大数量
+    label_cache_size: int = 256
+
+
 @dataclass
 class MouseConfig:
     """鼠标控制配置 (｡♥‿♥｡)"""
@@ -62,12 +161,161 @@ class MouseConfig:
     move_speed: int = 20
 
 
+@dataclass
+class MetricsConfig:
+    """指标导出配置（给Prometheus抓取用~）"""
+    # 是否启用本地HTTP指标服务
+    enabled: bool = False
+
+    # 监听地址（默认只允许本机访问）
+    host: str = "127.0.0.1"
+
+    # 监听端口
+    port: int = 9108
+
+
+@dataclass
+class CaptureRecordConfig:
+    """捕获录制/回放配置（复现线上性能问题用~）"""
+    # 是否录制捕获到的帧
+    enabled: bool = False
+
+    # 录制目录
+    path: str = "recordings/capture"
+
+    # 帧格式: "jpg"（有损，快且小）或 "png"（无损）
+    format: str = "jpg"
+
+    # JPEG质量（0-100）；PNG时表示压缩级别（0-9）
+    quality: int = 90
+
+    # 等待写盘的帧最多占用的内存（MB）
+    max_buffer_mb: int = 256
+
+    # 回放目录（设置后用录制的帧代替屏幕捕获）
+    replay_path: Optional[str] = None
+
+    # 回放节奏: "original" / "realtime" / "none"
+    replay_pacing: str = "original"
+
+    # 回放结束后是否循环
+    replay_loop: bool = False
+
+
+@dataclass
+class FrameBusConfig:
+    """共享内存帧总线配置（录制、调试可视化等其他进程零拷贝读取捕获的帧~）"""
+    # 是否把捕获的帧发布到帧总线
+    enabled: bool = False
+
+    # 共享内存名（消费者用 FrameBusReader(name) 挂载）
+    name: str = "yolo_monitor_frames"
+
+    # 环形槽位数
+    slots: int = 4
+
+    # 同时挂载的消费者上限
+    max_consumers: int = 16
+
+
+@dataclass
+class AnnotatedVideoConfig:
+    """标注视频导出配置（运行时把画好检测框的画面录成视频，绘制和编码都在后台线程~）"""
+    # 是否启用
+    enabled: bool = False
+
+    # 输出视频路径
+    path: str = "recordings/annotated.mp4"
+
+    # 编码器四字符码（"mp4v"、"avc1"、"MJPG" ...）
+    fourcc: str = "mp4v"
+
+    # 视频帧率（None表示使用 screen.fps_limit）
+    fps: Optional[float] = None
+
+    # 等待编码的最大帧数（满了就丢帧，不拖慢帧循环）
+    max_queue: int = 8
+
+
+@dataclass
+class BufferPoolConfig:
+    """帧缓冲池配置（捕获、录制、绘制复用整帧数组，减少内存分配~）"""
+    # 是否启用（关闭时每次都重新分配）
+    enabled: bool = True
+
+    # 缓冲池常驻内存上限（MB），包括借出中的和池里空闲的
+    max_mb: int = 512
+
+
+@dataclass
+class DetectionLogConfig:
+    """检测日志配置（把每帧的检测结果记录到紧凑的二进制文件~）"""
+    # 是否启用
+    enabled: bool = False
+
+    # 日志路径前缀（会生成 .bin / .idx / .classes.json）
+    path: str = "recordings/detections"
+
+    # 写入队列最多缓存的帧数
+    max_queue: int = 1024
+
+
+@dataclass
+class TracingConfig:
+    """追踪与剖析配置（也可以用环境变量 YOLO_TRACE=1 / YOLO_PROFILE_FRAMES=N 开启~）"""
+    # 是否记录Chrome trace事件
+    enabled: bool = False
+
+    # 环形缓冲区容量（事件数）
+    capacity: int = 200000
+
+    # 退出时是否自动导出追踪数据
+    dump_on_exit: bool = True
+
+    # 启动后对前N帧开启cProfile（0表示不剖析）
+    profile_frames: int = 0
+
+    # SIGUSR2触发时剖析的帧数
+    signal_profile_frames: int = 100
+
+    # 追踪/剖析文件输出目录
+    output_dir: str = "traces"
+
+
+@dataclass
+class HeadlessConfig:
+    """无界面模式配置（不加载PyQt5，检测结果交给输出模块~）"""
+    # 是否以无界面模式运行
+    enabled: bool = False
+
+    # 检测输出: "jsonl:<path>"（"jsonl:-" 为标准输出）或 "unix:<socket path>"
+    sinks: List[str] = field(default_factory=lambda: ["jsonl:recordings/detections.jsonl"])
+
+    # 处理这么多帧后退出，None表示一直运行
+    max_frames: Optional[int] = None
+
+
 @dataclass
 class AppConfig:
     """应用主配置"""
     screen: ScreenConfig = field(default_factory=ScreenConfig)
+    smoother: SmootherConfig = field(default_factory=SmootherConfig)
+    governor: GovernorConfig = field(default_factory=GovernorConfig)
     detector: DetectorConfig = field(default_factory=DetectorConfig)
+    threads: ThreadConfig = field(default_factory=ThreadConfig)
+    overlay: OverlayConfig = field(default_factory=OverlayConfig)
     mouse: MouseConfig = field(default_factory=MouseConfig)
+    metrics: MetricsConfig = field(default_factory=MetricsConfig)
+    tracing: TracingConfig = field(default_factory=TracingConfig)
+    detection_log: DetectionLogConfig = field(default_factory=DetectionLogConfig)
+    capture_record: CaptureRecordConfig = field(default_factory=CaptureRecordConfig)
+    headless: HeadlessConfig = field(default_factory=HeadlessConfig)
+    frame_bus: FrameBusConfig = field(default_factory=FrameBusConfig)
+    buffer_pool: BufferPoolConfig = field(default_factory=BufferPoolConfig)
+    annotated_video: AnnotatedVideoConfig = field(default_factory=AnnotatedVideoConfig)
+
+    # 性能档案名（python main.py tune 生成，启动时叠加到这份配置上）
+    profile: Optional[str] = None
 
     # 窗口名称
     window_name: str = "YOLO屏幕监控"
@@ -75,6 +323,114 @@ class AppConfig:
     # 是否在启动时显示模型信息
     show_model_info: bool = True
 
+    def to_dict(self) -> Dict[str, Any]:
+        """转换成只含基本类型的字典（可以直接存成JSON）"""
+        return _to_plain(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AppConfig":
+        """
+        从字典创建配置（缺少的字段用默认值，未知字段报错，避免拼写错误悄悄失效）
+
+        Args:
+            data: to_dict() 格式的字典，可以只包含部分字段
+
+        Returns:
+            AppConfig实例
+        """
+        return _from_plain(cls, data, "")
+
+    @classmethod
+    def load(cls, path: str) -> "AppConfig":
+        """
+        从配置文件加载（.json，或安装了PyYAML时的 .yaml/.yml）
+
+        Args:
+            path: 配置文件路径
+
+        Returns:
+            AppConfig实例
+        """
+        text = Path(path).read_text(encoding="utf-8")
+        if Path(path).suffix.lower() in (".yaml", ".yml"):
+            import yaml
+            data = yaml.safe_load(text) or {}
+        else:
+            data = json.loads(text) if text.strip() else {}
+        return cls.from_dict(data)
+
+    def with_profile(self, name: str, profile_dir: str = "profiles") -> "AppConfig":
+        """
+        叠加性能档案（档案里只记录调优过的字段，其余保持不变）
+
+        Args:
+            name: 档案名（profiles/<name>.json），也可以直接给文件路径
+            profile_dir: 档案目录
+
+        Returns:
+            新的AppConfig实例
+        """
+        path = Path(name) if name.endswith(".json") else Path(profile_dir) / f"{name}.json"
+        profile = json.loads(path.read_text(encoding="utf-8"))
+        return AppConfig.from_dict(_merge(self.to_dict(), profile.get("config", {})))
+
+    def save(self, path: str):
+        """
+        保存到JSON配置文件
+
+        Args:
+            path: 配置文件路径
+        """
+        Path(path).write_text(json.dumps(self.to_dict(), ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def _to_plain(value: Any) -> Any:
+    """dataclass/元组 -> 字典/列表"""
+    if is_dataclass(value):
+        return {f.name: _to_plain(getattr(value, f.name)) for f in fields(value)}
+    if isinstance(value, (list, tuple)):
+        return [_to_plain(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _to_plain(item) for key, item in value.items()}
+    return value
+
+
+def _merge(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
+    """递归合并字典（override优先）"""
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def _from_plain(cls, data: Dict[str, Any], prefix: str):
+    """字典 -> dataclass（按类型注解转换嵌套配置和元组）"""
+    if not isinstance(data, dict):
+        raise ValueError(f"配置项 {prefix or '根'} 应该是字典")
+    hints = typing.get_type_hints(cls)
+    names = {f.name for f in fields(cls)}
+    unknown = set(data) - names
+    if unknown:
+        raise ValueError(f"未知的配置项: {', '.join(prefix + name for name in sorted(unknown))}")
+
+    kwargs = {}
+    for name, value in data.items():
+        hint = hints[name]
+        if is_dataclass(hint):
+            kwargs[name] = _from_plain(hint, value, f"{prefix}{name}.")
+            continue
+        # Optional[Tuple[...]] / Tuple[...]：JSON里只有列表
+        args = [arg for arg in typing.get_args(hint) if arg is not type(None)]
+        origin = typing.get_origin(args[0]) if typing.get_origin(hint) is typing.Union and args \
+            else typing.get_origin(hint)
+        if origin is tuple and isinstance(value, list):
+            value = tuple(value)
+        kwargs[name] = value
+    return cls(**kwargs)
+
 
 # 默认配置实例
 default_config = AppConfig()
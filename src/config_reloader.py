@@ -0,0 +1,116 @@
+"""
+配置热更新模块 - 主人改了配置文件，喵不用重启就能跟上~ 🎀
+后台线程盯着配置文件（也可以发 SIGHUP 让喵立即重新读取），
+读到新配置后交给应用，由应用在两帧之间一次性应用
+"""
+import os
+import signal
+import threading
+from dataclasses import fields, is_dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+from .config import AppConfig
+from .logger import default_logger
+
+
+def diff_config(old: Any, new: Any, prefix: str = "") -> Dict[str, Tuple[Any, Any]]:
+    """
+    比较两份配置
+
+    Args:
+        old: 旧配置（dataclass）
+        new: 新配置（同类型的dataclass）
+        prefix: 字段名前缀（递归用）
+
+    Returns:
+        {"section.field": (旧值, 新值)}，只包含变化了的字段
+    """
+    changes = {}
+    for f in fields(old):
+        old_value, new_value = getattr(old, f.name), getattr(new, f.name)
+        if is_dataclass(old_value):
+            changes.update(diff_config(old_value, new_value, f"{prefix}{f.name}."))
+        elif old_value != new_value:
+            changes[f"{prefix}{f.name}"] = (old_value, new_value)
+    return changes
+
+
+class ConfigReloader:
+    """
+    配置文件监视器 (｡♥‿♥｡)
+    按修改时间和大小轮询（不依赖额外的库），文件写到一半读不出来时保留旧配置等下一次~
+    """
+
+    def __init__(
+        self,
+        path: str,
+        on_reload: Callable[[AppConfig], None],
+        poll_interval: float = 1.0
+    ):
+        """
+        初始化监视器
+
+        Args:
+            path: 配置文件路径
+            on_reload: 读到新配置时调用（在监视线程里调用，应用方负责切回帧循环）
+            poll_interval: 检查文件变化的间隔（秒）
+        """
+        self.path = path
+        self.on_reload = on_reload
+        self.poll_interval = poll_interval
+        self.reload_count = 0
+        self._signature = self._stat()
+        self._reload_requested = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _stat(self) -> Optional[Tuple[float, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def start(self):
+        """启动监视线程，并在支持的平台上用 SIGHUP 触发重新读取"""
+        self._thread = threading.Thread(target=self._watch_loop, name="ConfigReloader", daemon=True)
+        self._thread.start()
+        if hasattr(signal, "SIGHUP") and threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGHUP, lambda signum, frame: self.request_reload())
+        default_logger.info(f"配置热更新: 监视 {self.path}（修改文件或发送 SIGHUP 生效）")
+
+    def request_reload(self):
+        """要求立即重新读取（信号处理函数里也可以安全调用）"""
+        self._reload_requested.set()
+
+    def stop(self):
+        """停止监视"""
+        self._stopped.set()
+        self._reload_requested.set()
+
+    def _watch_loop(self):
+        while not self._stopped.is_set():
+            requested = self._reload_requested.wait(self.poll_interval)
+            if self._stopped.is_set():
+                break
+            self._reload_requested.clear()
+            signature = self._stat()
+            if signature is None or (signature == self._signature and not requested):
+                continue
+            self._signature = signature
+            self.reload()
+
+    def reload(self) -> bool:
+        """
+        读取配置文件并交给应用
+
+        Returns:
+            是否成功
+        """
+        try:
+            config = AppConfig.load(self.path)
+        except Exception as e:
+            default_logger.error(f"配置文件读取失败，继续使用旧配置: {e}")
+            return False
+        self.reload_count += 1
+        self.on_reload(config)
+        return True
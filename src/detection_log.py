@@ -0,0 +1,355 @@
+"""
+检测日志模块 - 喵把每一帧的检测结果都记下来~ 🎀
+定长记录的紧凑二进制文件 + 内存映射的时间索引，
+几小时的历史也能按时间段或类别在毫秒级查出来，写入在后台线程完成不拖慢帧循环
+
+文件布局:
+    <path>.bin   16字节文件头 + 定长检测记录（RECORD_DTYPE）
+    <path>.idx   每帧一条索引（INDEX_DTYPE）：时间戳 + 该帧第一条记录的序号
+    <path>.classes.json   类别ID -> 类别名
+"""
+import json
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from .yolo_detector import DetectionResult
+from .logger import default_logger
+
+MAGIC = b"YOLODET1"
+HEADER_SIZE = 16
+
+# 单条检测记录（小端、紧凑排列，每条36字节）
+RECORD_DTYPE = np.dtype([
+    ("timestamp", "<f8"),
+    ("x1", "<i4"),
+    ("y1", "<i4"),
+    ("x2", "<i4"),
+    ("y2", "<i4"),
+    ("confidence", "<f4"),
+    ("class_id", "<u2"),
+    ("reserved", "<u2"),
+    ("track_id", "<i4"),
+])
+
+# 帧索引（每个有检测的帧一条）
+INDEX_DTYPE = np.dtype([
+    ("timestamp", "<f8"),
+    ("first_record", "<u8"),
+])
+
+
+def _header() -> bytes:
+    """数据文件头：魔数 + 记录大小 + 保留字段"""
+    return MAGIC + np.array([RECORD_DTYPE.itemsize, 0], dtype="<u4").tobytes()
+
+
+def _indexed_extent(records: np.ndarray, index: np.ndarray) -> Tuple[int, int]:
+    """
+    算出已经写好索引的那部分：索引可能指到还没写完的记录，数据也可能比索引多出几帧
+
+    Args:
+        records: 数据文件里的全部完整记录
+        index: 索引文件里的全部完整索引
+
+    Returns:
+        (有效索引条数, 有效记录数)
+    """
+    # 数据先于索引写，但两个文件各自的缓冲区可能先后落盘，索引可能指到还没写完的记录
+    frames = int(np.searchsorted(index["first_record"], len(records), side="left"))
+    if not frames:
+        return 0, 0
+    # 最后一帧的记录一直延续到时间戳变了为止，后面的是没来得及写索引的帧
+    first = int(index["first_record"][frames - 1])
+    same_frame = records["timestamp"][first:] == index["timestamp"][frames - 1]
+    return frames, first + (int(np.argmin(same_frame)) if not same_frame.all() else len(same_frame))
+
+
+def _repair_tail(path: str) -> int:
+    """
+    崩溃后修复日志尾部：写了一半的记录、指向不完整记录的索引、没有索引的整条记录都截掉，
+    接着追加时才不会和残缺的字节错位
+
+    Args:
+        path: 日志路径前缀（不含扩展名）
+
+    Returns:
+        修复后的记录数
+    """
+    data_path, index_path = f"{path}.bin", f"{path}.idx"
+    record_count = (os.path.getsize(data_path) - HEADER_SIZE) // RECORD_DTYPE.itemsize
+    index_count = os.path.getsize(index_path) // INDEX_DTYPE.itemsize if os.path.exists(index_path) else 0
+    index = np.fromfile(index_path, dtype=INDEX_DTYPE, count=index_count) if index_count else \
+        np.zeros(0, dtype=INDEX_DTYPE)
+
+    if os.path.exists(index_path):
+        records = np.memmap(
+            data_path, dtype=RECORD_DTYPE, mode="r", offset=HEADER_SIZE, shape=(record_count,)
+        ) if record_count else np.zeros(0, dtype=RECORD_DTYPE)
+        frames, valid_records = _indexed_extent(records, index)
+        del records  # 截断前先放掉映射
+    else:
+        frames, valid_records = 0, record_count  # 没有索引文件可以对照，只去掉半条记录
+
+    data_size = HEADER_SIZE + valid_records * RECORD_DTYPE.itemsize
+    index_size = frames * INDEX_DTYPE.itemsize
+    if os.path.getsize(data_path) != data_size or (index_count and os.path.getsize(index_path) != index_size):
+        default_logger.warning(
+            f"检测日志 {data_path} 尾部不完整（上次没有正常关闭？），"
+            f"截掉 {os.path.getsize(data_path) - data_size} 字节数据和 {index_count - frames} 条索引"
+        )
+        os.truncate(data_path, data_size)
+        if os.path.exists(index_path):
+            os.truncate(index_path, index_size)
+    return valid_records
+
+
+class DetectionRecorder:
+    """
+    检测日志写入器 (｡♥‿♥｡)
+    帧循环里只把检测结果放进队列，编码和写盘都在后台线程~
+    """
+
+    def __init__(self, path: str, max_queue: int = 1024, flush_interval: float = 1.0):
+        """
+        初始化写入器（文件已存在时接着往后写）
+
+        Args:
+            path: 日志路径前缀（不含扩展名）
+            max_queue: 队列最多缓存的帧数，满了会丢帧并计数
+            flush_interval: 刷盘间隔（秒）
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        data_path = f"{path}.bin"
+        is_new = not os.path.exists(data_path) or os.path.getsize(data_path) == 0
+        self._record_count = 0
+        if not is_new:
+            with open(data_path, "rb") as f:
+                if f.read(len(MAGIC)) != MAGIC:
+                    raise ValueError(f"不是检测日志文件: {data_path}")
+            self._record_count = _repair_tail(path)
+        self._data_file = open(data_path, "ab")
+        if is_new:
+            self._data_file.write(_header())
+        self._index_file = open(f"{path}.idx", "ab")
+
+        self._classes_path = f"{path}.classes.json"
+        self._class_names: Dict[int, str] = {}
+        if os.path.exists(self._classes_path):
+            with open(self._classes_path, "r", encoding="utf-8") as f:
+                self._class_names = {int(k): v for k, v in json.load(f).items()}
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self.dropped_frames = 0
+        self.written_frames = 0
+        self._thread = threading.Thread(target=self._writer_loop, name="DetectionRecorder", daemon=True)
+        self._thread.start()
+        default_logger.info(f"检测日志: {data_path} (已有 {self._record_count} 条记录)")
+
+    def record(self, detections: List[DetectionResult], timestamp: Optional[float] = None):
+        """
+        记录一帧的检测结果（不阻塞）
+
+        Args:
+            detections: 检测结果列表
+            timestamp: 时间戳（Unix秒），None表示当前时间
+        """
+        if not detections:
+            return
+        try:
+            self._queue.put_nowait((time.time() if timestamp is None else timestamp, detections))
+        except queue.Full:
+            self.dropped_frames += 1
+
+    def queue_depth(self) -> int:
+        """当前排队等待写入的帧数"""
+        return self._queue.qsize()
+
+    def close(self):
+        """写完队列里剩下的数据并关闭文件"""
+        self._queue.put(None)
+        self._thread.join()
+        self._data_file.close()
+        self._index_file.close()
+        default_logger.info(
+            f"检测日志已关闭: 共 {self._record_count} 条记录 | 写入 {self.written_frames} 帧 | 丢弃 {self.dropped_frames} 帧"
+        )
+
+    def _writer_loop(self):
+        """后台写入线程"""
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                break
+            if item:
+                self._write_frame(*item)
+            if time.monotonic() - last_flush >= self.flush_interval:
+                self._flush()
+                last_flush = time.monotonic()
+        self._flush()
+
+    def _write_frame(self, timestamp: float, detections: List[DetectionResult]):
+        """把一帧编码成定长记录写入文件"""
+        records = np.zeros(len(detections), dtype=RECORD_DTYPE)
+        records["timestamp"] = timestamp
+        records["x1"], records["y1"], records["x2"], records["y2"] = np.array(
+            [d.box for d in detections], dtype=np.int32
+        ).T
+        records["confidence"] = [d.confidence for d in detections]
+        records["class_id"] = [d.class_id for d in detections]
+        records["track_id"] = [d.track_id for d in detections]
+
+        index = np.array([(timestamp, self._record_count)], dtype=INDEX_DTYPE)
+        self._data_file.write(records.tobytes())
+        self._index_file.write(index.tobytes())
+        self._record_count += len(records)
+        self.written_frames += 1
+
+        for d in detections:
+            if d.class_id not in self._class_names:
+                self._class_names[d.class_id] = d.class_name
+                self._write_class_names()
+
+    def _write_class_names(self):
+        """更新类别名文件"""
+        with open(self._classes_path, "w", encoding="utf-8") as f:
+            json.dump({str(k): v for k, v in sorted(self._class_names.items())}, f, ensure_ascii=False)
+
+    def _flush(self):
+        """刷盘（先写数据再写索引，读者看到的索引总能找到对应记录）"""
+        self._data_file.flush()
+        self._index_file.flush()
+
+
+class DetectionLogReader:
+    """
+    检测日志读取器 (｡♥‿♥｡)
+    数据和索引都是内存映射，查询只触碰需要的那一段~
+    """
+
+    def __init__(self, path: str):
+        """
+        打开检测日志
+
+        Args:
+            path: 日志路径前缀（不含扩展名）
+        """
+        self.path = path
+        with open(f"{path}.bin", "rb") as f:
+            header = f.read(HEADER_SIZE)
+        if header[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"不是检测日志文件: {path}.bin")
+        record_size = int(np.frombuffer(header[len(MAGIC):len(MAGIC) + 4], dtype="<u4")[0])
+        if record_size != RECORD_DTYPE.itemsize:
+            raise ValueError(f"记录大小不匹配: {record_size} != {RECORD_DTYPE.itemsize}")
+
+        self.class_names: Dict[int, str] = {}
+        self._records = np.zeros(0, dtype=RECORD_DTYPE)
+        self._index = np.zeros(0, dtype=INDEX_DTYPE)
+        self.refresh()
+
+    def refresh(self):
+        """重新映射文件（写入器还在追加时调用，就能看到新数据）"""
+        data_size = os.path.getsize(f"{self.path}.bin") - HEADER_SIZE
+        index_size = os.path.getsize(f"{self.path}.idx")
+        record_count = data_size // RECORD_DTYPE.itemsize
+        index_count = index_size // INDEX_DTYPE.itemsize
+
+        self._records = np.memmap(
+            f"{self.path}.bin", dtype=RECORD_DTYPE, mode="r", offset=HEADER_SIZE, shape=(record_count,)
+        ) if record_count else np.zeros(0, dtype=RECORD_DTYPE)
+        self._index = np.memmap(
+            f"{self.path}.idx", dtype=INDEX_DTYPE, mode="r", shape=(index_count,)
+        ) if index_count else np.zeros(0, dtype=INDEX_DTYPE)
+
+        # 只保留记录已经完整写入的索引，以及已经有索引的记录（写入器还没刷索引的帧下次再看）
+        frames, valid_records = _indexed_extent(self._records, self._index)
+        self._index = self._index[:frames]
+        self._records = self._records[:valid_records]
+
+        classes_path = f"{self.path}.classes.json"
+        if os.path.exists(classes_path):
+            with open(classes_path, "r", encoding="utf-8") as f:
+                self.class_names = {int(k): v for k, v in json.load(f).items()}
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def time_range(self) -> Optional[Tuple[float, float]]:
+        """
+        日志覆盖的时间范围
+
+        Returns:
+            (最早时间戳, 最晚时间戳)，空日志返回None
+        """
+        if not len(self._index):
+            return None
+        return float(self._index["timestamp"][0]), float(self._index["timestamp"][-1])
+
+    def query(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        class_id: Optional[int] = None,
+        track_id: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        按时间段/类别/跟踪ID查询记录
+
+        Args:
+            start: 起始时间戳（含），None表示最早
+            end: 结束时间戳（不含），None表示最晚
+            class_id: 只要这个类别
+            track_id: 只要这个跟踪目标
+
+        Returns:
+            RECORD_DTYPE结构化数组（拷贝，可以放心修改）
+        """
+        timestamps = self._index["timestamp"]
+        first = 0 if start is None else int(np.searchsorted(timestamps, start, side="left"))
+        last = len(timestamps) if end is None else int(np.searchsorted(timestamps, end, side="left"))
+        if first >= last:
+            return np.zeros(0, dtype=RECORD_DTYPE)
+
+        record_start = int(self._index["first_record"][first])
+        record_end = int(self._index["first_record"][last]) if last < len(timestamps) else len(self._records)
+        records = self._records[record_start:record_end]
+
+        mask = None
+        if class_id is not None:
+            mask = records["class_id"] == class_id
+        if track_id is not None:
+            track_mask = records["track_id"] == track_id
+            mask = track_mask if mask is None else mask & track_mask
+        return np.array(records if mask is None else records[mask])
+
+    def to_detections(self, records: np.ndarray) -> List[Tuple[float, DetectionResult]]:
+        """
+        把查询结果转换回 DetectionResult
+
+        Args:
+            records: query() 返回的记录
+
+        Returns:
+            [(时间戳, DetectionResult)]
+        """
+        return [
+            (float(r["timestamp"]), DetectionResult(
+                box=(int(r["x1"]), int(r["y1"]), int(r["x2"]), int(r["y2"])),
+                confidence=float(r["confidence"]),
+                class_id=int(r["class_id"]),
+                class_name=self.class_names.get(int(r["class_id"]), f"class_{int(r['class_id'])}"),
+                track_id=int(r["track_id"])
+            ))
+            for r in records
+        ]
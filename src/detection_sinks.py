@@ -0,0 +1,254 @@
+"""
+检测输出模块 - 喵把检测结果送到主人想要的地方~ 🎀
+无界面模式下代替覆盖层消费检测结果：回调函数、JSON Lines 文件、本地UNIX套接字广播
+（这个模块不依赖PyQt5，服务器上没有显示器也能用）
+
+每帧输出的消息格式:
+    {"frame": 帧序号, "timestamp": Unix秒, "latency_ms": 捕获到输出的延迟,
+     "detections": [{"box": [x1, y1, x2, y2], "confidence": ..., "class_id": ...,
+                     "class_name": ..., "track_id": ...}, ...]}
+"""
+import json
+import os
+import socket
+import sys
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from .yolo_detector import DetectionResult
+from .logger import default_logger
+
+
+def detection_to_dict(detection: DetectionResult) -> Dict:
+    """
+    把检测结果转换成可以JSON序列化的字典
+
+    Args:
+        detection: 检测结果
+
+    Returns:
+        字典
+    """
+    return {
+        "box": [int(v) for v in detection.box],
+        "confidence": round(float(detection.confidence), 4),
+        "class_id": int(detection.class_id),
+        "class_name": detection.class_name,
+        "track_id": int(detection.track_id),
+    }
+
+
+def build_message(frame_index: int, timestamp: float, detections: List[DetectionResult],
+                  latency: Optional[float] = None) -> Dict:
+    """
+    组装一帧的输出消息
+
+    Args:
+        frame_index: 帧序号
+        timestamp: 捕获时间（Unix秒）
+        detections: 检测结果列表
+        latency: 捕获到输出的延迟（秒）
+
+    Returns:
+        消息字典
+    """
+    message = {
+        "frame": frame_index,
+        "timestamp": timestamp,
+        "detections": [detection_to_dict(d) for d in detections],
+    }
+    if latency is not None:
+        message["latency_ms"] = round(latency * 1000, 3)
+    return message
+
+
+class DetectionSink:
+    """
+    检测输出的基类 (｡♥‿♥｡)
+    子类实现 emit()，在帧循环线程里被调用，要尽量快哦~
+    """
+
+    name = "sink"
+
+    def emit(self, message: Dict, detections: List[DetectionResult]):
+        """
+        输出一帧
+
+        Args:
+            message: build_message() 生成的消息
+            detections: 原始检测结果（回调需要对象时用）
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """释放资源"""
+
+
+class CallbackSink(DetectionSink):
+    """把每帧的检测结果交给回调函数"""
+
+    name = "callback"
+
+    def __init__(self, callback: Callable[[Dict, List[DetectionResult]], None]):
+        """
+        Args:
+            callback: callback(message, detections)
+        """
+        self.callback = callback
+
+    def emit(self, message: Dict, detections: List[DetectionResult]):
+        self.callback(message, detections)
+
+
+class JsonLinesSink(DetectionSink):
+    """把每帧追加成一行JSON（"-" 表示标准输出）"""
+
+    name = "jsonl"
+
+    def __init__(self, path: str, skip_empty: bool = False, flush_every: int = 1):
+        """
+        Args:
+            path: 输出文件路径，"-" 表示标准输出
+            skip_empty: 没有检测结果的帧是否跳过
+            flush_every: 每写多少行刷一次盘
+        """
+        self.path = path
+        self.skip_empty = skip_empty
+        self.flush_every = max(1, flush_every)
+        if path == "-":
+            self._file = sys.stdout
+        else:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(path, "a", encoding="utf-8")
+        self._pending = 0
+        self.lines_written = 0
+
+    def emit(self, message: Dict, detections: List[DetectionResult]):
+        if self.skip_empty and not detections:
+            return
+        self._file.write(json.dumps(message, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self.lines_written += 1
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self._file.flush()
+            self._pending = 0
+
+    def close(self):
+        self._file.flush()
+        if self.path != "-":
+            self._file.close()
+
+
+class UnixSocketPublisher(DetectionSink):
+    """
+    本地UNIX套接字广播（发布/订阅）(｡♥‿♥｡)
+    任意数量的订阅者连上来就能收到JSON Lines；发送是非阻塞的，
+    跟不上的订阅者会被断开，绝不拖慢帧循环~
+
+    订阅示例:
+        socat - UNIX-CONNECT:/tmp/yolo_monitor.sock
+    """
+
+    name = "unix"
+
+    def __init__(self, path: str, skip_empty: bool = False):
+        """
+        Args:
+            path: 套接字文件路径（已存在会先删除）
+            skip_empty: 没有检测结果的帧是否跳过
+        """
+        if not hasattr(socket, "AF_UNIX"):
+            raise RuntimeError("当前平台不支持UNIX套接字")
+        self.path = path
+        self.skip_empty = skip_empty
+        if os.path.exists(path):
+            os.unlink(path)
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(path)
+        self._server.listen(16)
+        self._clients: List[socket.socket] = []
+        self._lock = threading.Lock()
+        self._running = True
+        self.dropped_clients = 0
+        self.messages_sent = 0
+
+        self._thread = threading.Thread(target=self._accept_loop, name="UnixSocketPublisher", daemon=True)
+        self._thread.start()
+        default_logger.info(f"检测广播: unix://{path}")
+
+    def subscriber_count(self) -> int:
+        """当前订阅者数量"""
+        return len(self._clients)
+
+    def _accept_loop(self):
+        """后台接受新的订阅者"""
+        while self._running:
+            try:
+                client, _ = self._server.accept()
+            except OSError:
+                break
+            client.setblocking(False)
+            with self._lock:
+                self._clients.append(client)
+            default_logger.debug(f"检测广播: 新订阅者 (共 {len(self._clients)} 个)")
+
+    def emit(self, message: Dict, detections: List[DetectionResult]):
+        if self.skip_empty and not detections:
+            return
+        with self._lock:
+            if not self._clients:
+                return
+            clients = list(self._clients)
+        data = (json.dumps(message, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+        dead = []
+        for client in clients:
+            try:
+                sent = client.send(data)
+                if sent < len(data):
+                    # 只写了一半，这一行已经坏了，只能断开
+                    dead.append(client)
+            except (BlockingIOError, OSError):
+                dead.append(client)
+        if dead:
+            with self._lock:
+                for client in dead:
+                    if client in self._clients:
+                        self._clients.remove(client)
+                    client.close()
+            self.dropped_clients += len(dead)
+        self.messages_sent += 1
+
+    def close(self):
+        self._running = False
+        self._server.close()
+        with self._lock:
+            for client in self._clients:
+                client.close()
+            self._clients.clear()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+def create_sink(spec: str) -> DetectionSink:
+    """
+    按描述字符串创建输出
+
+    支持:
+        "jsonl:<path>"   JSON Lines 文件（"jsonl:-" 输出到标准输出）
+        "unix:<path>"    本地UNIX套接字广播
+
+    Args:
+        spec: 描述字符串
+
+    Returns:
+        DetectionSink实例
+    """
+    kind, _, target = spec.partition(":")
+    if kind == "jsonl" and target:
+        return JsonLinesSink(target)
+    if kind == "unix" and target:
+        return UnixSocketPublisher(target)
+    raise ValueError(f"无法识别的检测输出: {spec}（可用: jsonl:<path>, unix:<path>）")
@@ -17,6 +17,7 @@ class TrackedDetection:
     class_id: int
     class_name: str
     frame_count: int = 0  # 跟踪帧数
+    track_id: int = -1  # 跟踪ID（整个会话内唯一）
 
 
 class DetectionSmoother:
@@ -49,6 +50,9 @@ class DetectionSmoother:
         # 每个跟踪目标的历史位置
         self.detection_histories: List[deque] = []
 
+        # 下一个分配的跟踪ID
+        self._next_track_id = 0
+
     def smooth(self, detections: List[DetectionResult]) -> List[DetectionResult]:
         """
         平滑检测结果
@@ -168,8 +172,10 @@ class DetectionSmoother:
             confidence=detection.confidence,
             class_id=detection.class_id,
             class_name=detection.class_name,
-            frame_count=1
+            frame_count=1,
+            track_id=self._next_track_id
         )
+        self._next_track_id += 1
         self.tracked_detections.append(new_tracking)
         self.detection_histories.append(deque([detection.box], maxlen=self.history_size))
 
@@ -196,7 +202,8 @@ class DetectionSmoother:
                     box=tracking.box,
                     confidence=tracking.confidence,
                     class_id=tracking.class_id,
-                    class_name=tracking.class_name
+                    class_name=tracking.class_name,
+                    track_id=tracking.track_id
                 ))
         return active_detections
 
@@ -0,0 +1,156 @@
+"""
+帧率调节模块 - 屏幕安静的时候喵也会休息一下~ 🎀
+根据画面变化和检测结果动态调整捕获/检测帧率，节省CPU
+"""
+import time
+from typing import Dict, Optional
+import numpy as np
+from .logger import default_logger
+
+
+class FpsGovernor:
+    """
+    活动感知帧率调节器 (｡♥‿♥｡)
+    画面静止或没有目标时逐级降低帧率，一有动静立刻恢复全速~
+
+    三个档位：
+        "active"  全速：画面在变化且有目标，或刚出现新目标
+        "reduced" 降速：画面静止或没有目标持续了 reduce_after 秒
+        "idle"    空闲：画面静止且没有目标持续了 idle_after 秒
+    """
+
+    TIERS = ("active", "reduced", "idle")
+
+    def __init__(
+        self,
+        full_fps: float,
+        reduced_fps: float = 10,
+        idle_fps: float = 2,
+        static_threshold: float = 2.0,
+        reduce_after: float = 1.0,
+        idle_after: float = 5.0,
+        sample_stride: int = 16
+    ):
+        """
+        初始化帧率调节器
+
+        Args:
+            full_fps: 全速帧率
+            reduced_fps: 降速档帧率
+            idle_fps: 空闲档帧率
+            static_threshold: 判定画面静止的平均像素差阈值（0-255）
+            reduce_after: 安静多少秒后降速
+            idle_after: 静止且无目标多少秒后进入空闲
+            sample_stride: 画面变化检测的下采样步长（像素）
+        """
+        self.tier_fps = {
+            "active": float(full_fps),
+            "reduced": float(min(reduced_fps, full_fps)),
+            "idle": float(min(idle_fps, reduced_fps, full_fps)),
+        }
+        self.static_threshold = static_threshold
+        self.reduce_after = reduce_after
+        self.idle_after = idle_after
+        self.sample_stride = sample_stride
+
+        self.tier = "active"
+        self.last_change = 0.0
+        self._prev_sample: Optional[np.ndarray] = None
+        self._prev_detection_count = 0
+        self._calm_since: Optional[float] = None
+        self._last_update: Optional[float] = None
+        self.tier_time = {tier: 0.0 for tier in self.TIERS}
+
+    @property
+    def target_fps(self) -> float:
+        """当前档位对应的帧率"""
+        return self.tier_fps[self.tier]
+
+    def update(self, frame: np.ndarray, detection_count: int, now: Optional[float] = None) -> float:
+        """
+        根据最新一帧更新档位
+
+        Args:
+            frame: 当前捕获的画面
+            detection_count: 当前帧的检测数量
+            now: 当前时间（time.perf_counter），None表示现在
+
+        Returns:
+            下一帧应使用的目标帧率
+        """
+        now = time.perf_counter() if now is None else now
+        if self._last_update is not None:
+            self.tier_time[self.tier] += now - self._last_update
+        self._last_update = now
+
+        self.last_change = self._scene_change(frame)
+        static = self.last_change < self.static_threshold
+        empty = detection_count == 0
+        new_objects = detection_count > self._prev_detection_count
+        self._prev_detection_count = detection_count
+
+        if new_objects or not (static or empty):
+            # 有新目标或者画面在动且有目标，立刻全速
+            self._calm_since = None
+            tier = "active"
+        else:
+            if self._calm_since is None:
+                self._calm_since = now
+            calm_for = now - self._calm_since
+            if static and empty and calm_for >= self.idle_after:
+                tier = "idle"
+            elif calm_for >= self.reduce_after:
+                tier = "reduced"
+            else:
+                tier = "active"
+
+        if tier != self.tier:
+            default_logger.debug(
+                f"帧率档位切换: {self.tier} -> {tier} ({self.tier_fps[tier]:.0f} FPS, "
+                f"画面变化 {self.last_change:.2f}, 目标 {detection_count} 个)"
+            )
+            self.tier = tier
+        return self.target_fps
+
+    def _scene_change(self, frame: np.ndarray) -> float:
+        """
+        计算画面与上一帧的平均像素差（下采样后，开销很小~）
+
+        Args:
+            frame: 当前画面
+
+        Returns:
+            平均绝对差（0-255），第一帧返回无穷大
+        """
+        stride = self.sample_stride
+        sample = frame[::stride, ::stride].astype(np.int16)
+        prev = self._prev_sample
+        self._prev_sample = sample
+        if prev is None or prev.shape != sample.shape:
+            return float("inf")
+        return float(np.abs(sample - prev).mean())
+
+    def get_stats(self) -> Dict:
+        """
+        获取各档位停留时间统计
+
+        Returns:
+            包含当前档位、各档位时间/占比和估算节省帧数的字典
+        """
+        total = sum(self.tier_time.values())
+        full_fps = self.tier_fps["active"]
+        saved_frames = sum(
+            seconds * (full_fps - self.tier_fps[tier])
+            for tier, seconds in self.tier_time.items()
+        )
+        return {
+            "tier": self.tier,
+            "target_fps": self.target_fps,
+            "tier_seconds": dict(self.tier_time),
+            "tier_ratio": {
+                tier: (seconds / total if total > 0 else 0.0)
+                for tier, seconds in self.tier_time.items()
+            },
+            "saved_frames": saved_frames,
+            "saved_ratio": saved_frames / (total * full_fps) if total > 0 else 0.0,
+        }
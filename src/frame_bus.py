@@ -0,0 +1,498 @@
+"""
+帧总线模块 - 喵把每一帧放进共享内存，大家一起看~ 🎀
+单生产者/多消费者：ScreenCapture 把帧发布到共享内存的环形槽位里，
+录制、检测、画面变化判断、调试可视化等任意线程或进程都能零拷贝读取同一帧
+
+共享内存布局（全部小端）:
+    文件头    HEADER_DTYPE                    槽位数、消费者上限、最新帧序号等
+    槽位表    SLOT_DTYPE × slots              每个槽位的序号、时间戳、形状
+    消费者表  CONSUMER_DTYPE × max_consumers  每个消费者的pid和当前占用的槽位
+    数据区    max_frame_bytes × slots         帧数据（64字节对齐）
+
+引用计数：每个消费者只写自己那一行消费者表（不需要跨进程原子操作），
+生产者把所有消费者占用的槽位数一遍就是引用计数，跳过有人在读的槽位。
+Python里没有跨进程的内存屏障，"消费者刚占用、生产者刚好选中同一个槽位"这种竞争只能减少、不能排除，
+所以占用只是尽量避开，一致性靠序号核对（seqlock）：生产者写之前把序号清零、写完再填上，
+消费者读完（拷贝或处理完）再核对一次序号，没变才说明读到的是完整的一帧。
+"""
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Dict, Optional, Tuple
+import numpy as np
+from .logger import default_logger
+
+MAGIC = b"YOLOBUS1"
+ALIGNMENT = 64
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"),
+    ("slots", "<u4"),
+    ("max_consumers", "<u4"),
+    ("max_frame_bytes", "<u8"),
+    ("latest_seq", "<u8"),
+    ("latest_slot", "<i4"),
+    ("producer_pid", "<i4"),
+    ("published", "<u8"),
+    ("dropped", "<u8"),
+])
+
+# seq 为0表示槽位空着或正在写入
+SLOT_DTYPE = np.dtype([
+    ("seq", "<u8"),
+    ("timestamp", "<f8"),
+    ("height", "<u4"),
+    ("width", "<u4"),
+    ("channels", "<u4"),
+    ("reserved", "<u4"),
+])
+
+# pid 为0表示这一行没人用；pinned 为-1表示没有占用槽位
+CONSUMER_DTYPE = np.dtype([
+    ("pid", "<i8"),
+    ("pinned", "<i4"),
+    ("reserved", "<i4"),
+    ("last_seq", "<u8"),
+])
+
+
+def _align(size: int) -> int:
+    return (size + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _layout(slots: int, max_consumers: int) -> Tuple[int, int, int]:
+    """各个区域的起始偏移：(槽位表, 消费者表, 数据区)"""
+    slot_offset = _align(HEADER_DTYPE.itemsize)
+    consumer_offset = _align(slot_offset + SLOT_DTYPE.itemsize * slots)
+    data_offset = _align(consumer_offset + CONSUMER_DTYPE.itemsize * max_consumers)
+    return slot_offset, consumer_offset, data_offset
+
+
+def _pid_alive(pid: int) -> bool:
+    """进程是否还活着"""
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+def _lock_owner(path: str) -> int:
+    """锁文件里记录的持有者pid（读不到返回0）"""
+    try:
+        with open(path, "r") as f:
+            return int(f.read() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def _break_stale_lock(path: str, owner: int) -> None:
+    """
+    清掉已经退出的持有者留下的锁文件
+    先改名再核对pid：别的等待者可能抢先清掉并重新上锁，那样的锁要原样放回去
+    """
+    stale = f"{path}.{os.getpid()}.stale"
+    try:
+        os.replace(path, stale)
+    except FileNotFoundError:
+        return
+    if _lock_owner(stale) != owner:
+        try:
+            os.link(stale, path)
+        except OSError:
+            pass
+    os.unlink(stale)
+
+
+@contextmanager
+def _registration_lock(name: str, timeout: float = 5.0):
+    """
+    消费者注册用的跨进程锁（O_EXCL创建锁文件，各平台都是原子的）
+    注册很少发生，简单自旋就够了；锁文件里记着持有者的pid，
+    等待超时后只有持有者已经退出才会清掉它的锁
+    """
+    path = os.path.join(tempfile.gettempdir(), f"{name}.frame_bus.lock")
+    deadline = time.monotonic() + timeout
+    empty_before = False
+    while True:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            if time.monotonic() > deadline:
+                owner = _lock_owner(path)
+                # 空的锁文件可能是持有者刚创建、还没写pid，连续两次超时都是空的才算没人要
+                if owner == 0 and not empty_before:
+                    empty_before = True
+                elif not _pid_alive(owner):
+                    _break_stale_lock(path, owner)
+                else:
+                    default_logger.warning(f"帧总线注册锁被进程 {owner} 占用超过 {timeout} 秒，继续等待")
+                if owner:
+                    empty_before = False
+                deadline = time.monotonic() + timeout
+            time.sleep(0.001)
+    try:
+        os.write(fd, str(os.getpid()).encode())
+        yield
+    finally:
+        os.close(fd)
+        if _lock_owner(path) == os.getpid():
+            os.unlink(path)
+
+
+class _BusMemory:
+    """共享内存上的各个numpy视图（生产者和消费者共用）"""
+
+    def __init__(self, shm: shared_memory.SharedMemory, slots: int, max_consumers: int, max_frame_bytes: int):
+        self.shm = shm
+        self.slot_count = slots
+        self.max_frame_bytes = max_frame_bytes
+        slot_offset, consumer_offset, data_offset = _layout(slots, max_consumers)
+        self.header = np.ndarray((), dtype=HEADER_DTYPE, buffer=shm.buf)
+        self.slots = np.ndarray((slots,), dtype=SLOT_DTYPE, buffer=shm.buf, offset=slot_offset)
+        self.consumers = np.ndarray((max_consumers,), dtype=CONSUMER_DTYPE, buffer=shm.buf, offset=consumer_offset)
+        self.data = np.ndarray((slots, max_frame_bytes), dtype=np.uint8, buffer=shm.buf, offset=data_offset)
+
+    def frame_view(self, slot: int) -> np.ndarray:
+        """某个槽位里当前这帧的视图"""
+        meta = self.slots[slot]
+        shape = (int(meta["height"]), int(meta["width"]), int(meta["channels"]))
+        nbytes = shape[0] * shape[1] * shape[2]
+        return self.data[slot, :nbytes].reshape(shape)
+
+    def release(self):
+        """释放所有视图（关闭共享内存前必须先释放）"""
+        self.header = self.slots = self.consumers = self.data = None
+
+
+class FrameBus:
+    """
+    帧总线生产者 (｡♥‿♥｡)
+    只能有一个生产者；发布时跳过有人在读的槽位，槽位全被占着就丢掉这一帧并计数~
+    """
+
+    def __init__(
+        self,
+        name: Optional[str] = None,
+        max_frame_bytes: int = 1920 * 1080 * 3,
+        slots: int = 4,
+        max_consumers: int = 16
+    ):
+        """
+        创建帧总线
+
+        Args:
+            name: 共享内存名，None则自动生成（消费者需要知道这个名字）
+            max_frame_bytes: 单帧最大字节数（宽 × 高 × 通道）
+            slots: 环形槽位数（建议至少3：最新帧、正在被读的帧、下一帧）
+            max_consumers: 同时挂载的消费者上限
+        """
+        if slots < 2:
+            raise ValueError("帧总线至少需要2个槽位")
+        _, _, data_offset = _layout(slots, max_consumers)
+        self._shm = shared_memory.SharedMemory(
+            name=name, create=True, size=data_offset + slots * max_frame_bytes
+        )
+        self.name = self._shm.name
+        self._memory = _BusMemory(self._shm, slots, max_consumers, max_frame_bytes)
+
+        header = self._memory.header
+        header["magic"] = MAGIC
+        header["slots"] = slots
+        header["max_consumers"] = max_consumers
+        header["max_frame_bytes"] = max_frame_bytes
+        header["latest_seq"] = 0
+        header["latest_slot"] = -1
+        header["producer_pid"] = os.getpid()
+        self._memory.slots["seq"] = 0
+        self._memory.consumers["pid"] = 0
+        self._memory.consumers["pinned"] = -1
+
+        self._seq = 0
+        self._next_slot = 0
+        default_logger.info(
+            f"帧总线已创建: {self.name} ({slots} 槽位 × {max_frame_bytes / 1024 / 1024:.1f} MB)"
+        )
+
+    @property
+    def max_frame_bytes(self) -> int:
+        return self._memory.max_frame_bytes
+
+    def _pinned_counts(self) -> np.ndarray:
+        """每个槽位的引用计数（活着的消费者中有几个正占用着它）"""
+        consumers = self._memory.consumers
+        counts = np.zeros(self._memory.slot_count, dtype=np.int32)
+        for pid, pinned in zip(consumers["pid"], consumers["pinned"]):
+            if pid and pinned >= 0:
+                counts[pinned] += 1
+        return counts
+
+    def _reap_dead_consumers(self) -> bool:
+        """清理已经退出的消费者留下的占用，返回是否清理了"""
+        consumers = self._memory.consumers
+        reaped = False
+        for index in range(len(consumers)):
+            pid = int(consumers[index]["pid"])
+            if pid and not _pid_alive(pid):
+                consumers[index]["pinned"] = -1
+                consumers[index]["pid"] = 0
+                reaped = True
+        return reaped
+
+    def _claim_slot(self) -> int:
+        """找一个可以写的槽位（不是最新帧、没人占用），找不到返回-1"""
+        memory = self._memory
+        latest = int(memory.header["latest_slot"])
+        for attempt in range(2):
+            counts = self._pinned_counts()
+            for i in range(memory.slot_count):
+                slot = (self._next_slot + i) % memory.slot_count
+                if slot == latest or counts[slot]:
+                    continue
+                memory.slots[slot]["seq"] = 0  # 标记正在写，读者核对序号时就知道这一帧作废了
+                self._next_slot = (slot + 1) % memory.slot_count
+                return slot
+            if attempt == 0 and not self._reap_dead_consumers():
+                break
+        return -1
+
+    def publish(self, frame: np.ndarray, timestamp: Optional[float] = None) -> int:
+        """
+        发布一帧
+
+        Args:
+            frame: uint8图像 (H, W) 或 (H, W, C)
+            timestamp: 时间戳（Unix秒），None表示当前时间
+
+        Returns:
+            帧序号，丢帧时返回0
+        """
+        memory = self._memory
+        if frame.nbytes > memory.max_frame_bytes:
+            raise ValueError(f"帧太大: {frame.nbytes} > {memory.max_frame_bytes} 字节")
+        slot = self._claim_slot()
+        if slot < 0:
+            memory.header["dropped"] += 1
+            return 0
+
+        shape = frame.shape if frame.ndim == 3 else frame.shape + (1,)
+        memory.data[slot, :frame.nbytes].reshape(shape)[...] = frame.reshape(shape)
+        meta = memory.slots[slot]
+        meta["timestamp"] = time.time() if timestamp is None else timestamp
+        meta["height"], meta["width"], meta["channels"] = shape
+        self._seq += 1
+        meta["seq"] = self._seq
+        memory.header["latest_slot"] = slot
+        memory.header["latest_seq"] = self._seq
+        memory.header["published"] += 1
+        return self._seq
+
+    def get_stats(self) -> Dict:
+        """
+        获取总线统计
+
+        Returns:
+            {published, dropped, consumers, pinned}
+        """
+        memory = self._memory
+        return {
+            "published": int(memory.header["published"]),
+            "dropped": int(memory.header["dropped"]),
+            "consumers": int(np.count_nonzero(memory.consumers["pid"])),
+            "pinned": int(self._pinned_counts().sum()),
+        }
+
+    def close(self):
+        """关闭并删除共享内存"""
+        if self._memory is None:
+            return
+        self._memory.release()
+        self._memory = None
+        try:
+            self._shm.close()
+        except BufferError:
+            default_logger.warning(f"帧总线 {self.name} 还有帧视图没有释放，共享内存将在进程退出时关闭")
+        self._shm.unlink()
+        default_logger.info(f"帧总线已关闭: {self.name}")
+
+
+class FrameRef:
+    """
+    被占用的一帧 (｡♥‿♥｡)
+    frame 是共享内存上的只读视图（零拷贝），用完记得 release()，或者用 with 语句~
+    占用只能尽量避免被覆盖，处理完请用 intact() 核对，或者直接用 copy() 拿一份核对过的拷贝
+    """
+
+    def __init__(self, reader: "FrameBusReader", slot: int, seq: int, timestamp: float, frame: np.ndarray):
+        self._reader = reader
+        self.slot = slot
+        self.seq = seq
+        self.timestamp = timestamp
+        self.frame = frame
+
+    def intact(self) -> bool:
+        """这一帧是否还没被覆盖（正常占用期间总是True）"""
+        memory = self._reader._memory
+        return memory is not None and int(memory.slots[self.slot]["seq"]) == self.seq
+
+    def copy(self) -> Optional[np.ndarray]:
+        """
+        拷贝这一帧，拷完再核对序号
+
+        Returns:
+            帧的拷贝，拷贝期间被生产者覆盖了返回None
+        """
+        frame = np.array(self.frame)
+        return frame if self.intact() else None
+
+    def release(self):
+        """释放占用"""
+        self._reader._unpin(self)
+
+    def __enter__(self) -> "FrameRef":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class FrameBusReader:
+    """
+    帧总线消费者 (｡♥‿♥｡)
+    同一个进程的不同线程也请各自创建一个读者；每个读者同时只占用一帧，
+    拿新帧时会自动释放上一帧~
+    """
+
+    def __init__(self, name: str, poll_interval: float = 0.001):
+        """
+        挂载到帧总线
+
+        Args:
+            name: 生产者的共享内存名（FrameBus.name）
+            poll_interval: 等待新帧时的轮询间隔（秒）
+        """
+        self.name = name
+        self.poll_interval = poll_interval
+        self._shm = shared_memory.SharedMemory(name=name)
+        header = np.ndarray((), dtype=HEADER_DTYPE, buffer=self._shm.buf)
+        if bytes(header["magic"]) != MAGIC:
+            del header
+            self._shm.close()
+            raise ValueError(f"不是帧总线: {name}")
+        if int(header["producer_pid"]) != os.getpid():
+            try:
+                # 挂载方不负责删除共享内存（生产者在同一进程时登记是共用的，不能注销）
+                from multiprocessing import resource_tracker
+                resource_tracker.unregister(self._shm._name, "shared_memory")
+            except Exception:
+                pass
+        self._memory = _BusMemory(
+            self._shm, int(header["slots"]), int(header["max_consumers"]), int(header["max_frame_bytes"])
+        )
+        del header
+
+        self._index = self._register()
+        self._current: Optional[FrameRef] = None
+        self.last_seq = 0
+
+    def _register(self) -> int:
+        """占用消费者表中空着的一行"""
+        consumers = self._memory.consumers
+        with _registration_lock(self.name):
+            for index in range(len(consumers)):
+                pid = int(consumers[index]["pid"])
+                if pid == 0 or not _pid_alive(pid):
+                    consumers[index]["pinned"] = -1
+                    consumers[index]["last_seq"] = 0
+                    consumers[index]["pid"] = os.getpid()
+                    return index
+        raise RuntimeError(f"帧总线 {self.name} 的消费者已满")
+
+    def latest(self) -> Optional[FrameRef]:
+        """
+        占用最新的一帧
+
+        Returns:
+            FrameRef，总线上还没有帧时返回None
+        """
+        memory = self._memory
+        consumer = memory.consumers[self._index]
+        for _ in range(memory.slot_count * 4):
+            slot = int(memory.header["latest_slot"])
+            seq = int(memory.header["latest_seq"])
+            if slot < 0 or seq == 0:
+                return None
+            if self._current is not None:
+                if self._current.seq == seq:
+                    return self._current
+                self._current = None
+            consumer["pinned"] = slot
+            # 读完形状和时间戳再核对序号：生产者可能刚好在写这个槽位，这时的元数据不可信
+            meta = memory.slots[slot]
+            timestamp = float(meta["timestamp"])
+            try:
+                frame = memory.frame_view(slot)
+            except ValueError:
+                frame = None  # 形状读到了一半
+            if frame is None or int(meta["seq"]) != seq:
+                consumer["pinned"] = -1
+                continue
+            frame.flags.writeable = False
+            self._current = FrameRef(self, slot, seq, timestamp, frame)
+            self.last_seq = seq
+            consumer["last_seq"] = seq
+            return self._current
+        return None
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[FrameRef]:
+        """
+        等待比上次拿到的更新的一帧（中间的帧会被跳过，只要最新的）
+
+        Args:
+            timeout: 最多等待的秒数，None表示一直等
+
+        Returns:
+            FrameRef，超时返回None
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if int(self._memory.header["latest_seq"]) > self.last_seq:
+                ref = self.latest()
+                if ref is not None and ref.seq > 0:
+                    return ref
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(self.poll_interval)
+
+    def skipped_frames(self) -> int:
+        """生产者已经发布、但这个读者没拿到过的帧数"""
+        return max(0, int(self._memory.header["latest_seq"]) - self.last_seq)
+
+    def _unpin(self, ref: FrameRef):
+        if self._current is ref and self._memory is not None:
+            self._memory.consumers[self._index]["pinned"] = -1
+            self._current = None
+
+    def close(self):
+        """注销并断开"""
+        if self._memory is None:
+            return
+        consumer = self._memory.consumers[self._index]
+        consumer["pinned"] = -1
+        consumer["pid"] = 0
+        if self._current is not None:
+            self._current.frame = None
+            self._current = None
+        self._memory.release()
+        self._memory = None
+        try:
+            self._shm.close()
+        except BufferError:
+            default_logger.warning(f"帧总线 {self.name} 还有帧视图没有释放，共享内存将在进程退出时关闭")
@@ -0,0 +1,189 @@
+"""
+帧调度模块 - 喵按绝对时钟安排每一帧~ 🎀
+基于单调时钟规划帧节拍，错过截止时间的帧会被显式丢弃或跳过
+"""
+import time
+from collections import deque
+from typing import Dict, Optional
+
+
+class FrameScheduler:
+    """
+    截止时间帧调度器 (｡♥‿♥｡)
+    节拍按 t0 + k * period 的绝对时间排列，慢帧不会推迟后续节拍~
+
+    两种策略：
+        "latency"    延迟优先：落后时直接跳到最新的节拍，预计赶不上截止时间的帧直接丢弃
+        "throughput" 吞吐优先：落后时连续补帧（最多补 max_backlog 个），尽量不丢帧
+    """
+
+    POLICIES = ("latency", "throughput")
+
+    def __init__(
+        self,
+        target_fps: float,
+        policy: str = "latency",
+        max_backlog: int = 2,
+        stats_window: int = 120
+    ):
+        """
+        初始化帧调度器
+
+        Args:
+            target_fps: 目标帧率
+            policy: 调度策略，"latency" 或 "throughput"
+            max_backlog: 吞吐优先策略下最多允许积压的节拍数
+            stats_window: 计算实际帧率和抖动的滑动窗口大小（帧）
+        """
+        if policy not in self.POLICIES:
+            raise ValueError(f"未知的调度策略: {policy}")
+        self.policy = policy
+        self.max_backlog = max_backlog
+        self.period = 1.0 / target_fps
+        self.target_fps = float(target_fps)
+
+        self._next_tick: Optional[float] = None
+        self._frame_start = 0.0
+        self._in_frame = False  # begin_frame 和 end_frame 之间，_next_tick 还是正在处理的节拍
+        self._cost_ema = 0.0
+
+        # 统计信息
+        self.frames = 0
+        self.dropped_frames = 0   # 预计会错过截止时间而主动丢弃的帧
+        self.skipped_ticks = 0    # 因为落后而直接跳过的节拍
+        self.late_frames = 0      # 实际完成时间晚于截止时间的帧
+        self._starts = deque(maxlen=stats_window)
+
+    def start(self, now: Optional[float] = None):
+        """
+        以当前时间为起点开始调度
+
+        Args:
+            now: 当前时间（time.perf_counter），None表示现在
+        """
+        self._next_tick = time.perf_counter() if now is None else now
+
+    def set_target_fps(self, target_fps: float, now: Optional[float] = None):
+        """
+        修改目标帧率，下一个节拍按新周期重新对齐
+        （在帧中间调用时只换周期，end_frame 会从这一帧的节拍推进一个新周期）
+
+        Args:
+            target_fps: 新的目标帧率
+            now: 当前时间，None表示现在
+        """
+        if target_fps == self.target_fps:
+            return
+        now = time.perf_counter() if now is None else now
+        old_period = self.period
+        self.target_fps = float(target_fps)
+        self.period = 1.0 / target_fps
+        if self._next_tick is not None and not self._in_frame:
+            # 从上一个节拍开始按新周期重新排列
+            self._next_tick = max(now, self._next_tick - old_period + self.period)
+
+    def time_until_next(self, now: Optional[float] = None) -> float:
+        """
+        距离下一个节拍的时间
+
+        Args:
+            now: 当前时间，None表示现在
+
+        Returns:
+            秒数（不小于0）
+        """
+        if self._next_tick is None:
+            return 0.0
+        now = time.perf_counter() if now is None else now
+        return max(0.0, self._next_tick - now)
+
+    def begin_frame(self, now: Optional[float] = None) -> bool:
+        """
+        节拍到达时调用，决定这一帧是否处理
+
+        Args:
+            now: 当前时间，None表示现在
+
+        Returns:
+            True表示应处理这一帧，False表示这一帧被丢弃
+        """
+        now = time.perf_counter() if now is None else now
+        if self._next_tick is None:
+            self._next_tick = now
+
+        behind = int((now - self._next_tick) / self.period)
+        if self.policy == "latency":
+            # 延迟优先：错过的节拍全部跳过，只处理最新的一个
+            allowed_backlog = 0
+        else:
+            allowed_backlog = self.max_backlog
+        if behind > allowed_backlog:
+            skipped = behind - allowed_backlog
+            self.skipped_ticks += skipped
+            self._next_tick += skipped * self.period
+
+        deadline = self._next_tick + self.period
+        if (
+            self.policy == "latency"
+            and self._cost_ema <= self.period
+            and now + self._cost_ema > deadline
+        ):
+            # 预计赶不上截止时间，丢掉这一帧等下一个节拍
+            self.dropped_frames += 1
+            self._next_tick += self.period
+            return False
+
+        self._frame_start = now
+        self._starts.append(now)
+        self._in_frame = True
+        return True
+
+    def end_frame(self, now: Optional[float] = None):
+        """
+        一帧处理完成时调用，记录耗时并推进到下一个节拍
+
+        Args:
+            now: 当前时间，None表示现在
+        """
+        now = time.perf_counter() if now is None else now
+        self._in_frame = False
+        cost = now - self._frame_start
+        # 帧耗时的指数移动平均，用来预测下一帧能否按时完成
+        self._cost_ema = cost if self.frames == 0 else self._cost_ema * 0.8 + cost * 0.2
+        self.frames += 1
+
+        deadline = self._next_tick + self.period
+        if now > deadline:
+            self.late_frames += 1
+        self._next_tick += self.period
+
+    def get_stats(self) -> Dict:
+        """
+        获取调度统计
+
+        Returns:
+            包含目标/实际帧率、抖动、丢帧和跳帧数量的字典
+        """
+        achieved_fps = 0.0
+        jitter_ms = 0.0
+        if len(self._starts) >= 2:
+            span = self._starts[-1] - self._starts[0]
+            if span > 0:
+                achieved_fps = (len(self._starts) - 1) / span
+            starts = list(self._starts)
+            intervals = [b - a for a, b in zip(starts, starts[1:])]
+            mean = sum(intervals) / len(intervals)
+            variance = sum((x - mean) ** 2 for x in intervals) / len(intervals)
+            jitter_ms = variance ** 0.5 * 1000
+
+        return {
+            "policy": self.policy,
+            "target_fps": self.target_fps,
+            "achieved_fps": achieved_fps,
+            "jitter_ms": jitter_ms,
+            "frame_cost_ms": self._cost_ema * 1000,
+            "frames": self.frames,
+            "dropped": self.dropped_frames,
+            "skipped": self.skipped_ticks,
+            "late": self.late_frames,
+        }
@@ -0,0 +1,530 @@
+"""
+推理服务模块 - 喵让同一台机器上的所有监控共用一份模型~ 🎀
+InferenceServer 在本地套接字上提供检测服务，每个模型只加载一次；
+客户端把帧写进共享内存，只通过套接字传一个很小的JSON请求，
+服务端把短时间内到达的同类请求攒成一批推理。
+RemoteDetector 是 YOLODetector 的替身，可以直接传给 ScreenMonitorApp
+
+用法:
+    python main.py serve --address /tmp/yolo_inference.sock --preload yolo26n.pt
+    config.detector.server_address = "/tmp/yolo_inference.sock"   # 客户端
+
+协议（双方向都是 4字节大端长度 + UTF-8 JSON）:
+    {"op": "info", "model": ..., "imgsz": ...}
+        -> {"ok": true, "names": {类别ID: 类别名}}
+    {"op": "detect", "model": ..., "imgsz": ..., "conf": ..., "iou": ..., "classes": ...,
+     "shm": 共享内存名, "shape": [h, w, c], "dtype": "uint8"}
+        -> {"ok": true, "detections": [[x1, y1, x2, y2, conf, class_id], ...],
+            "timings": {...}, "batch_size": n}
+    出错时 -> {"ok": false, "error": "..."}
+"""
+import argparse
+import json
+import os
+import queue
+import socket
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from .yolo_detector import DetectionResult, YOLODetector
+from .logger import default_logger
+
+DEFAULT_ADDRESS = "/tmp/yolo_inference.sock"
+_LENGTH = struct.Struct(">I")
+
+
+def _create_socket(address: str) -> Tuple[socket.socket, object]:
+    """
+    按地址创建套接字："host:port" 为TCP（只建议127.0.0.1），其余为UNIX套接字路径
+
+    Returns:
+        (未连接的套接字, connect/bind用的地址)
+    """
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and not address.startswith("/"):
+        return socket.socket(socket.AF_INET, socket.SOCK_STREAM), (host, int(port))
+    return socket.socket(socket.AF_UNIX, socket.SOCK_STREAM), address
+
+
+def send_message(sock: socket.socket, message: Dict):
+    """发送一条长度前缀的JSON消息"""
+    data = json.dumps(message, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    sock.sendall(_LENGTH.pack(len(data)) + data)
+
+
+def recv_message(sock: socket.socket) -> Optional[Dict]:
+    """接收一条长度前缀的JSON消息，对端关闭时返回None"""
+    header = _recv_exact(sock, _LENGTH.size)
+    if header is None:
+        return None
+    data = _recv_exact(sock, _LENGTH.unpack(header)[0])
+    if data is None:
+        return None
+    return json.loads(data.decode("utf-8"))
+
+
+def _recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    buffer = bytearray()
+    while len(buffer) < size:
+        chunk = sock.recv(size - len(buffer))
+        if not chunk:
+            return None
+        buffer.extend(chunk)
+    return bytes(buffer)
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """
+    打开客户端创建的共享内存（不登记到本进程的resource_tracker，
+    否则服务端退出时会把还在用的共享内存删掉）
+    """
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    return shm
+
+
+class _Request:
+    """排队等待批量推理的一个检测请求"""
+
+    __slots__ = ("key", "frame", "future", "enqueued")
+
+    def __init__(self, key: Tuple, frame: np.ndarray):
+        self.key = key
+        self.frame = frame
+        self.future: Future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class InferenceServer:
+    """
+    本地推理服务 (｡♥‿♥｡)
+    每个连接一个线程负责收发，推理只在一个批处理线程里进行，
+    模型按 (路径, 输入尺寸) 只加载一次，所有客户端共用~
+    """
+
+    def __init__(
+        self,
+        address: str = DEFAULT_ADDRESS,
+        max_batch: int = 8,
+        batch_timeout: float = 0.005,
+        preload: Optional[List[str]] = None,
+        imgsz: int = 640
+    ):
+        """
+        初始化推理服务
+
+        Args:
+            address: UNIX套接字路径，或 "127.0.0.1:端口"
+            max_batch: 一批最多合并的请求数
+            batch_timeout: 收到第一个请求后最多再等多久凑批（秒）
+            preload: 启动时预先加载的模型路径
+            imgsz: 预加载模型使用的输入尺寸
+        """
+        self.address = address
+        self.max_batch = max(1, max_batch)
+        self.batch_timeout = batch_timeout
+        self._preload = list(preload or [])
+        self._preload_imgsz = imgsz
+
+        self._detectors: Dict[Tuple[str, int], YOLODetector] = {}
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self._server: Optional[socket.socket] = None
+        self._threads: List[threading.Thread] = []
+        self._running = False
+
+        # 统计
+        self.request_count = 0
+        self.batch_count = 0
+        self.client_count = 0
+        self._queue_wait_total = 0.0
+
+    def start(self):
+        """加载预置模型并开始监听"""
+        for model_path in self._preload:
+            self._get_detector(model_path, self._preload_imgsz)
+
+        self._server, bind_address = _create_socket(self.address)
+        if self._server.family == socket.AF_UNIX and os.path.exists(self.address):
+            os.unlink(self.address)
+        if self._server.family == socket.AF_INET:
+            self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind(bind_address)
+        if self._server.family == socket.AF_INET:
+            host, port = self._server.getsockname()[:2]
+            self.address = f"{host}:{port}"  # 端口0时换成实际端口
+        self._server.listen(64)
+        self._running = True
+
+        for target, name in ((self._accept_loop, "InferenceAccept"), (self._batch_loop, "InferenceBatch")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        default_logger.info(
+            f"推理服务已启动: {self.address} (批大小 ≤ {self.max_batch}, "
+            f"凑批等待 {self.batch_timeout * 1000:.1f} ms)"
+        )
+
+    def serve_forever(self):
+        """启动并阻塞运行，直到Ctrl+C"""
+        self.start()
+        try:
+            while self._running:
+                time.sleep(5.0)
+                stats = self.get_stats()
+                if stats["requests"]:
+                    default_logger.info(
+                        f"📊 推理服务 - 客户端: {stats['clients']} | 请求: {stats['requests']} | "
+                        f"平均批大小: {stats['avg_batch_size']:.2f} | "
+                        f"平均排队: {stats['avg_queue_wait_ms']:.2f} ms"
+                    )
+        except KeyboardInterrupt:
+            default_logger.info("接收到退出信号")
+        finally:
+            self.stop()
+
+    def stop(self):
+        """停止服务"""
+        if not self._running:
+            return
+        self._running = False
+        self._queue.put(None)
+        if self._server:
+            self._server.close()
+            if self._server.family == socket.AF_UNIX and os.path.exists(self.address):
+                os.unlink(self.address)
+        default_logger.info("推理服务已停止")
+
+    def get_stats(self) -> Dict:
+        """
+        获取服务统计
+
+        Returns:
+            {clients, requests, batches, avg_batch_size, avg_queue_wait_ms, models}
+        """
+        return {
+            "clients": self.client_count,
+            "requests": self.request_count,
+            "batches": self.batch_count,
+            "avg_batch_size": self.request_count / self.batch_count if self.batch_count else 0.0,
+            "avg_queue_wait_ms": self._queue_wait_total / self.request_count * 1000 if self.request_count else 0.0,
+            "models": [f"{path}@{imgsz}" for path, imgsz in self._detectors],
+        }
+
+    def _get_detector(self, model_path: str, imgsz: int) -> YOLODetector:
+        """按 (路径, 输入尺寸) 取模型，第一次用到时加载"""
+        key = (model_path, imgsz)
+        if key not in self._detectors:
+            self._detectors[key] = YOLODetector(model_path=model_path, imgsz=imgsz, classes=None)
+        return self._detectors[key]
+
+    def _accept_loop(self):
+        """接受客户端连接"""
+        while self._running:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                break
+            thread = threading.Thread(target=self._handle_client, args=(conn,), name="InferenceClient", daemon=True)
+            thread.start()
+
+    def _handle_client(self, conn: socket.socket):
+        """一个客户端连接的收发循环"""
+        self.client_count += 1
+        attached: Dict[str, shared_memory.SharedMemory] = {}
+        try:
+            while self._running:
+                message = recv_message(conn)
+                if message is None:
+                    break
+                try:
+                    response = self._handle_message(message, attached)
+                except Exception as e:
+                    default_logger.error(f"处理推理请求失败: {e}", exc_info=True)
+                    response = {"ok": False, "error": str(e)}
+                send_message(conn, response)
+        except OSError:
+            pass
+        finally:
+            for shm in attached.values():
+                shm.close()
+            conn.close()
+            self.client_count -= 1
+
+    def _handle_message(self, message: Dict, attached: Dict[str, shared_memory.SharedMemory]) -> Dict:
+        """处理一条请求"""
+        op = message.get("op")
+        imgsz = int(message.get("imgsz", 640))
+        if op == "info":
+            # 模型加载交给批处理线程，保证模型只在一个线程里使用
+            names = self._submit(("info", message["model"], imgsz), None).result()
+            return {"ok": True, "names": {str(k): v for k, v in names.items()}}
+        if op != "detect":
+            return {"ok": False, "error": f"未知操作: {op}"}
+
+        name = message["shm"]
+        if name not in attached:
+            # 客户端换了更大的共享内存，旧的就不再需要
+            for old in attached.values():
+                old.close()
+            attached.clear()
+            attached[name] = _attach_shared_memory(name)
+        frame = np.ndarray(tuple(message["shape"]), dtype=message.get("dtype", "uint8"), buffer=attached[name].buf)
+
+        classes = message.get("classes")
+        key = (
+            message["model"], imgsz, float(message.get("conf", 0.5)), float(message.get("iou", 0.45)),
+            tuple(classes) if classes is not None else None
+        )
+        detections, timings, batch_size = self._submit(key, frame).result()
+        return {
+            "ok": True,
+            "detections": [list(d.box) + [round(d.confidence, 5), d.class_id] for d in detections],
+            "timings": timings,
+            "batch_size": batch_size,
+        }
+
+    def _submit(self, key: Tuple, frame: Optional[np.ndarray]) -> Future:
+        """把请求放进批处理队列"""
+        request = _Request(key, frame)
+        self._queue.put(request)
+        return request.future
+
+    def _batch_loop(self):
+        """批处理线程：凑批 -> 按参数分组 -> 推理 -> 分发结果"""
+        while self._running:
+            request = self._queue.get()
+            if request is None:
+                break
+            batch = [request]
+            deadline = time.perf_counter() + self.batch_timeout
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._running = False
+                    break
+                batch.append(item)
+
+            groups: Dict[Tuple, List[_Request]] = {}
+            for item in batch:
+                groups.setdefault(item.key, []).append(item)
+            for key, requests in groups.items():
+                self._run_group(key, requests)
+
+    def _run_group(self, key: Tuple, requests: List[_Request]):
+        """推理一组参数相同的请求"""
+        try:
+            if key[0] == "info":
+                names = self._get_detector(key[1], key[2]).model.names
+                for request in requests:
+                    request.future.set_result(names)
+                return
+
+            model_path, imgsz, conf, iou, classes = key
+            detector = self._get_detector(model_path, imgsz)
+            detector.confidence_threshold = conf
+            detector.iou_threshold = iou
+            detector.classes = list(classes) if classes is not None else None
+
+            start = time.perf_counter()
+            for request in requests:
+                self._queue_wait_total += start - request.enqueued
+            results = detector.detect_batch([request.frame for request in requests])
+            timings = {stage: seconds / len(requests) for stage, seconds in detector.last_timings.items()}
+
+            self.request_count += len(requests)
+            self.batch_count += 1
+            for request, detections in zip(requests, results):
+                request.future.set_result((detections, timings, len(requests)))
+        except Exception as e:
+            for request in requests:
+                if not request.future.done():
+                    request.future.set_exception(e)
+
+
+class RemoteDetector:
+    """
+    远程检测器 (｡♥‿♥｡)
+    接口和 YOLODetector 一样（detect / last_timings / get_model_info / draw_detections），
+    模型在推理服务里，本进程不加载torch~
+    """
+
+    DEFAULT_COLORS = YOLODetector.DEFAULT_COLORS
+    draw_detections = YOLODetector.draw_detections
+    _get_color = YOLODetector._get_color
+
+    def __init__(
+        self,
+        address: str = DEFAULT_ADDRESS,
+        model_path: str = "yolo26n.pt",
+        confidence_threshold: float = 0.5,
+        iou_threshold: float = 0.45,
+        classes: Optional[List[int]] = None,
+        imgsz: int = 640,
+        timeout: float = 30.0
+    ):
+        """
+        连接推理服务
+
+        Args:
+            address: 推理服务地址（UNIX套接字路径或 "127.0.0.1:端口"）
+            model_path: 服务端使用的模型路径
+            confidence_threshold: 置信度阈值
+            iou_threshold: IOU阈值
+            classes: 要检测的类别列表，None表示所有类别
+            imgsz: 推理输入尺寸
+            timeout: 单次请求超时（秒），首次请求可能包含服务端加载模型的时间
+        """
+        self.address = address
+        self.model_path = model_path
+        self.confidence_threshold = confidence_threshold
+        self.iou_threshold = iou_threshold
+        self.classes = classes
+        self.imgsz = imgsz
+
+        self._sock, connect_address = _create_socket(address)
+        self._sock.settimeout(timeout)
+        self._sock.connect(connect_address)
+        self._shm: Optional[shared_memory.SharedMemory] = None
+        self._lock = threading.Lock()
+
+        self.last_timings: Dict[str, float] = {
+            "preprocess": 0.0, "inference": 0.0, "postprocess": 0.0
+        }
+        self.last_batch_size = 0
+
+        response = self._request({"op": "info", "model": model_path, "imgsz": imgsz})
+        self.names: Dict[int, str] = {int(k): v for k, v in response["names"].items()}
+        default_logger.info(f"已连接推理服务: {address} (模型 {model_path}, 输入尺寸 {imgsz})")
+
+    def _request(self, message: Dict) -> Dict:
+        """发送请求并等待响应"""
+        send_message(self._sock, message)
+        response = recv_message(self._sock)
+        if response is None:
+            raise ConnectionError(f"推理服务已断开: {self.address}")
+        if not response.get("ok"):
+            raise RuntimeError(f"推理服务返回错误: {response.get('error')}")
+        return response
+
+    def _frame_buffer(self, frame: np.ndarray) -> np.ndarray:
+        """取一块足够大的共享内存，返回和帧同形状的视图"""
+        if self._shm is None or self._shm.size < frame.nbytes:
+            if self._shm is not None:
+                self._shm.close()
+                self._shm.unlink()
+            self._shm = shared_memory.SharedMemory(create=True, size=frame.nbytes)
+        return np.ndarray(frame.shape, dtype=frame.dtype, buffer=self._shm.buf)
+
+    def detect(self, frame: np.ndarray) -> List[DetectionResult]:
+        """
+        对图像帧执行目标检测（帧经共享内存传给推理服务）
+
+        Args:
+            frame: 输入图像 (BGR格式)
+
+        Returns:
+            DetectionResult对象列表
+        """
+        with self._lock:
+            start = time.perf_counter()
+            np.copyto(self._frame_buffer(frame), frame)
+            response = self._request({
+                "op": "detect",
+                "model": self.model_path,
+                "imgsz": self.imgsz,
+                "conf": self.confidence_threshold,
+                "iou": self.iou_threshold,
+                "classes": self.classes,
+                "shm": self._shm.name,
+                "shape": list(frame.shape),
+                "dtype": str(frame.dtype),
+            })
+            round_trip = time.perf_counter() - start
+
+        detections = [
+            DetectionResult(
+                box=(int(x1), int(y1), int(x2), int(y2)),
+                confidence=float(conf),
+                class_id=int(class_id),
+                class_name=self.names.get(int(class_id), f"class_{int(class_id)}")
+            )
+            for x1, y1, x2, y2, conf, class_id in response["detections"]
+        ]
+
+        # 服务端各阶段耗时按批均摊；拷贝、传输和排队的时间算进预处理
+        timings = response["timings"]
+        overhead = max(0.0, round_trip - sum(timings.values()))
+        self.last_timings = {
+            "preprocess": timings.get("preprocess", 0.0) + overhead,
+            "inference": timings.get("inference", 0.0),
+            "postprocess": timings.get("postprocess", 0.0),
+        }
+        self.last_batch_size = response["batch_size"]
+        return detections
+
+    def get_model_info(self) -> Dict:
+        """
+        获取模型信息
+
+        Returns:
+            包含模型信息的字典
+        """
+        return {
+            "classes": self.names,
+            "confidence_threshold": self.confidence_threshold,
+            "iou_threshold": self.iou_threshold,
+            "imgsz": self.imgsz,
+            "server": self.address,
+        }
+
+    def close(self):
+        """断开连接并释放共享内存"""
+        self._sock.close()
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """命令行参数"""
+    parser = argparse.ArgumentParser(prog="main.py serve", description="本地推理服务 喵~")
+    parser.add_argument("--address", default=DEFAULT_ADDRESS, help="UNIX套接字路径或 127.0.0.1:端口")
+    parser.add_argument("--preload", nargs="*", default=[], help="启动时预先加载的模型")
+    parser.add_argument("--imgsz", type=int, default=640, help="预加载模型的输入尺寸")
+    parser.add_argument("--max-batch", type=int, default=8, help="一批最多合并的请求数")
+    parser.add_argument("--batch-timeout-ms", type=float, default=5.0, help="凑批最长等待（毫秒）")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令行入口"""
+    args = build_parser().parse_args(argv)
+    server = InferenceServer(
+        address=args.address,
+        max_batch=args.max_batch,
+        batch_timeout=args.batch_timeout_ms / 1000,
+        preload=args.preload,
+        imgsz=args.imgsz
+    )
+    server.serve_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,19 @@
 """
 日志配置模块 - 喵专用~ 🎀
 温柔为主人服务，提供贴心的日志管理功能~
+日志调用只把记录放进队列，格式化和写控制台/文件都在后台线程完成，不给帧循环添延迟~
 """
+import atexit
 import logging
+import os
+import queue
 import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from datetime import datetime
+from typing import Dict, List, Tuple
 
 
 class MaidMeowFormatter(logging.Formatter):
@@ -32,18 +40,122 @@ class MaidMeowFormatter(logging.Formatter):
 
     def format(self, record):
         # 添加喵专属颜色和表情 (｡♥‿♥｡)
+        # 在副本上改，不然带颜色的levelname会跟着记录漏进文件日志
         log_color = self.COLORS.get(record.levelname, self.RESET)
         maid_emoji = self.MAID_EMOJIS.get(record.levelname, '🌸')
+        record = logging.makeLogRecord(record.__dict__)
         record.levelname = f"{log_color}{record.levelname}{self.RESET}"
         record.maid_emoji = f"{maid_emoji} ~"  # 添加喵的波浪号~
         return super().format(record)
 
 
+class RateLimitFilter(logging.Filter):
+    """
+    限流过滤器 (｡♥‿♥｡)
+    同一处代码（文件+行号）在 interval 秒内最多放行 burst 条，
+    下一个窗口的第一条会带上被省略的条数~ CRITICAL 不限流
+    """
+
+    def __init__(self, burst: int = 5, interval: float = 5.0):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self._windows: Dict[Tuple[str, int], List] = {}  # 位置 -> [窗口开始, 已放行, 已省略]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.CRITICAL:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+            elif window[1] < self.burst:
+                window[1] += 1
+                return True
+            else:
+                window[2] += 1
+                return False
+        if suppressed:
+            record.msg = f"{record.getMessage()} （省略了 {suppressed} 条同一位置的日志）"
+            record.args = None
+        return True
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """只入队不等待的QueueHandler，队列满了就丢弃并计数"""
+
+    def __init__(self, log_queue: "queue.Queue"):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 同一进程内的队列不需要序列化：只在调用线程里把参数拼进消息（参数之后可能被修改），
+        # 格式化和异常堆栈都留给后台线程
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+# 每个logger的队列处理器和后台监听器
+_queue_handlers: Dict[str, _NonBlockingQueueHandler] = {}
+_listeners: Dict[str, QueueListener] = {}
+
+
+def log_queue_depth(name: str = "MaidMonitor") -> int:
+    """
+    某个logger还没写出去的日志条数
+
+    Args:
+        name: logger名称
+
+    Returns:
+        队列深度
+    """
+    handler = _queue_handlers.get(name)
+    return handler.queue.qsize() if handler else 0
+
+
+def flush_logs():
+    """停止所有后台监听器（会先写完队列里剩下的日志）"""
+    for listener in _listeners.values():
+        if listener._thread is not None:
+            listener.stop()
+
+
+def _restart_listeners_after_fork():
+    """fork出来的子进程里没有后台线程，换新队列重新启动监听器"""
+    for name, listener in _listeners.items():
+        handler = _queue_handlers[name]
+        fresh_queue = queue.Queue(maxsize=handler.queue.maxsize)
+        handler.queue = fresh_queue
+        listener.queue = fresh_queue
+        listener._thread = None
+        listener.start()
+
+
+atexit.register(flush_logs)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_listeners_after_fork)
+
+
 def setup_logger(
     name: str = "MaidMonitor",
     level: int = logging.INFO,
     log_to_file: bool = True,
-    log_dir: str = "logs"
+    log_dir: str = "logs",
+    rate_limit: bool = True,
+    queue_size: int = 10000
 ) -> logging.Logger:
     """
     设置并返回一个配置好的喵logger~
@@ -53,6 +165,8 @@ def setup_logger(
         level: 日志级别（None则喵自动帮主人设置为INFO~）
         log_to_file: 是否记录到文件（喵会帮主人保存的~）
         log_dir: 日志文件目录
+        rate_limit: 是否对同一位置反复出现的日志限流
+        queue_size: 日志队列上限，写不过来时丢弃新日志而不是阻塞调用方
 
     Returns:
         配置好的logger实例（全心全意为主人服务~）
@@ -68,8 +182,11 @@ def setup_logger(
     if logger.handlers:
         return logger
 
+    handlers = []
+
     # 控制台处理器（带喵的温柔输出~）
-    console_handler = logging.StreamHandler(sys.stdout)
+    # 写到标准错误，标准输出留给 jsonl:- 检测输出和各命令的JSON报告，重定向后不会混进日志
+    console_handler = logging.StreamHandler(sys.stderr)
     console_handler.setLevel(level)
 
     console_formatter = MaidMeowFormatter(
@@ -77,7 +194,7 @@ def setup_logger(
         datefmt='%H:%M:%S'
     )
     console_handler.setFormatter(console_formatter)
-    logger.addHandler(console_handler)
+    handlers.append(console_handler)
 
     # 文件处理器（喵会帮主人认真记录每一个细节~）
     if log_to_file:
@@ -95,8 +212,19 @@ def setup_logger(
             datefmt='%Y-%m-%d %H:%M:%S'
         )
         file_handler.setFormatter(file_formatter)
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
+
+    # logger上只挂队列处理器，真正的处理器由后台监听器调用
+    queue_handler = _NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+    if rate_limit:
+        queue_handler.addFilter(RateLimitFilter())
+    logger.addHandler(queue_handler)
+    listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _queue_handlers[name] = queue_handler
+    _listeners[name] = listener
 
+    if log_to_file:
         logger.info(f"日志文件: {log_file}")
 
     return logger
@@ -0,0 +1,217 @@
+"""
+性能指标模块 - 喵帮主人看清每一步花了多少时间~ 🎀
+固定分桶的延迟直方图，记录开销很低，随时可以取 p50/p95/p99
+"""
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional
+from .tracing import Tracer
+
+
+def _default_bounds() -> List[float]:
+    """默认分桶上界（秒）：50µs 到约 20s，按 1.25 倍递增"""
+    bounds = []
+    bound = 50e-6
+    while bound < 20.0:
+        bounds.append(bound)
+        bound *= 1.25
+    return bounds
+
+
+class LatencyHistogram:
+    """
+    固定分桶延迟直方图 (｡♥‿♥｡)
+    记录只需一次二分查找和一次计数，不保存原始样本~
+    """
+
+    def __init__(self, bounds: Optional[List[float]] = None):
+        """
+        初始化直方图
+
+        Args:
+            bounds: 递增的分桶上界（秒），None则使用默认的对数分桶
+        """
+        self.bounds = bounds or _default_bounds()
+        self.counts = [0] * (len(self.bounds) + 1)  # 最后一个桶装超出上界的样本
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        """
+        记录一个样本
+
+        Args:
+            seconds: 耗时（秒）
+        """
+        self.counts[bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p: float) -> float:
+        """
+        估算百分位数（桶内线性插值）
+
+        Args:
+            p: 百分位（0-100）
+
+        Returns:
+            估算的耗时（秒），没有样本时返回0
+        """
+        if self.count == 0:
+            return 0.0
+        rank = p / 100.0 * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.counts):
+            if bucket_count == 0:
+                continue
+            if cumulative + bucket_count >= rank:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else self.max
+                fraction = (rank - cumulative) / bucket_count
+                return min(lower + (upper - lower) * fraction, self.max)
+            cumulative += bucket_count
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        """平均耗时（秒）"""
+        return self.total / self.count if self.count else 0.0
+
+    def reset(self):
+        """清空所有样本"""
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+class _StageTimer:
+    """阶段计时上下文（with语句结束时记录耗时，追踪启用时顺便记一个区间）"""
+
+    __slots__ = ("_histogram", "_name", "_tracer", "_start")
+
+    def __init__(self, histogram: LatencyHistogram, name: str, tracer: Optional[Tracer]):
+        self._histogram = histogram
+        self._name = name
+        self._tracer = tracer
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        self._histogram.record(end - self._start)
+        if self._tracer is not None and self._tracer.enabled:
+            self._tracer.add_complete(self._name, self._start, end)
+        return False
+
+
+class PipelineMetrics:
+    """
+    流水线分阶段延迟统计 (｡♥‿♥｡)
+    每个阶段一个直方图，找出到底是谁拖慢了帧率~
+    """
+
+    STAGES = (
+        "capture",        # 屏幕捕获
+        "preprocess",     # 模型预处理
+        "inference",      # 模型推理
+        "postprocess",    # 模型后处理 + 结果转换
+        "smoothing",      # 检测平滑
+        "overlay_paint",  # 覆盖层绘制
+        "end_to_end",     # 从捕获到绘制完成
+    )
+
+    def __init__(self, tracer: Optional[Tracer] = None):
+        """
+        初始化各阶段直方图
+
+        Args:
+            tracer: 追踪器，启用时各阶段同时记录为trace区间
+        """
+        self.tracer = tracer
+        self.histograms: Dict[str, LatencyHistogram] = {
+            stage: LatencyHistogram() for stage in self.STAGES
+        }
+
+    def record(self, stage: str, seconds: float):
+        """
+        记录某个阶段的耗时
+
+        Args:
+            stage: 阶段名称
+            seconds: 耗时（秒）
+        """
+        self.histograms[stage].record(seconds)
+
+    def record_span(self, stage: str, start: float, end: float):
+        """
+        记录某个阶段的起止时间（同时写入直方图和追踪器）
+
+        Args:
+            stage: 阶段名称
+            start: 开始时间（time.perf_counter）
+            end: 结束时间（time.perf_counter）
+        """
+        self.histograms[stage].record(end - start)
+        if self.tracer is not None and self.tracer.enabled:
+            self.tracer.add_complete(stage, start, end)
+
+    def time_stage(self, stage: str) -> _StageTimer:
+        """
+        返回阶段计时上下文
+
+        Args:
+            stage: 阶段名称
+
+        Returns:
+            with语句使用的计时器
+        """
+        return _StageTimer(self.histograms[stage], stage, self.tracer)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        获取各阶段统计摘要
+
+        Returns:
+            {阶段: {count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}}
+        """
+        result = {}
+        for stage, histogram in self.histograms.items():
+            result[stage] = {
+                "count": histogram.count,
+                "mean_ms": histogram.mean * 1000,
+                "p50_ms": histogram.percentile(50) * 1000,
+                "p95_ms": histogram.percentile(95) * 1000,
+                "p99_ms": histogram.percentile(99) * 1000,
+                "max_ms": histogram.max * 1000,
+            }
+        return result
+
+    def format_summary(self) -> str:
+        """
+        生成适合写进日志的多行摘要
+
+        Returns:
+            每个有样本的阶段一行
+        """
+        lines = []
+        for stage, stats in self.summary().items():
+            if stats["count"] == 0:
+                continue
+            lines.append(
+                f"   - {stage:<13} p50 {stats['p50_ms']:7.2f} ms | "
+                f"p95 {stats['p95_ms']:7.2f} ms | p99 {stats['p99_ms']:7.2f} ms | "
+                f"max {stats['max_ms']:7.2f} ms ({stats['count']} 次)"
+            )
+        return "\n".join(lines)
+
+    def reset(self):
+        """清空所有阶段的样本"""
+        for histogram in self.histograms.values():
+            histogram.reset()
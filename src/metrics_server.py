@@ -0,0 +1,202 @@
+"""
+指标导出模块 - 喵把运行数据交给Prometheus~ 🎀
+在本地起一个小小的HTTP服务，以Prometheus文本格式导出流水线指标
+"""
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+from .metrics import LatencyHistogram
+from .tracing import default_tracer
+from .logger import default_logger
+
+
+def process_rss_bytes() -> int:
+    """
+    获取当前进程的常驻内存（RSS）
+
+    Returns:
+        字节数，无法获取时返回0
+    """
+    # Linux: /proc/self/statm 第二列是常驻页数
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+
+    # 其他平台：尽量用psutil，没有就退回到峰值RSS
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024  # macOS单位是字节，Linux是KB
+    except ImportError:
+        return 0
+
+
+def peak_rss_bytes() -> int:
+    """
+    获取当前进程的峰值常驻内存
+
+    Returns:
+        字节数，无法获取时退回到当前RSS
+    """
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024  # macOS单位是字节，Linux是KB
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss)  # Windows有峰值工作集
+    except ImportError:
+        return process_rss_bytes()
+
+
+def _format_labels(labels: Optional[Dict[str, str]]) -> str:
+    """把标签字典格式化成 {k="v",...}"""
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class PrometheusText:
+    """
+    Prometheus文本格式构建器 (｡♥‿♥｡)
+    同名指标的 HELP/TYPE 只输出一次~
+    """
+
+    def __init__(self, prefix: str = "yolo_monitor"):
+        """
+        初始化构建器
+
+        Args:
+            prefix: 指标名前缀
+        """
+        self.prefix = prefix
+        self._lines: List[str] = []
+        self._declared = set()
+
+    def _declare(self, name: str, metric_type: str, help_text: str) -> str:
+        full_name = f"{self.prefix}_{name}" if self.prefix else name
+        if full_name not in self._declared:
+            self._declared.add(full_name)
+            self._lines.append(f"# HELP {full_name} {help_text}")
+            self._lines.append(f"# TYPE {full_name} {metric_type}")
+        return full_name
+
+    def gauge(self, name: str, help_text: str, value: float, labels: Optional[Dict[str, str]] = None):
+        """输出一个gauge样本"""
+        full_name = self._declare(name, "gauge", help_text)
+        self._lines.append(f"{full_name}{_format_labels(labels)} {float(value)}")
+
+    def counter(self, name: str, help_text: str, value: float, labels: Optional[Dict[str, str]] = None):
+        """输出一个counter样本（名字会自动加上 _total 后缀）"""
+        full_name = self._declare(f"{name}_total", "counter", help_text)
+        self._lines.append(f"{full_name}{_format_labels(labels)} {float(value)}")
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        histogram: LatencyHistogram,
+        labels: Optional[Dict[str, str]] = None
+    ):
+        """输出一个直方图（累积分桶 + _sum + _count）"""
+        full_name = self._declare(name, "histogram", help_text)
+        labels = dict(labels or {})
+        counts = list(histogram.counts)  # 先拷贝一份，避免和记录线程打架
+        cumulative = 0
+        for bound, bucket_count in zip(histogram.bounds, counts):
+            cumulative += bucket_count
+            bucket_labels = dict(labels, le=f"{bound:.6g}")
+            self._lines.append(f"{full_name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+        cumulative += counts[-1]
+        self._lines.append(f"{full_name}_bucket{_format_labels(dict(labels, le='+Inf'))} {cumulative}")
+        self._lines.append(f"{full_name}_sum{_format_labels(labels)} {histogram.total}")
+        self._lines.append(f"{full_name}_count{_format_labels(labels)} {cumulative}")
+
+    def render(self) -> str:
+        """生成最终文本"""
+        return "\n".join(self._lines) + "\n"
+
+
+class MetricsServer:
+    """
+    本地指标HTTP服务 (｡♥‿♥｡)
+    在独立的守护线程里运行，GET /metrics 返回Prometheus文本~
+    """
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self, collector: Callable[[], str], host: str = "127.0.0.1", port: int = 9108):
+        """
+        初始化指标服务
+
+        Args:
+            collector: 每次抓取时调用，返回Prometheus文本
+            host: 监听地址（默认只监听本机）
+            port: 监听端口，0表示随机端口
+        """
+        self.collector = collector
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """启动服务线程"""
+        collector = self.collector
+        content_type = self.CONTENT_TYPE
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                try:
+                    with default_tracer.span("metrics_scrape", cat="metrics"):
+                        body = collector().encode("utf-8")
+                except Exception as e:
+                    default_logger.error(f"导出指标失败: {e}", exc_info=True)
+                    self.send_error(500)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # 抓取很频繁，不往日志里刷屏
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), _Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="MetricsServer", daemon=True
+        )
+        self._thread.start()
+        default_logger.info(f"指标服务已启动: http://{self.host}:{self.port}/metrics")
+
+    def stop(self):
+        """停止服务"""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            default_logger.info("指标服务已停止")
@@ -0,0 +1,544 @@
+"""
+后处理模块 - 喵用NumPy直接解码模型输出，先筛掉不要的类别和低置信度再解码框~ 🎀
+ultralytics 的 NMS 会先把所有过了置信度的候选框都转成 xyxy、在全部80个类别上取最大值，
+最后才按 classes 过滤；只检测人的时候，大部分工作都花在马上要丢掉的行上。
+NumpyPostprocessor 先只看要检测的那几个类别的分数列挑出候选，再只给候选解码框、做分类别NMS，
+结果是 DetectionArrays（几个数组，不为每个框建对象），和 ultralytics 的输出一致
+
+两种模型输出都支持:
+    原始输出 (batch, 4 + 类别数, anchors)：xywh + 各类别分数，需要NMS
+    端到端输出 (batch, 框数, 6)：x1, y1, x2, y2, 置信度, 类别，只需要过滤
+
+用法:
+    python main.py postprocess --synthetic --classes 0               # 合成输出上和ultralytics对比
+    python main.py postprocess recordings/capture --model yolo26n.pt # 真实模型输出上对比
+    config.detector.postprocess = "numpy"
+"""
+import argparse
+import json
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+import cv2
+import numpy as np
+from .yolo_detector import DetectionResult
+from .logger import default_logger
+
+# 分类别NMS时按类别平移框的距离（和ultralytics一致，不同类别的框永远不会重叠）
+MAX_WH = 7680
+
+_HAS_CV2_NMS = hasattr(cv2, "dnn") and hasattr(cv2.dnn, "NMSBoxes")
+
+
+@dataclass
+class DetectionArrays:
+    """一张图的检测结果（数组形式）"""
+    boxes: np.ndarray      # (N, 4) float32，原图坐标的 x1, y1, x2, y2
+    scores: np.ndarray     # (N,) float32
+    class_ids: np.ndarray  # (N,) int64
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    @classmethod
+    def empty(cls) -> "DetectionArrays":
+        return cls(np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int64))
+
+    def to_results(self, names: Dict[int, str]) -> List[DetectionResult]:
+        """
+        转换成DetectionResult列表（给平滑器、覆盖层这些按对象处理的下游）
+
+        Args:
+            names: 类别ID -> 类别名
+
+        Returns:
+            DetectionResult列表
+        """
+        return [
+            DetectionResult(
+                box=tuple(box),
+                confidence=score,
+                class_id=class_id,
+                class_name=names.get(class_id, f"class_{class_id}")
+            )
+            for box, score, class_id in zip(
+                self.boxes.astype(int).tolist(), self.scores.tolist(), self.class_ids.tolist()
+            )
+        ]
+
+
+def xywh_to_xyxy(xywh: np.ndarray) -> np.ndarray:
+    """中心点+宽高 -> 左上右下"""
+    xyxy = np.empty_like(xywh)
+    half_w = xywh[:, 2] / 2
+    half_h = xywh[:, 3] / 2
+    xyxy[:, 0] = xywh[:, 0] - half_w
+    xyxy[:, 1] = xywh[:, 1] - half_h
+    xyxy[:, 2] = xywh[:, 0] + half_w
+    xyxy[:, 3] = xywh[:, 1] + half_h
+    return xyxy
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """
+    贪心非极大值抑制（每轮用向量运算去掉和当前最高分框重叠太多的所有框）
+
+    Args:
+        boxes: (N, 4) xyxy
+        scores: (N,)
+        iou_threshold: IoU大于它的框被抑制
+
+    Returns:
+        保留的下标，按分数从高到低
+    """
+    if len(boxes) == 0:
+        return np.zeros(0, np.int64)
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+    order = np.argsort(-scores, kind="stable")
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        if not rest.size:
+            break
+        inter_w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        inter_h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = inter_w * inter_h
+        iou = inter / (areas[i] + areas[rest] - inter)
+        order = rest[iou <= iou_threshold]
+    return np.asarray(keep, dtype=np.int64)
+
+
+def batched_nms(
+    boxes: np.ndarray,
+    scores: np.ndarray,
+    class_ids: np.ndarray,
+    iou_threshold: float,
+    agnostic: bool = False
+) -> np.ndarray:
+    """
+    分类别NMS：把每个类别的框平移到互不重叠的区域，一次NMS处理所有类别
+    （优先用 OpenCV 的 C++ 实现，没有 dnn 模块时退回 nms()）
+
+    Args:
+        boxes: (N, 4) xyxy
+        scores: (N,)
+        class_ids: (N,)
+        iou_threshold: IoU阈值
+        agnostic: True表示不分类别
+
+    Returns:
+        保留的下标，按分数从高到低
+    """
+    if len(boxes) == 0:
+        return np.zeros(0, np.int64)
+    if not agnostic:
+        boxes = boxes + (class_ids * MAX_WH).astype(boxes.dtype)[:, None]
+    if not _HAS_CV2_NMS:
+        return nms(boxes, scores, iou_threshold)
+    xywh = np.empty(boxes.shape, np.float64)  # OpenCV 要 (x, y, w, h)
+    xywh[:, :2] = boxes[:, :2]
+    xywh[:, 2:] = boxes[:, 2:] - boxes[:, :2]
+    keep = cv2.dnn.NMSBoxes(xywh, scores.astype(np.float32), 0.0, iou_threshold)
+    return np.asarray(keep, dtype=np.int64).reshape(-1)
+
+
+def scale_boxes(boxes: np.ndarray, input_shape: Tuple[int, int], orig_shape: Tuple[int, int]) -> np.ndarray:
+    """
+    把letterbox输入尺寸上的框还原到原图坐标并裁剪到画面内（原地修改，算法和ultralytics一致）
+
+    Args:
+        boxes: (N, 4) xyxy
+        input_shape: 模型输入的 (高, 宽)
+        orig_shape: 原图的 (高, 宽)
+
+    Returns:
+        boxes 本身
+    """
+    gain = min(input_shape[0] / orig_shape[0], input_shape[1] / orig_shape[1])
+    new_h, new_w = round(orig_shape[0] * gain), round(orig_shape[1] * gain)
+    gain_y, gain_x = new_h / orig_shape[0], new_w / orig_shape[1]
+    pad_x = round((input_shape[1] - new_w) / 2 - 0.1)
+    pad_y = round((input_shape[0] - new_h) / 2 - 0.1)
+    xs, ys = boxes[:, 0::2], boxes[:, 1::2]  # 视图，下面都是原地运算
+    xs -= pad_x
+    ys -= pad_y
+    xs /= gain_x
+    ys /= gain_y
+    np.clip(xs, 0, orig_shape[1], out=xs)
+    np.clip(ys, 0, orig_shape[0], out=ys)
+    return boxes
+
+
+def _to_numpy(prediction) -> np.ndarray:
+    """模型输出（torch张量、numpy数组，或者它们的列表/元组）-> float32 numpy数组"""
+    if isinstance(prediction, (list, tuple)):
+        prediction = prediction[0]  # 训练结构的模型会多返回一份中间结果
+    if hasattr(prediction, "detach"):
+        prediction = prediction.detach().cpu().numpy()
+    return np.asarray(prediction, dtype=np.float32)
+
+
+class NumpyPostprocessor:
+    """
+    NumPy后处理器 (｡♥‿♥｡)
+    结果和 ultralytics 的 non_max_suppression + scale_boxes 一致（框的类别是全部类别里分数最高的那个）
+    """
+
+    def __init__(
+        self,
+        confidence_threshold: float = 0.5,
+        iou_threshold: float = 0.45,
+        classes: Optional[Sequence[int]] = None,
+        max_det: int = 300,
+        agnostic: bool = False,
+        max_nms: int = 30000
+    ):
+        """
+        初始化后处理器
+
+        Args:
+            confidence_threshold: 置信度阈值
+            iou_threshold: NMS的IoU阈值
+            classes: 要保留的类别ID，None表示所有类别
+            max_det: 每张图最多保留的框数
+            agnostic: 是否不分类别做NMS
+            max_nms: 进入NMS的候选框上限（按分数取前这么多个）
+        """
+        self.confidence_threshold = confidence_threshold
+        self.iou_threshold = iou_threshold
+        self.classes = None if classes is None else np.asarray(list(classes), dtype=np.int64)
+        self.max_det = max_det
+        self.agnostic = agnostic
+        self.max_nms = max_nms
+
+    def __call__(
+        self,
+        prediction,
+        input_shape: Tuple[int, int],
+        orig_shapes: Sequence[Tuple[int, ...]],
+        end2end: bool = False
+    ) -> List[DetectionArrays]:
+        """
+        处理一批模型输出
+
+        Args:
+            prediction: 模型输出，(batch, 4 + 类别数, anchors) 或端到端的 (batch, 框数, 6)
+            input_shape: 模型输入的 (高, 宽)
+            orig_shapes: 每张原图的形状（只用前两维）
+            end2end: 是否为端到端输出（最后一维是6时也会自动当作端到端）
+
+        Returns:
+            每张图一个 DetectionArrays（原图坐标）
+        """
+        prediction = _to_numpy(prediction)
+        end2end = end2end or prediction.shape[-1] == 6
+        results = []
+        for pred, orig_shape in zip(prediction, orig_shapes):
+            arrays = self._filter_end2end(pred) if end2end else self._decode(pred)
+            if len(arrays):
+                scale_boxes(arrays.boxes, input_shape, orig_shape[:2])
+            results.append(arrays)
+        return results
+
+    def _decode(self, pred: np.ndarray) -> DetectionArrays:
+        """原始输出 (4 + 类别数, anchors)：筛候选 -> 只解码候选的框 -> 分类别NMS"""
+        class_scores = pred[4:]
+        if self.classes is None:
+            candidates = np.flatnonzero(class_scores.max(axis=0) > self.confidence_threshold)
+            if not candidates.size:
+                return DetectionArrays.empty()
+            candidate_scores = class_scores[:, candidates]
+            class_ids = candidate_scores.argmax(axis=0)
+        else:
+            # 只在要检测的几个类别的分数列上筛，过不了阈值的anchor不会再被碰
+            candidates = np.flatnonzero(class_scores[self.classes].max(axis=0) > self.confidence_threshold)
+            if not candidates.size:
+                return DetectionArrays.empty()
+            # 剩下的少量候选再看全部类别：最高分是别的类别的框，ultralytics也会丢掉
+            candidate_scores = class_scores[:, candidates]
+            class_ids = candidate_scores.argmax(axis=0)
+            wanted = np.isin(class_ids, self.classes)
+            candidates, candidate_scores, class_ids = candidates[wanted], candidate_scores[:, wanted], class_ids[wanted]
+        scores = candidate_scores[class_ids, np.arange(len(class_ids))]
+
+        if len(scores) > self.max_nms:
+            top = np.argsort(-scores, kind="stable")[:self.max_nms]
+            candidates, scores, class_ids = candidates[top], scores[top], class_ids[top]
+
+        boxes = xywh_to_xyxy(pred[:4, candidates].T)
+        keep = batched_nms(boxes, scores, class_ids, self.iou_threshold, self.agnostic)[:self.max_det]
+        return DetectionArrays(boxes[keep], scores[keep], class_ids[keep].astype(np.int64))
+
+    def _filter_end2end(self, pred: np.ndarray) -> DetectionArrays:
+        """端到端输出 (框数, 6)：模型已经去过重，只按置信度和类别过滤"""
+        mask = pred[:, 4] > self.confidence_threshold
+        class_ids = pred[:, 5].astype(np.int64)
+        if self.classes is not None:
+            mask &= np.isin(class_ids, self.classes)
+        index = np.flatnonzero(mask)[:self.max_det]
+        return DetectionArrays(pred[index, :4].copy(), pred[index, 4].copy(), class_ids[index])
+
+
+def ultralytics_postprocess(
+    prediction,
+    input_shape: Tuple[int, int],
+    orig_shapes: Sequence[Tuple[int, ...]],
+    confidence_threshold: float,
+    iou_threshold: float,
+    classes: Optional[Sequence[int]] = None,
+    max_det: int = 300,
+    end2end: bool = False
+) -> List[DetectionArrays]:
+    """
+    ultralytics 自己的后处理（DetectionPredictor.postprocess 的做法），作为对比基准
+
+    Args:
+        prediction: torch 张量形式的模型输出
+        其余参数同 NumpyPostprocessor
+
+    Returns:
+        每张图一个 DetectionArrays
+    """
+    from ultralytics.utils import nms as ultralytics_nms, ops
+
+    outputs = ultralytics_nms.non_max_suppression(
+        prediction, confidence_threshold, iou_threshold, classes,
+        max_det=max_det, end2end=end2end
+    )
+    results = []
+    for output, orig_shape in zip(outputs, orig_shapes):
+        boxes = ops.scale_boxes(input_shape, output[:, :4], orig_shape[:2])
+        results.append(DetectionArrays(
+            boxes.cpu().numpy(),
+            output[:, 4].cpu().numpy(),
+            output[:, 5].cpu().numpy().astype(np.int64)
+        ))
+    return results
+
+
+def synthetic_prediction(
+    num_classes: int = 80,
+    input_shape: Tuple[int, int] = (384, 640),
+    objects: int = 20,
+    seed: int = 0
+) -> np.ndarray:
+    """
+    生成一份像模型原始输出的合成数据：每个物体周围一簇互相重叠的候选框，背景anchor分数很低
+
+    Args:
+        num_classes: 类别数
+        input_shape: 模型输入的 (高, 宽)，anchor 数按步长 8/16/32 计算
+        objects: 物体数
+        seed: 随机种子
+
+    Returns:
+        (1, 4 + 类别数, anchors) float32
+    """
+    rng = np.random.default_rng(seed)
+    height, width = input_shape
+    anchors = sum((height // stride) * (width // stride) for stride in (8, 16, 32))
+    pred = np.empty((4 + num_classes, anchors), np.float32)
+    pred[0] = rng.uniform(0, width, anchors)
+    pred[1] = rng.uniform(0, height, anchors)
+    pred[2:4] = rng.uniform(4, 64, (2, anchors))
+    pred[4:] = rng.beta(0.5, 40, (num_classes, anchors))  # 背景：绝大多数接近0
+
+    # 一半的物体是人（类别0），其余随机
+    object_classes = np.where(np.arange(objects) % 2 == 0, 0, rng.integers(1, num_classes, objects))
+    cluster = max(anchors // 200, 8)
+    for object_class in object_classes:
+        center = rng.uniform([0.1 * width, 0.1 * height], [0.9 * width, 0.9 * height])
+        size = rng.uniform(20, min(width, height) * 0.5, 2)
+        index = rng.choice(anchors, cluster, replace=False)
+        pred[0:2, index] = (center + rng.normal(0, 0.08, (cluster, 2)) * size).T
+        pred[2:4, index] = (size * rng.uniform(0.8, 1.2, (cluster, 2))).T
+        pred[4 + object_class, index] = rng.uniform(0.2, 0.95, cluster)
+        # 有些框在别的类别上分数更高（ultralytics会按最高分的类别处理它们）
+        confused = index[: cluster // 4]
+        pred[4 + rng.integers(0, num_classes), confused] = rng.uniform(0.2, 0.95, len(confused))
+    return pred[None]
+
+
+def collect_model_predictions(
+    model_path: str,
+    frames: Sequence[np.ndarray],
+    imgsz: int = 640
+) -> List[Tuple[object, Tuple[int, int], List[Tuple[int, ...]], bool]]:
+    """
+    用 ultralytics 的预处理和推理拿到真实的原始模型输出
+
+    Args:
+        model_path: 模型路径（任何 ultralytics 支持的格式）
+        frames: BGR图像
+        imgsz: 输入尺寸
+
+    Returns:
+        每帧一个 (模型输出张量, 输入 (高, 宽), [原图形状], 是否端到端)
+    """
+    import torch
+    from ultralytics import YOLO
+
+    model = YOLO(model_path)
+    model(frames[0], imgsz=imgsz, verbose=False)  # 让 ultralytics 建好 predictor
+    predictor = model.predictor
+    end2end = bool(getattr(predictor.model, "end2end", False))
+    predictions = []
+    with torch.inference_mode():
+        for frame in frames:
+            image = predictor.preprocess([frame])
+            output = predictor.inference(image)
+            if isinstance(output, (list, tuple)):
+                output = output[0]
+            predictions.append((output, tuple(image.shape[2:]), [frame.shape], end2end))
+    return predictions
+
+
+def _same_detections(a: DetectionArrays, b: DetectionArrays, tolerance: float = 0.5) -> Tuple[bool, float]:
+    """两份结果是否一致（框的顺序可以不同），以及框坐标的最大误差"""
+    if len(a) != len(b):
+        return False, float("inf")
+    if not len(a):
+        return True, 0.0
+    order_a = np.lexsort((a.boxes[:, 0], -a.scores, a.class_ids))
+    order_b = np.lexsort((b.boxes[:, 0], -b.scores, b.class_ids))
+    if not np.array_equal(a.class_ids[order_a], b.class_ids[order_b]):
+        return False, float("inf")
+    error = float(np.abs(a.boxes[order_a] - b.boxes[order_b]).max())
+    score_error = float(np.abs(a.scores[order_a] - b.scores[order_b]).max())
+    return error <= tolerance and score_error <= 1e-5, error
+
+
+def compare_postprocess(
+    predictions: Sequence[Tuple[object, Tuple[int, int], List[Tuple[int, ...]], bool]],
+    confidence_threshold: float = 0.5,
+    iou_threshold: float = 0.45,
+    classes: Optional[Sequence[int]] = None,
+    repeats: int = 5
+) -> Dict:
+    """
+    在同一批模型输出上比较 ultralytics 后处理和 NumpyPostprocessor：结果是否一致、每帧耗时
+
+    Args:
+        predictions: collect_model_predictions() 的结果（合成数据也用同样的格式）
+        confidence_threshold: 置信度阈值
+        iou_threshold: NMS的IoU阈值
+        classes: 要保留的类别
+        repeats: 每帧重复计时的次数（取每帧的中位数）
+
+    Returns:
+        一致性和耗时统计（毫秒）
+    """
+    import torch
+    try:
+        import torchvision  # noqa: F401  ultralytics 导入了 torchvision 时才用它的C++ NMS，和实际推理时保持一致
+    except ImportError:
+        pass
+
+    postprocessor = NumpyPostprocessor(confidence_threshold, iou_threshold, classes)
+    timings = {"ultralytics": [], "numpy": []}
+    mismatched = []
+    max_box_error = 0.0
+    detections = 0
+    for frame_index, (output, input_shape, orig_shapes, end2end) in enumerate(predictions):
+        tensor = output if isinstance(output, torch.Tensor) else torch.from_numpy(output)
+
+        def run_ultralytics():
+            return ultralytics_postprocess(
+                tensor, input_shape, orig_shapes, confidence_threshold, iou_threshold,
+                classes, end2end=end2end
+            )
+
+        def run_numpy():
+            return postprocessor(tensor, input_shape, orig_shapes, end2end=end2end)
+
+        for name, run in (("ultralytics", run_ultralytics), ("numpy", run_numpy)):
+            samples = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                result = run()
+                samples.append(time.perf_counter() - start)
+            timings[name].append(float(np.median(samples)) * 1000)
+            if name == "ultralytics":
+                expected = result
+
+        for expected_arrays, actual_arrays in zip(expected, result):
+            same, error = _same_detections(expected_arrays, actual_arrays)
+            detections += len(expected_arrays)
+            if not same:
+                mismatched.append(frame_index)
+            elif error > max_box_error:
+                max_box_error = error
+
+    summary = {
+        "frames": len(predictions),
+        "detections": detections,
+        "mismatched_frames": mismatched,
+        "max_box_error_px": max_box_error,
+    }
+    for name, samples in timings.items():
+        summary[f"{name}_ms"] = {
+            "mean": float(np.mean(samples)),
+            "p50": float(np.percentile(samples, 50)),
+            "p95": float(np.percentile(samples, 95)),
+        }
+    summary["speedup"] = summary["ultralytics_ms"]["mean"] / max(summary["numpy_ms"]["mean"], 1e-9)
+    return summary
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """命令行参数"""
+    parser = argparse.ArgumentParser(
+        prog="main.py postprocess", description="NumPy后处理和ultralytics后处理的一致性/耗时对比 喵~"
+    )
+    parser.add_argument("source", nargs="?", help="捕获录制目录或视频文件（真实模型输出）")
+    parser.add_argument("--synthetic", action="store_true", help="用合成的原始输出，不需要模型和权重")
+    parser.add_argument("--model", default="yolo26n.pt", help="模型路径")
+    parser.add_argument("--imgsz", type=int, default=640, help="输入尺寸")
+    parser.add_argument("--conf", type=float, default=0.5, help="置信度阈值")
+    parser.add_argument("--iou", type=float, default=0.45, help="NMS的IoU阈值")
+    parser.add_argument("--classes", type=int, nargs="*", default=[0], help="检测类别（不填表示所有类别）")
+    parser.add_argument("--frames", type=int, default=50, help="对比的帧数")
+    parser.add_argument("--repeats", type=int, default=5, help="每帧重复计时的次数")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    后处理对比命令入口
+
+    Returns:
+        进程退出码（结果不一致时为1）
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    classes = args.classes or None
+    if args.synthetic:
+        predictions = [
+            (synthetic_prediction(seed=i), (384, 640), [(1080, 1920, 3)], False)
+            for i in range(args.frames)
+        ]
+    else:
+        if not args.source:
+            parser.error("需要 source（或者使用 --synthetic）")
+        from .annotation import iter_source_frames
+
+        frames, _, _ = iter_source_frames(args.source)
+        frames = [frame for frame, _ in zip(frames, range(args.frames))]
+        predictions = collect_model_predictions(args.model, frames, args.imgsz)
+
+    summary = compare_postprocess(predictions, args.conf, args.iou, classes, args.repeats)
+    default_logger.info(
+        f"🧮 后处理: ultralytics {summary['ultralytics_ms']['mean']:.2f} ms/帧 | "
+        f"numpy {summary['numpy_ms']['mean']:.2f} ms/帧 ({summary['speedup']:.1f}x) | "
+        f"{summary['detections']} 个框，不一致 {len(summary['mismatched_frames'])} 帧"
+    )
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    return 1 if summary["mismatched_frames"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
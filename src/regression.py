@@ -0,0 +1,391 @@
+"""
+回归测试模块 - 喵确认换了更快的做法以后，检测结果没有悄悄变差~ 🎀
+在固定的帧集合上跑 YOLODetector + DetectionSmoother，把结果和存下来的黄金输出逐帧比较
+（按类别匹配框，检查召回率/精确率/匹配框的平均IOU），同时记录每个配置的延迟和吞吐，
+精度或速度掉得超过阈值时退出码为1，可以直接放进CI
+
+黄金文件（默认 regression/golden.json，应该提交到仓库）包含:
+    corpus     帧集合的来源和指纹（帧内容变了会直接报错，免得比较没有意义）
+    reference  录制黄金输出时的检测配置
+    frames     每帧的检测结果和平滑后结果
+    baselines  每个配置在各类机器上的吞吐/延迟基线（速度只和同一类机器上的基线比较）
+               机器按CPU型号/核数/架构区分，不看主机名（CI runner 每次的主机名都不一样），
+               同型号CPU的不同机器可以用 --machine 加标签区分
+
+用法:
+    python main.py regress --source recordings/corpus --update                  # 录制黄金输出 + 速度基线
+    python main.py regress --source recordings/corpus --backends pytorch onnx --postprocess ultralytics numpy
+    python main.py regress --source recordings/corpus --update-baselines        # 新机器上只补速度基线
+    python main.py regress --source recordings/corpus --machine ci-large --require-baseline   # CI里没有基线也算失败
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import platform
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from .auto_tuner import detection_f1, matched_ious
+from .benchmark import environment_info, export_model, load_frames, run_benchmark, set_thread_count
+from .yolo_detector import DetectionResult, YOLODetector
+from .logger import default_logger
+
+DEFAULT_GOLDEN = "regression/golden.json"
+
+
+def frame_fingerprint(frames: Sequence[np.ndarray]) -> str:
+    """帧集合的指纹（形状 + 像素内容的SHA-1）"""
+    digest = hashlib.sha1()
+    for frame in frames:
+        digest.update(str(frame.shape).encode("ascii"))
+        digest.update(np.ascontiguousarray(frame).data)
+    return digest.hexdigest()
+
+
+def cpu_model() -> str:
+    """CPU型号（Linux读 /proc/cpuinfo，其他平台用 platform.processor()）"""
+    try:
+        with open("/proc/cpuinfo", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return " ".join(line.split(":", 1)[1].split())
+    except OSError:
+        pass
+    return platform.processor() or "unknown-cpu"
+
+
+def machine_id(label: Optional[str] = None) -> str:
+    """
+    速度基线的机器键：CPU型号/核数/架构（不用主机名，CI上每次都会变）
+
+    Args:
+        label: 机器标签（例如CI runner类型），同型号CPU的机器需要分开时用
+
+    Returns:
+        例如 "ci-large:AMD EPYC 7763 64-Core Processor/4cpu/x86_64"
+    """
+    key = f"{cpu_model()}/{os.cpu_count()}cpu/{platform.machine()}"
+    return f"{label}:{key}" if label else key
+
+
+def config_key(config: Dict) -> str:
+    """配置 -> 基线表里的键，例如 yolo26n.pt@640/pytorch/numpy/4t"""
+    return (
+        f"{config['model']}@{config['imgsz']}/{config['backend']}/"
+        f"{config['postprocess']}/{config['threads']}t"
+    )
+
+
+def encode_detections(detections: Sequence[DetectionResult]) -> List[List]:
+    """检测结果 -> 紧凑的JSON行 [x1, y1, x2, y2, 置信度, 类别ID, 跟踪ID]"""
+    return [
+        [*map(int, d.box), round(float(d.confidence), 4), int(d.class_id), int(d.track_id)]
+        for d in detections
+    ]
+
+
+def decode_detections(rows: Sequence[Sequence], names: Dict[str, str]) -> List[DetectionResult]:
+    """encode_detections() 的逆操作"""
+    return [
+        DetectionResult(
+            box=(x1, y1, x2, y2), confidence=confidence, class_id=class_id,
+            class_name=names.get(str(class_id), f"class_{class_id}"), track_id=track_id
+        )
+        for x1, y1, x2, y2, confidence, class_id, track_id in rows
+    ]
+
+
+def compare_outputs(
+    golden: List[List[DetectionResult]],
+    actual: List[List[DetectionResult]],
+    iou_threshold: float = 0.5
+) -> Dict[str, float]:
+    """
+    逐帧和黄金输出比较
+
+    Args:
+        golden: 黄金输出（当作真值）
+        actual: 本次输出
+        iou_threshold: 算作匹配的最小IOU
+
+    Returns:
+        {precision, recall, f1, mean_iou}（mean_iou 是匹配上的框的平均IOU，没有匹配时为1）
+    """
+    result = detection_f1(golden, actual, iou_threshold)
+    ious = [iou for ref, cand in zip(golden, actual) for iou in matched_ious(ref, cand, iou_threshold)]
+    result["mean_iou"] = float(np.mean(ious)) if ious else 1.0
+    return result
+
+
+def run_configuration(
+    frames: List[np.ndarray],
+    config: Dict,
+    confidence_threshold: float,
+    iou_threshold: float,
+    classes: Optional[List[int]],
+    warmup: int = 3
+) -> Tuple[Dict, List[List[DetectionResult]], List[List[DetectionResult]]]:
+    """
+    跑一个配置
+
+    Args:
+        frames: 帧集合
+        config: {"model", "imgsz", "backend", "postprocess", "threads"}
+        confidence_threshold: 置信度阈值
+        iou_threshold: NMS的IOU阈值
+        classes: 检测类别
+        warmup: 预热帧数
+
+    Returns:
+        (run_benchmark 的结果, 每帧检测结果, 每帧平滑后结果)
+    """
+    set_thread_count(config["threads"])
+    detector = YOLODetector(
+        model_path=export_model(config["model"], config["backend"], config["imgsz"]),
+        confidence_threshold=confidence_threshold,
+        iou_threshold=iou_threshold,
+        classes=classes,
+        imgsz=config["imgsz"],
+        postprocess=config["postprocess"]
+    )
+    outputs = []
+    result = run_benchmark(detector, frames, warmup=warmup, outputs=outputs)
+    result["names"] = {str(k): v for k, v in detector.model.names.items()}
+    return result, [raw for raw, _ in outputs], [smoothed for _, smoothed in outputs]
+
+
+def evaluate(
+    result: Dict,
+    accuracy: Dict[str, Dict[str, float]],
+    baseline: Optional[Dict],
+    min_recall: float = 0.95,
+    min_precision: float = 0.9,
+    min_mean_iou: float = 0.85,
+    max_slowdown: float = 0.2,
+    require_baseline: bool = False
+) -> List[Dict]:
+    """
+    逐项检查
+
+    Args:
+        result: run_configuration() 的测试结果
+        accuracy: {"raw": compare_outputs(...), "smoothed": compare_outputs(...)}
+        baseline: 同一台机器上这个配置的速度基线，None表示没有（跳过速度检查）
+        min_recall: 召回率下限
+        min_precision: 精确率下限
+        min_mean_iou: 匹配框平均IOU下限
+        max_slowdown: 吞吐最多允许比基线低多少（比例），p95延迟同理
+        require_baseline: 没有速度基线时是否算作失败（否则只跳过速度检查）
+
+    Returns:
+        检查项列表 [{name, value, limit, passed}]
+    """
+    checks = []
+    for stage in ("raw", "smoothed"):
+        for metric, limit in (("recall", min_recall), ("precision", min_precision), ("mean_iou", min_mean_iou)):
+            value = accuracy[stage][metric]
+            checks.append({"name": f"{stage}.{metric}", "value": value, "limit": limit, "passed": value >= limit})
+    if baseline:
+        fps_limit = baseline["throughput_fps"] * (1 - max_slowdown)
+        p95_limit = baseline["latency"]["p95_ms"] * (1 + max_slowdown)
+        checks.append({
+            "name": "throughput_fps", "value": result["throughput_fps"], "limit": fps_limit,
+            "passed": result["throughput_fps"] >= fps_limit
+        })
+        checks.append({
+            "name": "latency.p95_ms", "value": result["latency"]["p95_ms"], "limit": p95_limit,
+            "passed": result["latency"]["p95_ms"] <= p95_limit
+        })
+    elif require_baseline:
+        checks.append({"name": "baseline", "value": None, "limit": None, "passed": False})
+    return checks
+
+
+def _baseline_entry(result: Dict) -> Dict:
+    return {
+        "throughput_fps": result["throughput_fps"],
+        "latency": result["latency"],
+        "recorded": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """命令行参数"""
+    parser = argparse.ArgumentParser(prog="main.py regress", description="精度/速度回归测试 喵~")
+    parser.add_argument("--source", default=None, help="固定帧集合：捕获录制目录、图片目录或视频文件（默认合成帧）")
+    parser.add_argument("--frames", type=int, default=100, help="帧数")
+    parser.add_argument("--size", type=int, nargs=2, default=(1920, 1080), metavar=("W", "H"), help="合成帧尺寸")
+    parser.add_argument("--golden", default=DEFAULT_GOLDEN, help="黄金文件路径")
+    parser.add_argument("--models", nargs="+", default=["yolo26n.pt"], help="模型列表")
+    parser.add_argument("--imgsz", type=int, nargs="+", default=[640], help="输入尺寸列表")
+    parser.add_argument("--backends", nargs="+", default=["pytorch"], help="推理后端列表（pytorch/onnx/openvino/...）")
+    parser.add_argument("--postprocess", nargs="+", default=["ultralytics"], choices=["ultralytics", "numpy"],
+                        help="后处理方式列表")
+    parser.add_argument("--threads", type=int, nargs="+", default=[os.cpu_count() or 1], help="线程数列表")
+    parser.add_argument("--conf", type=float, default=0.5, help="置信度阈值")
+    parser.add_argument("--iou", type=float, default=0.45, help="NMS的IOU阈值")
+    parser.add_argument("--classes", type=int, nargs="*", default=[0], help="检测类别（不填表示所有类别）")
+    parser.add_argument("--warmup", type=int, default=3, help="预热帧数")
+    parser.add_argument("--match-iou", type=float, default=0.5, help="和黄金输出算作匹配的最小IOU")
+    parser.add_argument("--min-recall", type=float, default=0.95, help="召回率下限")
+    parser.add_argument("--min-precision", type=float, default=0.9, help="精确率下限")
+    parser.add_argument("--min-mean-iou", type=float, default=0.85, help="匹配框平均IOU下限")
+    parser.add_argument("--max-slowdown", type=float, default=0.2, help="吞吐/p95延迟最多允许比基线差多少（比例）")
+    parser.add_argument("--update", action="store_true",
+                        help="用第一个配置重新录制黄金输出，并记录所有配置的速度基线")
+    parser.add_argument("--update-baselines", action="store_true", help="只更新本机的速度基线（精度照常检查）")
+    parser.add_argument("--machine", default=None,
+                        help="机器标签，和CPU型号一起组成速度基线的键（例如CI runner类型）")
+    parser.add_argument("--require-baseline", action="store_true",
+                        help="本机没有速度基线时算作失败（CI里用，免得速度检查被悄悄跳过）")
+    parser.add_argument("--output", default=None, help="JSON报告输出路径（默认打印到标准输出，日志都在标准错误，可以直接重定向）")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    回归测试命令入口
+
+    Returns:
+        进程退出码（任何配置的任何检查没通过时为1）
+    """
+    args = build_parser().parse_args(argv)
+    frames = load_frames(args.source, args.frames, tuple(args.size))
+    fingerprint = frame_fingerprint(frames)
+    classes = args.classes or None
+    golden_path = Path(args.golden)
+    configs = [
+        {"model": model, "imgsz": imgsz, "backend": backend, "postprocess": postprocess, "threads": threads}
+        for model, imgsz, backend, postprocess, threads in itertools.product(
+            args.models, args.imgsz, args.backends, args.postprocess, args.threads
+        )
+    ]
+    machine = machine_id(args.machine)
+    default_logger.info(f"回归测试帧集合: {len(frames)} 帧 ({args.source or '合成帧'})，{len(configs)} 个配置")
+
+    if args.update:
+        reference = configs[0]
+        default_logger.info(f"📀 录制黄金输出: {config_key(reference)}")
+        result, raw, smoothed = run_configuration(frames, reference, args.conf, args.iou, classes, args.warmup)
+        golden = {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "environment": environment_info(),
+            "corpus": {
+                "source": args.source or "synthetic",
+                "frames": len(frames),
+                "resolution": [int(frames[0].shape[1]), int(frames[0].shape[0])],
+                "fingerprint": fingerprint,
+            },
+            "reference": {**reference, "conf": args.conf, "iou": args.iou, "classes": classes},
+            "names": result["names"],
+            "frames": [
+                {"detections": encode_detections(r), "smoothed": encode_detections(s)}
+                for r, s in zip(raw, smoothed)
+            ],
+            "baselines": {},
+        }
+        golden["baselines"][config_key(reference)] = {machine: _baseline_entry(result)}
+        configs = configs[1:]  # 参考配置自己就不用再比了
+    else:
+        if not golden_path.exists():
+            default_logger.error(f"没有黄金文件 {golden_path}，先用 --update 录制")
+            return 1
+        golden = json.loads(golden_path.read_text(encoding="utf-8"))
+        if golden["corpus"]["fingerprint"] != fingerprint:
+            default_logger.error(
+                f"帧集合和录制黄金输出时不一样（{golden['corpus']['source']}, {golden['corpus']['frames']} 帧），"
+                f"检查 --source / --frames / --size，或者用 --update 重新录制"
+            )
+            return 1
+        reference = golden["reference"]
+        if (reference["conf"], reference["iou"], reference["classes"]) != (args.conf, args.iou, classes):
+            default_logger.warning(
+                f"检测参数和黄金输出不一致（黄金: conf={reference['conf']}, iou={reference['iou']}, "
+                f"classes={reference['classes']}），精度比较可能没有意义"
+            )
+
+    golden_raw = [decode_detections(f["detections"], golden["names"]) for f in golden["frames"]]
+    golden_smoothed = [decode_detections(f["smoothed"], golden["names"]) for f in golden["frames"]]
+
+    report = []
+    for config in configs:
+        key = config_key(config)
+        default_logger.info(f"🔁 回归测试: {key}")
+        try:
+            result, raw, smoothed = run_configuration(frames, config, args.conf, args.iou, classes, args.warmup)
+        except Exception as e:
+            default_logger.error(f"配置 {key} 运行失败: {e}", exc_info=True)
+            report.append({"config": config, "error": str(e), "passed": False})
+            continue
+
+        accuracy = {
+            "raw": compare_outputs(golden_raw, raw, args.match_iou),
+            "smoothed": compare_outputs(golden_smoothed, smoothed, args.match_iou),
+        }
+        baselines = golden["baselines"].setdefault(key, {})
+        record_baseline = args.update or args.update_baselines
+        baseline = None if record_baseline else baselines.get(machine)
+        checks = evaluate(
+            result, accuracy, baseline, args.min_recall, args.min_precision,
+            args.min_mean_iou, args.max_slowdown,
+            require_baseline=args.require_baseline and not record_baseline
+        )
+        passed = all(check["passed"] for check in checks)
+        if record_baseline:
+            baselines[machine] = _baseline_entry(result)
+        elif baseline is None:
+            message = f"   {key} 在本机（{machine}）没有速度基线（--update-baselines 记录）"
+            if args.require_baseline:
+                default_logger.error(message)
+            else:
+                default_logger.warning(f"{message}，只检查精度")
+
+        failed = [check["name"] for check in checks if not check["passed"]]
+        default_logger.info(
+            f"   {'✅' if passed else '❌'} {result['throughput_fps']:.1f} FPS | p95 {result['latency']['p95_ms']:.1f} ms | "
+            f"召回 {accuracy['raw']['recall']:.3f} | 精确 {accuracy['raw']['precision']:.3f} | "
+            f"IOU {accuracy['raw']['mean_iou']:.3f}" + (f" | 未通过: {', '.join(failed)}" if failed else "")
+        )
+        report.append({
+            "config": config,
+            "throughput_fps": result["throughput_fps"],
+            "latency": result["latency"],
+            "stages": result["stages"],
+            "accuracy": accuracy,
+            "baseline": baseline,
+            "checks": checks,
+            "passed": passed,
+        })
+
+    if args.update or args.update_baselines:
+        golden_path.parent.mkdir(parents=True, exist_ok=True)
+        golden_path.write_text(json.dumps(golden, indent=1, ensure_ascii=False), encoding="utf-8")
+        default_logger.info(f"黄金文件已保存: {golden_path}")
+
+    text = json.dumps({
+        "environment": environment_info(),
+        "machine": machine,
+        "golden": str(golden_path),
+        "reference": golden["reference"],
+        "results": report,
+    }, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+        default_logger.info(f"回归测试报告已保存: {args.output}")
+    else:
+        print(text)
+
+    failures = [config_key(r["config"]) for r in report if not r["passed"]]
+    if failures:
+        default_logger.error(f"回归测试没通过: {', '.join(failures)}")
+        return 1
+    default_logger.info(f"✨ 回归测试通过（{len(report)} 个配置）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
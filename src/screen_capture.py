@@ -1,12 +1,16 @@
 """
 屏幕捕获模块
-负责捕获电脑屏幕画面
+负责捕获电脑屏幕画面（可选把每帧发布到共享内存帧总线，供其他线程/进程零拷贝读取）
+真正抓屏的是可替换的捕获后端（mss / X11共享内存 / ffmpeg，见 capture_backends）
+输出帧从缓冲池借来，处理完后用 release() 还回去，下一帧直接复用
 """
 import numpy as np
 import cv2
-import mss
 from typing import Optional, Tuple
 import threading
+from .buffer_pool import BufferPool, default_buffer_pool
+from .capture_backends import primary_monitor, select_backend
+from .frame_bus import FrameBus
 from .logger import default_logger
 
 
@@ -16,21 +20,34 @@ class ScreenCapture:
     职责：负责从屏幕捕获画面并转换为可用格式
     """
 
-    def __init__(self, monitor: Optional[dict] = None):
+    def __init__(
+        self,
+        monitor: Optional[dict] = None,
+        frame_bus: Optional[FrameBus] = None,
+        buffer_pool: Optional[BufferPool] = None,
+        backend: str = "mss",
+        framerate: int = 60
+    ):
         """
         初始化屏幕捕获器
 
         Args:
             monitor: 监控区域配置，None则使用主显示器
                     格式: {"top": 0, "left": 0, "width": 1920, "height": 1080}
+            frame_bus: 帧总线，每次捕获后把帧发布进去（None则不发布）
+            buffer_pool: 输出帧使用的缓冲池，None则使用全局缓冲池
+            backend: 捕获后端名，"auto" 表示探测所有可用后端选最快的
+            framerate: 期望的抓取帧率（持续抓取的后端用，例如 ffmpeg）
         """
-        self.sct = mss.mss()
-        self.monitor = monitor or self.sct.monitors[1]  # 1是主显示器，0是所有显示器
+        self.monitor = monitor or primary_monitor()
+        self.backend = select_backend(backend, self.monitor, framerate=framerate)
         self._lock = threading.Lock()
         self._frame = None
+        self.frame_bus = frame_bus
+        self.buffer_pool = buffer_pool or default_buffer_pool
 
         width, height = self.get_monitor_size()
-        default_logger.info(f"屏幕捕获初始化: 区域大小 {width}x{height}")
+        default_logger.info(f"屏幕捕获初始化: 区域大小 {width}x{height}，后端 {self.backend.name}")
         default_logger.debug(f"监控区域: {self.monitor}")
 
     def capture(self) -> np.ndarray:
@@ -38,15 +55,30 @@ class ScreenCapture:
         捕获当前屏幕画面
 
         Returns:
-            numpy数组格式的屏幕画面 (BGR格式)
+            numpy数组格式的屏幕画面 (BGR格式)，来自缓冲池，用完请 release()
         """
         with self._lock:
-            screenshot = self.sct.grab(self.monitor)
-            # mss返回的是BGRA格式，需要转换为BGR
-            frame = np.array(screenshot)
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+            # 和后端探测走同一条路径：持续抓取的后端不等新帧，直接给最新的一帧
+            raw, _ = self.backend.latest()
+            # 后端给的是自己内部的缓冲区（BGRA或BGR），直接转换/拷贝进缓冲池的数组
+            frame = self.buffer_pool.acquire((raw.shape[0], raw.shape[1], 3), np.uint8)
+            if raw.shape[2] == 4:
+                cv2.cvtColor(raw, cv2.COLOR_BGRA2BGR, dst=frame)
+            else:
+                np.copyto(frame, raw)
+            if self.frame_bus is not None:
+                self.frame_bus.publish(frame)
             return frame
 
+    def release(self, frame: np.ndarray):
+        """
+        帧处理完了，把缓冲区还给缓冲池
+
+        Args:
+            frame: capture() 返回的帧
+        """
+        self.buffer_pool.release(frame)
+
     def get_monitor_size(self) -> Tuple[int, int]:
         """
         获取当前监控区域的尺寸
@@ -66,5 +98,14 @@ class ScreenCapture:
             width: 宽度
             height: 高度
         """
-        self.monitor = {"top": top, "left": left, "width": width, "height": height}
+        with self._lock:
+            self.monitor = {"top": top, "left": left, "width": width, "height": height}
+            self.backend.set_region(self.monitor)
         default_logger.info(f"监控区域已更新: {width}x{height} at ({left},{top})")
+
+    def close(self):
+        """关闭捕获后端和帧总线（如果有）"""
+        self.backend.close()
+        if self.frame_bus is not None:
+            self.frame_bus.close()
+            self.frame_bus = None
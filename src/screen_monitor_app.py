@@ -3,19 +3,65 @@
 整合屏幕捕获和YOLO检测功能，在屏幕上直接绘制检测框
 带智能平滑功能，避免检测框闪烁~
 支持自动鼠标控制功能~
+也可以无界面运行（run_headless），把检测结果交给输出模块，完全不加载PyQt5
+配置可以在运行中热更新（阈值、类别、帧率、平滑参数、捕获区域、换模型都不用重启）
+在asyncio服务里可以用 `async for batch in monitor.stream()` 订阅检测结果（帧循环跑在执行器线程里）
 """
+import asyncio
 import cv2
+import threading
 import time
 import sys
-from typing import Optional, Tuple
-from PyQt5.QtWidgets import QApplication
-from PyQt5.QtCore import QTimer
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
 from .screen_capture import ScreenCapture
 from .yolo_detector import YOLODetector, DetectionResult
-from .screen_overlay import TransparentOverlay, create_overlay_app
+from .detection_sinks import DetectionSink, build_message
+from .annotation import AnnotatedVideoWriter
+from .async_stream import DetectionStream, DetectionSubscription
 from .detection_smoother import DetectionSmoother
-from .mouse_controller import MouseController
-from .logger import default_logger
+from .frame_scheduler import FrameScheduler
+from .fps_governor import FpsGovernor
+from .metrics import PipelineMetrics
+from .metrics_server import MetricsServer, PrometheusText, process_rss_bytes
+from .detection_log import DetectionRecorder
+from .tracing import FrameProfiler, default_tracer, env_profile_frames, install_signal_handlers
+from .config import (
+    AppConfig, DetectionLogConfig, DetectorConfig, GovernorConfig, MetricsConfig, OverlayConfig,
+    SmootherConfig, ThreadConfig, TracingConfig
+)
+from .buffer_pool import default_buffer_pool
+from .config_reloader import ConfigReloader, diff_config
+from .thread_layout import apply_thread_counts, pin_threads
+from .logger import default_logger, log_queue_depth
+
+if TYPE_CHECKING:
+    # PyQt5 / pyautogui 只在真正需要时才导入，无界面模式不会加载它们
+    from .screen_overlay import TransparentOverlay
+    from .mouse_controller import MouseController
+
+
+def create_detector(config: DetectorConfig):
+    """
+    按配置创建检测器（配置了推理服务时用远程检测器，本进程不加载模型~）
+
+    Args:
+        config: 检测器配置
+
+    Returns:
+        YOLODetector 或 RemoteDetector
+    """
+    kwargs = dict(
+        model_path=config.model_path,
+        confidence_threshold=config.confidence_threshold,
+        iou_threshold=config.iou_threshold,
+        classes=config.classes,
+        imgsz=config.imgsz
+    )
+    if config.server_address:
+        from .inference_server import RemoteDetector
+        return RemoteDetector(address=config.server_address, **kwargs)
+    return YOLODetector(postprocess=config.postprocess, **kwargs)
 
 
 class ScreenMonitorApp:
@@ -31,7 +77,17 @@ class ScreenMonitorApp:
         capture: Optional[ScreenCapture] = None,
         fps_limit: int = 30,
         enable_mouse_control: bool = False,
-        mouse_target_percent: float = 0.2
+        mouse_target_percent: float = 0.2,
+        overlay_config: Optional[OverlayConfig] = None,
+        frame_policy: str = "latency",
+        governor_config: Optional[GovernorConfig] = None,
+        metrics_config: Optional[MetricsConfig] = None,
+        tracing_config: Optional[TracingConfig] = None,
+        detection_log_config: Optional[DetectionLogConfig] = None,
+        sinks: Optional[List[DetectionSink]] = None,
+        smoother_config: Optional[SmootherConfig] = None,
+        thread_config: Optional[ThreadConfig] = None,
+        video_writer: Optional[AnnotatedVideoWriter] = None
     ):
         """
         初始化屏幕监控应用
@@ -42,22 +98,52 @@ class ScreenMonitorApp:
             fps_limit: FPS限制，防止CPU占用过高
             enable_mouse_control: 是否启用鼠标控制
             mouse_target_percent: 鼠标目标位置在检测框上部的百分比（0-1）
+            overlay_config: 覆盖窗口配置（渲染帧率、插值模式等），None则使用默认配置
+            frame_policy: 帧调度策略，"latency"（延迟优先）或 "throughput"（吞吐优先）
+            governor_config: 帧率调节配置，None则使用默认配置
+            metrics_config: 指标导出配置，None则不启用指标服务
+            tracing_config: 追踪与剖析配置，None则使用默认配置（仍可通过环境变量/信号开启）
+            detection_log_config: 检测日志配置，None则不记录
+            sinks: 检测输出列表（回调/文件/套接字），每帧都会收到平滑后的检测结果
+            smoother_config: 检测平滑配置，None则使用默认配置
+            thread_config: 线程与CPU布局配置（线程数在创建检测器之前由 apply_thread_layout 设置，
+                           这里负责在后台服务启动后把它们绑到 background_cpus）
+            video_writer: 标注视频导出器，每帧的画面和平滑后的检测结果都会交给它（None则不导出）
         """
         self.detector = detector
         self.capture = capture or ScreenCapture()
         self.fps_limit = fps_limit
-        self.frame_time = 1.0 / fps_limit
+        self.overlay_config = overlay_config or OverlayConfig()
+
+        # 创建帧调度器（按绝对时钟安排节拍，慢帧不会拖累后面的帧~）
+        self.scheduler = FrameScheduler(target_fps=fps_limit, policy=frame_policy)
+        self._frame_timer = None  # QTimer，仅覆盖层模式使用
+
+        # 创建帧率调节器（画面安静时自动降速~）
+        governor_config = governor_config or GovernorConfig()
+        self.governor: Optional[FpsGovernor] = None
+        if governor_config.enabled:
+            self.governor = FpsGovernor(
+                full_fps=fps_limit,
+                reduced_fps=governor_config.reduced_fps,
+                idle_fps=governor_config.idle_fps,
+                static_threshold=governor_config.static_threshold,
+                reduce_after=governor_config.reduce_after,
+                idle_after=governor_config.idle_after
+            )
 
         # 创建检测平滑器（避免闪烁哦~）
+        smoother_config = smoother_config or SmootherConfig()
         self.smoother = DetectionSmoother(
-            smooth_factor=0.3,  # 平滑因子，越小越平滑
-            history_size=5,     # 保留5帧历史
-            iou_threshold=0.5   # IOU阈值
+            smooth_factor=smoother_config.smooth_factor,
+            history_size=smoother_config.history_size,
+            iou_threshold=smoother_config.iou_threshold
         )
 
         # 创建鼠标控制器（可选功能~）
-        self.mouse_controller: Optional[MouseController] = None
+        self.mouse_controller: Optional["MouseController"] = None
         if enable_mouse_control:
+            from .mouse_controller import MouseController
             self.mouse_controller = MouseController(
                 target_percent=mouse_target_percent,
                 smoothness=0.3,
@@ -71,17 +157,78 @@ class ScreenMonitorApp:
         self.detection_count = 0
         self.total_frames = 0
         self.running = True
+        self.overlay: Optional["TransparentOverlay"] = None
+        self.sinks: List[DetectionSink] = list(sinks or [])
+        self.video_writer = video_writer
+
+        # 追踪与剖析（关闭时几乎零开销~）
+        self.tracing_config = tracing_config or TracingConfig()
+        self.tracer = default_tracer
+        if self.tracing_config.enabled:
+            self.tracer.enable(self.tracing_config.capacity)
+        self.profiler = FrameProfiler(output_dir=self.tracing_config.output_dir)
+        self.profiler.request(env_profile_frames() or self.tracing_config.profile_frames)
+
+        # 分阶段延迟直方图（捕获/推理/平滑/绘制/端到端）
+        self.metrics = PipelineMetrics(tracer=self.tracer)
+
+        # 各类别累计检测数量，以及各组件注册的队列深度
+        self.class_counts: Dict[str, int] = {}
+        self.queue_depths: Dict[str, Callable[[], int]] = {"log": log_queue_depth}
+        if video_writer is not None:
+            self.register_queue("annotated_video", video_writer.queue_depth)
+
+        # 检测日志（可选~，写盘在后台线程）
+        self.detection_recorder: Optional[DetectionRecorder] = None
+        if detection_log_config and detection_log_config.enabled:
+            self.detection_recorder = DetectionRecorder(
+                detection_log_config.path, max_queue=detection_log_config.max_queue
+            )
+            self.register_queue("detection_log", self.detection_recorder.queue_depth)
+
+        # 配置热更新：新配置先放在这里，由帧循环在两帧之间应用
+        self.config: Optional[AppConfig] = None
+        self.config_reloader: Optional[ConfigReloader] = None
+        self._pending_config: Optional[AppConfig] = None
+        self._pending_detector = None
+        self._detector_generation = 0
+
+        # 线程与CPU布局
+        self.thread_config = thread_config or ThreadConfig()
+
+        # 指标导出服务（可选~）
+        self.metrics_config = metrics_config or MetricsConfig()
+        self.metrics_server: Optional[MetricsServer] = None
+
+        # 异步订阅（第一次调用 stream() 时创建，帧循环跑在单独的执行器线程里）
+        self._stream: Optional[DetectionStream] = None
+        self._stream_executor: Optional[ThreadPoolExecutor] = None
 
         # 记录初始化信息
         default_logger.info("=" * 50)
         default_logger.info("屏幕监控应用初始化")
         default_logger.info(f"  - FPS限制: {fps_limit}")
-        default_logger.info(f"  - 显示模式: 透明覆盖窗口")
+        default_logger.info(f"  - 帧调度策略: {frame_policy}")
+        if self.governor:
+            default_logger.info(
+                f"  - 帧率调节: 已启用 (降速 {self.governor.tier_fps['reduced']:.0f} / "
+                f"空闲 {self.governor.tier_fps['idle']:.0f} FPS)"
+            )
+        else:
+            default_logger.info(f"  - 帧率调节: 未启用")
+        if self.sinks:
+            default_logger.info(f"  - 检测输出: {', '.join(sink.name for sink in self.sinks)}")
         default_logger.info(f"  - 检测平滑: 已启用")
         if self.mouse_controller:
             default_logger.info(f"  - 鼠标控制: 已启用 (上部 {mouse_target_percent * 100:.0f}%)")
         else:
             default_logger.info(f"  - 鼠标控制: 未启用")
+        if self.metrics_config.enabled:
+            default_logger.info(
+                f"  - 指标服务: {self.metrics_config.host}:{self.metrics_config.port}"
+            )
+        if self.tracer.enabled:
+            default_logger.info(f"  - 追踪: 已启用 (输出目录 {self.tracing_config.output_dir})")
         default_logger.info("=" * 50)
 
     def run(self):
@@ -89,12 +236,25 @@ class ScreenMonitorApp:
         启动监控应用 (｡♥‿♥｡)
         在屏幕上直接绘制检测框，温柔地为主人服务~
         """
+        from PyQt5.QtCore import Qt, QTimer
+        from .screen_overlay import TransparentOverlay, create_overlay_app
+
         # 创建Qt应用程序
         app = create_overlay_app()
 
         # 创建透明覆盖窗口
-        overlay = TransparentOverlay()
+        overlay = TransparentOverlay(
+            label_cache_size=self.overlay_config.label_cache_size,
+            render_fps=self.overlay_config.render_fps,
+            interpolation=self.overlay_config.interpolation,
+            max_extrapolation=self.overlay_config.max_extrapolation
+        )
+        overlay.metrics = self.metrics
         overlay.show()
+        overlay.start_render_loop()
+        self.overlay = overlay
+        if overlay.render_fps > 0:
+            default_logger.info(f"覆盖层渲染: {overlay.render_fps} FPS ({overlay.interpolation})")
 
         default_logger.info("屏幕监控启动...")
         default_logger.info(f"模型信息: {self.detector.get_model_info()}")
@@ -105,15 +265,20 @@ class ScreenMonitorApp:
         print("   按 Ctrl+C 或关闭窗口退出")
         print("=" * 50)
 
+        self._start_services()
+
         # 创建定时器用于定期输出统计
         stats_timer = QTimer()
         stats_timer.timeout.connect(lambda: self._log_stats())
         stats_timer.start(5000)  # 每5秒输出一次统计
 
-        # 创建主循环定时器
-        main_timer = QTimer()
-        main_timer.timeout.connect(lambda: self._process_frame(overlay))
-        main_timer.start(int(1000 / self.fps_limit))  # 根据FPS设置间隔
+        # 创建主循环定时器（单次触发，每帧结束后按调度器重新安排）
+        self._frame_timer = QTimer()
+        self._frame_timer.setSingleShot(True)
+        self._frame_timer.setTimerType(Qt.PreciseTimer)
+        self._frame_timer.timeout.connect(lambda: self._on_frame_tick(overlay))
+        self.scheduler.start()
+        self._schedule_next_frame()
 
         try:
             # 启动Qt事件循环
@@ -126,31 +291,465 @@ class ScreenMonitorApp:
         finally:
             self._cleanup()
 
-    def _process_frame(self, overlay: TransparentOverlay):
+    def run_headless(self, max_frames: Optional[int] = None):
         """
-        处理每一帧 (｡♥‿♥｡)
+        无界面运行 (｡♥‿♥｡)
+        不创建QApplication和覆盖窗口，检测结果只交给输出模块，适合没有显示器的服务器~
+
+        Args:
+            max_frames: 处理这么多帧后退出，None表示一直运行（Ctrl+C退出）
+        """
+        default_logger.info("屏幕监控启动（无界面模式）...")
+        default_logger.info(f"模型信息: {self.detector.get_model_info()}")
+        if not self.sinks:
+            default_logger.warning("没有配置检测输出，检测结果只会出现在统计里哦")
+
+        self._start_services()
+        self.scheduler.start()
+        next_stats = time.monotonic() + 5.0  # 每5秒输出一次统计
+
+        try:
+            while self.running:
+                if max_frames is not None and self.total_frames >= max_frames:
+                    break
+                if getattr(self.capture, "finished", False):
+                    default_logger.info("捕获源已结束")
+                    break
+                delay = self.scheduler.time_until_next()
+                if delay > 0:
+                    time.sleep(delay)
+                self._run_frame(None)
+                if time.monotonic() >= next_stats:
+                    self._log_stats()
+                    next_stats = time.monotonic() + 5.0
+        except KeyboardInterrupt:
+            default_logger.info("接收到退出信号")
+        except Exception as e:
+            default_logger.error(f"发生错误: {e}", exc_info=True)
+            raise
+        finally:
+            self._cleanup()
+
+    def stream(self, max_pending: int = 1) -> DetectionSubscription:
+        """
+        以asyncio方式订阅检测结果 (｡♥‿♥｡)
+        在事件循环里 `async for batch in monitor.stream()` 即可，不需要Qt事件循环~
+        多个订阅者共用同一个帧循环，每帧只推理一次；消费慢的订阅者会丢掉过期的帧
+
+        Args:
+            max_pending: 这个订阅者最多积压几帧，超出时丢掉最旧的（1表示永远只拿最新的一帧）
+
+        Returns:
+            DetectionSubscription，迭代得到 DetectionBatch
+        """
+        if self._stream is None:
+            self._stream = DetectionStream(self._run_stream)
+            self.sinks.append(self._stream)
+        return self._stream.subscribe(max_pending)
+
+    async def _run_stream(self, stream: DetectionStream):
+        """
+        异步帧循环：捕获和推理在执行器线程里做，事件循环只负责等节拍和分发
+        没有订阅者时返回（暂停），下次有人订阅时再进来
+
+        Args:
+            stream: 检测流
+        """
+        loop = asyncio.get_running_loop()
+        if self._stream_executor is None:
+            self._stream_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="yolo-stream")
+            default_logger.info("屏幕监控启动（异步订阅模式）...")
+            default_logger.info(f"模型信息: {self.detector.get_model_info()}")
+            self._start_services()
+            # 帧循环在执行器线程里，让它占 pipeline_cpus，事件循环线程算后台
+            await loop.run_in_executor(self._stream_executor, pin_threads, self.thread_config)
+
+        self.scheduler.start()
+        next_stats = time.monotonic() + 5.0  # 每5秒输出一次统计
+        while self.running and stream.has_subscribers():
+            if getattr(self.capture, "finished", False):
+                default_logger.info("捕获源已结束")
+                return
+            delay = self.scheduler.time_until_next()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await loop.run_in_executor(self._stream_executor, self._run_frame, None)
+            if time.monotonic() >= next_stats:
+                self._log_stats()
+                next_stats = time.monotonic() + 5.0
+
+    async def aclose(self):
+        """
+        停止异步订阅并释放资源 (｡♥‿♥｡)
+        正在迭代的订阅者读完积压的帧后结束
+        """
+        if not self.running:
+            return
+        self.running = False
+        if self._stream is not None:
+            await self._stream.wait_stopped()
+            self._stream.close()
+        if self._stream_executor is not None:
+            # 检测器、捕获器在帧循环线程里创建的资源也在那里释放
+            await asyncio.get_running_loop().run_in_executor(self._stream_executor, self._cleanup)
+            self._stream_executor.shutdown(wait=True)
+            self._stream_executor = None
+        else:
+            self._cleanup()
+
+    async def __aenter__(self) -> "ScreenMonitorApp":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    def watch_config(
+        self,
+        path: str,
+        poll_interval: float = 1.0,
+        adjust: Optional[Callable[[AppConfig], AppConfig]] = None
+    ):
+        """
+        监视配置文件，修改后自动热更新 (｡♥‿♥｡)
+
+        Args:
+            path: 配置文件路径
+            poll_interval: 检查间隔（秒）
+            adjust: 提交前再处理一下新配置（比如套用命令行参数），None则原样提交
+        """
+        def on_reload(config: AppConfig):
+            self.request_config(adjust(config) if adjust else config)
+
+        self.config_reloader = ConfigReloader(path, on_reload, poll_interval=poll_interval)
+        self.config_reloader.start()
+
+    def request_config(self, config: AppConfig):
+        """
+        提交新配置（任意线程都可以调用），下一帧开始前生效
+
+        Args:
+            config: 新的完整配置
+        """
+        self._pending_config = config
+
+    def _apply_pending_changes(self):
+        """在两帧之间应用新配置 / 切换到后台加载好的模型"""
+        config, self._pending_config = self._pending_config, None
+        if config is not None:
+            with self.tracer.span("config_reload"):
+                self._apply_config(config)
+
+        detector, self._pending_detector = self._pending_detector, None
+        if detector is not None:
+            # 加载期间可能又改了阈值/类别，以当前配置为准
+            for name in ("confidence_threshold", "iou_threshold", "classes", "imgsz"):
+                setattr(detector, name, getattr(self.config.detector, name))
+            old_detector, self.detector = self.detector, detector
+            if hasattr(old_detector, "close"):
+                old_detector.close()
+            default_logger.info(f"🔁 已切换到新模型: {self.config.detector.model_path}")
+
+    def _apply_config(self, config: AppConfig):
+        """
+        应用新配置：只重建变化了的部分
+
+        Args:
+            config: 新的完整配置
+        """
+        old = self.config or AppConfig()
+        changes = diff_config(old, config)
+        if not changes:
+            return
+        self.config = config
+        applied, restart_needed = [], []
+
+        for key in changes:
+            section, name = key.split(".", 1) if "." in key else ("", key)
+            if self._apply_config_field(section, name, config):
+                applied.append(key)
+            else:
+                restart_needed.append(key)
+
+        if applied:
+            default_logger.info(f"⚙️ 配置已热更新: {', '.join(applied)}")
+        if restart_needed:
+            default_logger.warning(f"以下配置需要重启才能生效: {', '.join(restart_needed)}")
+
+    def _apply_config_field(self, section: str, name: str, config: AppConfig) -> bool:
+        """
+        应用单个变化的字段
+
+        Returns:
+            是否已经生效（False表示需要重启）
+        """
+        if section == "detector":
+            detector_config = config.detector
+            if name in ("model_path", "server_address"):
+                self._load_detector_async(detector_config)
+            elif name in ("confidence_threshold", "iou_threshold", "classes", "imgsz", "postprocess"):
+                if name == "postprocess" and not hasattr(self.detector, name):
+                    return False  # 远程检测器的后处理在推理服务里
+                setattr(self.detector, name, getattr(detector_config, name))
+            return name not in ("show_confidence", "show_class_name")
+
+        if section == "screen":
+            if name == "fps_limit":
+                self.fps_limit = config.screen.fps_limit
+                if self.governor:
+                    self._configure_governor(config.governor)
+                self.scheduler.set_target_fps(
+                    self.governor.target_fps if self.governor else self.fps_limit
+                )
+                return True
+            if name == "frame_policy":
+                self.scheduler.policy = config.screen.frame_policy
+                return True
+            if name == "monitor_region" and config.screen.monitor_region:
+                region = config.screen.monitor_region
+                blocker = self._region_change_blocker(region["width"], region["height"])
+                if blocker:
+                    default_logger.warning(f"捕获区域改为 {region['width']}x{region['height']} 需要重启: {blocker}")
+                    return False
+                self.capture.set_monitor_region(region["top"], region["left"], region["width"], region["height"])
+                return True
+            return False
+
+        if section == "buffer_pool":
+            default_buffer_pool.enabled = config.buffer_pool.enabled
+            default_buffer_pool.max_bytes = config.buffer_pool.max_mb * 1024 * 1024
+            return True
+
+        if section == "threads":
+            if name == "torch_interop_threads":
+                return False
+            self.thread_config = config.threads
+            if name.endswith("_cpus"):
+                pin_threads(config.threads)
+            else:
+                apply_thread_counts(config.threads)
+            return True
+
+        if section == "smoother":
+            setattr(self.smoother, name, getattr(config.smoother, name))
+            return True
+
+        if section == "governor":
+            if config.governor.enabled:
+                self._configure_governor(config.governor)
+            else:
+                self.governor = None
+                self.scheduler.set_target_fps(self.fps_limit)
+            return True
+
+        if section == "overlay":
+            if self.overlay is None:
+                return name != "label_cache_size"
+            if name == "render_fps":
+                self.overlay.set_render_fps(config.overlay.render_fps)
+            else:
+                setattr(self.overlay, name, getattr(config.overlay, name))
+            return True
+
+        if section == "mouse" and name in ("enabled", "target_percent"):
+            if not config.mouse.enabled:
+                self.mouse_controller = None
+            elif self.mouse_controller is None:
+                from .mouse_controller import MouseController
+                self.mouse_controller = MouseController(
+                    target_percent=config.mouse.target_percent, smoothness=0.3, move_speed=20
+                )
+            else:
+                self.mouse_controller.target_percent = config.mouse.target_percent
+            return True
+
+        return False
+
+    def _region_change_blocker(self, width: int, height: int) -> Optional[str]:
+        """
+        按启动时的画面尺寸创建的组件能不能接住新的捕获尺寸
+
+        Args:
+            width: 新的捕获宽度
+            height: 新的捕获高度
+
+        Returns:
+            接不住时的原因，None表示可以热更新
+        """
+        capture = getattr(self.capture, "capture_source", self.capture)  # 录制器包着真正的捕获器
+        frame_bus = getattr(capture, "frame_bus", None)
+        if frame_bus is not None and width * height * 3 > frame_bus.max_frame_bytes:
+            return f"帧总线的槽位只有 {frame_bus.max_frame_bytes} 字节"
+        if self.video_writer is not None and (width, height) != tuple(self.video_writer.frame_size):
+            video_width, video_height = self.video_writer.frame_size
+            return f"标注视频导出的尺寸固定为 {video_width}x{video_height}"
+        return None
+
+    def _configure_governor(self, governor_config: GovernorConfig):
+        """按配置创建或更新帧率调节器"""
+        if self.governor is None:
+            self.governor = FpsGovernor(full_fps=self.fps_limit)
+        governor = self.governor
+        governor.tier_fps = {
+            "active": float(self.fps_limit),
+            "reduced": float(min(governor_config.reduced_fps, self.fps_limit)),
+            "idle": float(min(governor_config.idle_fps, governor_config.reduced_fps, self.fps_limit)),
+        }
+        governor.static_threshold = governor_config.static_threshold
+        governor.reduce_after = governor_config.reduce_after
+        governor.idle_after = governor_config.idle_after
+
+    def _load_detector_async(self, detector_config: DetectorConfig):
+        """
+        在后台线程加载新模型，加载好之后由帧循环切换（加载期间继续用旧模型）
+
+        Args:
+            detector_config: 新的检测器配置
+        """
+        self._detector_generation += 1
+        generation = self._detector_generation
+
+        def load():
+            start = time.perf_counter()
+            try:
+                detector = create_detector(detector_config)
+            except Exception as e:
+                default_logger.error(f"新模型加载失败，继续使用旧模型: {e}", exc_info=True)
+                return
+            if generation != self._detector_generation:
+                # 加载期间又换了一次模型，这个已经过时了
+                if hasattr(detector, "close"):
+                    detector.close()
+                return
+            default_logger.info(
+                f"新模型已在后台加载完成: {detector_config.model_path} ({time.perf_counter() - start:.1f} 秒)"
+            )
+            self._pending_detector = detector
+
+        default_logger.info(f"正在后台加载新模型: {detector_config.model_path}")
+        threading.Thread(target=load, name="DetectorLoader", daemon=True).start()
+
+    def add_sink(self, sink: DetectionSink):
+        """
+        添加一个检测输出
+
+        Args:
+            sink: DetectionSink实例
+        """
+        self.sinks.append(sink)
+
+    def _start_services(self):
+        """安装信号处理并启动指标服务（两种运行模式共用）"""
+        # SIGUSR1 导出追踪 / SIGUSR2 剖析若干帧
+        install_signal_handlers(
+            self.tracer, self.profiler, self.tracing_config.signal_profile_frames
+        )
+
+        # 启动指标服务
+        if self.metrics_config.enabled:
+            self.metrics_server = MetricsServer(
+                self.export_prometheus,
+                host=self.metrics_config.host,
+                port=self.metrics_config.port
+            )
+            self.metrics_server.start()
+
+        # 录制、指标等后台线程都已经启动，按布局重新绑定CPU
+        pin_threads(self.thread_config)
+
+    def _on_frame_tick(self, overlay: "TransparentOverlay"):
+        """
+        帧节拍到达 (｡♥‿♥｡)
+        处理（或丢弃）这一帧，然后安排下一个节拍
 
         Args:
             overlay: 透明覆盖窗口
         """
         if not self.running:
             return
+        self._run_frame(overlay)
+        self._schedule_next_frame()
+
+    def _run_frame(self, overlay: Optional["TransparentOverlay"]):
+        """
+        由调度器决定处理还是丢弃这一帧
 
-        loop_start = time.time()
+        Args:
+            overlay: 透明覆盖窗口，无界面模式为None
+        """
+        if self._pending_config is not None or self._pending_detector is not None:
+            self._apply_pending_changes()
+
+        if self.scheduler.begin_frame():
+            self.profiler.frame_begin()
+            try:
+                with self.tracer.span("frame"):
+                    self._process_frame(overlay)
+            finally:
+                self.profiler.frame_end()
+                self.scheduler.end_frame()
+        else:
+            self.tracer.instant("frame_dropped")
+
+    def _schedule_next_frame(self):
+        """按调度器的下一个节拍启动定时器"""
+        delay_ms = int(self.scheduler.time_until_next() * 1000)
+        self._frame_timer.start(delay_ms)
+
+    def _process_frame(self, overlay: Optional["TransparentOverlay"]):
+        """
+        处理每一帧 (｡♥‿♥｡)
+
+        Args:
+            overlay: 透明覆盖窗口，无界面模式为None
+        """
+        if not self.running:
+            return
 
         # 捕获屏幕
-        frame = self.capture.capture()
+        capture_time = time.perf_counter()
+        capture_timestamp = time.time()
+        with self.metrics.time_stage("capture"):
+            frame = self.capture.capture()
 
-        # 执行检测
+        # 执行检测（检测器内部的各阶段按顺序排开记录）
+        detect_start = time.perf_counter()
         raw_detections = self.detector.detect(frame)
+        stage_start = detect_start
+        for stage, seconds in self.detector.last_timings.items():
+            self.metrics.record_span(stage, stage_start, stage_start + seconds)
+            stage_start += seconds
+        for detection in raw_detections:
+            self.class_counts[detection.class_name] = self.class_counts.get(detection.class_name, 0) + 1
 
         # 使用平滑器处理检测结果（避免闪烁~）
-        smoothed_detections = self.smoother.smooth(raw_detections)
+        with self.metrics.time_stage("smoothing"):
+            smoothed_detections = self.smoother.smooth(raw_detections)
         self.detection_count = len(smoothed_detections)
         self.total_frames += 1
 
         # 更新覆盖窗口上的检测结果
-        overlay.update_detections(smoothed_detections)
+        if overlay is not None:
+            overlay.update_detections(smoothed_detections, capture_time=capture_time)
+
+        # 交给各个检测输出
+        if self.sinks:
+            self._emit_to_sinks(smoothed_detections, capture_timestamp, capture_time)
+
+        # 记录检测日志
+        if self.detection_recorder:
+            self.detection_recorder.record(smoothed_detections)
+
+        # 根据画面活动调整下一帧的帧率
+        if self.governor:
+            self.scheduler.set_target_fps(self.governor.update(frame, len(raw_detections)))
+
+        # 导出标注视频（只拷贝一次，绘制和编码在后台线程）
+        if self.video_writer:
+            self.video_writer.write(frame, smoothed_detections)
+
+        # 这一帧用完了，缓冲区还给缓冲池，下一次捕获直接复用
+        if hasattr(self.capture, "release"):
+            self.capture.release(frame)
 
         # 鼠标控制（如果启用~）
         if self.mouse_controller:
@@ -160,11 +759,27 @@ class ScreenMonitorApp:
         # 更新FPS
         self._update_fps()
 
-        # 控制帧率
-        elapsed = time.time() - loop_start
-        sleep_time = max(0, self.frame_time - elapsed)
-        if sleep_time > 0:
-            time.sleep(sleep_time)
+    def _emit_to_sinks(self, detections: List[DetectionResult], timestamp: float, capture_time: float):
+        """
+        把一帧的检测结果交给所有输出（单个输出出错不影响其他输出和帧循环）
+
+        Args:
+            detections: 平滑后的检测结果
+            timestamp: 捕获时间（Unix秒）
+            capture_time: 捕获时间（perf_counter），用于计算端到端延迟
+        """
+        with self.tracer.span("sinks"):
+            message = build_message(
+                self.total_frames, timestamp, detections, latency=time.perf_counter() - capture_time
+            )
+            for sink in self.sinks:
+                try:
+                    sink.emit(message, detections)
+                except Exception as e:
+                    default_logger.error(f"检测输出 {sink.name} 出错: {e}", exc_info=True)
+        if self.overlay is None:
+            # 无界面时端到端延迟以输出完成为准
+            self.metrics.record("end_to_end", time.perf_counter() - capture_time)
 
     def _update_fps(self):
         """更新FPS统计"""
@@ -175,6 +790,73 @@ class ScreenMonitorApp:
             self.frame_count = 0
             self.start_time = time.time()
 
+    def get_latency_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        获取分阶段延迟统计 (｡♥‿♥｡)
+
+        Returns:
+            {阶段: {count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}}
+        """
+        return self.metrics.summary()
+
+    def register_queue(self, name: str, depth: Callable[[], int]):
+        """
+        注册一个需要导出深度的队列
+
+        Args:
+            name: 队列名称
+            depth: 返回当前队列深度的函数
+        """
+        self.queue_depths[name] = depth
+
+    def export_prometheus(self) -> str:
+        """
+        以Prometheus文本格式导出流水线指标 (｡♥‿♥｡)
+
+        Returns:
+            Prometheus文本
+        """
+        text = PrometheusText()
+        schedule = self.scheduler.get_stats()
+        text.gauge("fps", "Processed frames per second", self.fps)
+        text.gauge("target_fps", "Scheduler target frames per second", schedule["target_fps"])
+        text.gauge("achieved_fps", "Scheduler achieved frames per second", schedule["achieved_fps"])
+        text.gauge("frame_jitter_seconds", "Standard deviation of frame start intervals", schedule["jitter_ms"] / 1000)
+        text.counter("frames", "Frames processed", self.total_frames)
+        text.counter("frames_dropped", "Frames dropped because they would miss their deadline", schedule["dropped"])
+        text.counter("ticks_skipped", "Scheduler ticks skipped while running behind", schedule["skipped"])
+        text.counter("frames_late", "Frames that finished after their deadline", schedule["late"])
+
+        for stage, histogram in self.metrics.histograms.items():
+            text.histogram("stage_latency_seconds", "Per-stage pipeline latency", histogram, {"stage": stage})
+
+        text.gauge("current_detections", "Smoothed detections in the latest frame", self.detection_count)
+        for class_name, count in list(self.class_counts.items()):
+            text.counter("detections", "Raw detections per class", count, {"class": class_name})
+
+        for name, depth in list(self.queue_depths.items()):
+            text.gauge("queue_depth", "Items waiting in pipeline queues", depth(), {"queue": name})
+
+        if self.governor:
+            for tier, seconds in self.governor.get_stats()["tier_seconds"].items():
+                text.counter("governor_tier_seconds", "Seconds spent in each FPS governor tier", seconds, {"tier": tier})
+
+        if self.overlay:
+            repaint = self.overlay.get_repaint_stats()
+            text.gauge("overlay_repaint_area_pixels", "Repainted overlay area in the latest frame", repaint["last_area"])
+            text.counter("overlay_repaints", "Overlay repaint requests", repaint["repaints"])
+
+        pool = default_buffer_pool.get_stats()
+        text.counter("buffer_pool_hits", "Frame buffer pool requests served from the pool", pool["hits"])
+        text.counter("buffer_pool_misses", "Frame buffer pool requests that allocated a new buffer", pool["misses"])
+        text.counter("buffer_pool_evictions", "Frame buffers dropped to stay under the pool memory ceiling", pool["evictions"])
+        text.gauge("buffer_pool_resident_bytes", "Frame buffer memory held by the pool and its borrowers",
+                   pool["resident_bytes"])
+        text.gauge("buffer_pool_peak_resident_bytes", "Peak frame buffer memory", pool["peak_resident_bytes"])
+
+        text.gauge("process_resident_memory_bytes", "Resident set size of this process", process_rss_bytes())
+        return text.render()
+
     def _log_stats(self):
         """记录运行统计（定期调用）"""
         if self.running:
@@ -183,18 +865,87 @@ class ScreenMonitorApp:
                 f"检测到: {self.detection_count} 个物体 | "
                 f"总帧数: {self.total_frames}"
             )
+            latency_summary = self.metrics.format_summary()
+            if latency_summary:
+                default_logger.info(f"⏲️ 分阶段延迟:\n{latency_summary}")
+            schedule = self.scheduler.get_stats()
+            default_logger.info(
+                f"⏱️ 帧调度 - 目标: {schedule['target_fps']:.1f} FPS | "
+                f"实际: {schedule['achieved_fps']:.1f} FPS | "
+                f"抖动: {schedule['jitter_ms']:.2f} ms | "
+                f"丢帧: {schedule['dropped']} | 跳过: {schedule['skipped']} | 超时: {schedule['late']}"
+            )
+            pool = default_buffer_pool.get_stats()
+            if pool["hits"] + pool["misses"] > 0:
+                default_logger.info(
+                    f"🧺 缓冲池 - 命中: {pool['hits']} / 未命中: {pool['misses']} "
+                    f"({pool['hit_ratio'] * 100:.0f}%) | 淘汰: {pool['evictions']} | "
+                    f"常驻: {pool['resident_bytes'] / 1024 / 1024:.1f} MB "
+                    f"(峰值 {pool['peak_resident_bytes'] / 1024 / 1024:.1f} / 上限 {pool['max_bytes'] / 1024 / 1024:.0f} MB)"
+                )
+            if self.governor:
+                governor = self.governor.get_stats()
+                ratio = governor['tier_ratio']
+                default_logger.info(
+                    f"🔋 帧率档位 - 当前: {governor['tier']} ({governor['target_fps']:.0f} FPS) | "
+                    f"全速 {ratio['active'] * 100:.0f}% / 降速 {ratio['reduced'] * 100:.0f}% / "
+                    f"空闲 {ratio['idle'] * 100:.0f}% | 节省帧数: {governor['saved_frames']:.0f} "
+                    f"({governor['saved_ratio'] * 100:.0f}%)"
+                )
+            if self._stream is not None:
+                stream = self._stream.get_stats()
+                default_logger.info(
+                    f"📡 异步订阅 - 订阅者: {stream['subscribers']} | "
+                    f"已分发: {stream['published']} 帧 | 过期丢弃: {stream['dropped']}"
+                )
+            if self.overlay:
+                repaint = self.overlay.get_repaint_stats()
+                default_logger.info(
+                    f"🖌️ 重绘统计 - 本帧面积: {repaint['last_area']} px | "
+                    f"平均面积: {repaint['avg_area']:.0f} px ({repaint['avg_screen_ratio'] * 100:.1f}% 屏幕) | "
+                    f"重绘: {repaint['repaints']} 次 | 跳过: {repaint['skipped']} 次"
+                )
+                paint = self.overlay.get_paint_stats()
+                default_logger.info(
+                    f"🎨 绘制耗时 - 平均: {paint['avg_paint_ms']:.2f} ms | "
+                    f"最近: {paint['last_paint_ms']:.2f} ms | "
+                    f"标签缓存: {paint['label_cache_size']} 张 "
+                    f"(命中 {paint['label_cache_hits']} / 未命中 {paint['label_cache_misses']})"
+                )
 
     def _cleanup(self):
         """清理资源"""
         self.running = False
+        if self.config_reloader:
+            self.config_reloader.stop()
+        if self.metrics_server:
+            self.metrics_server.stop()
+        if self.detection_recorder:
+            self.detection_recorder.close()
+        for sink in self.sinks:
+            sink.close()
+        if self.video_writer:
+            self.video_writer.close()
+        if hasattr(self.capture, "close"):
+            self.capture.close()  # 录制器/回放器需要收尾
+        if hasattr(self.detector, "close"):
+            self.detector.close()  # 远程检测器要释放共享内存
+        if self.tracer.enabled and self.tracing_config.dump_on_exit:
+            self.tracer.dump(output_dir=self.tracing_config.output_dir)
         runtime_stats = (
             f"📈 运行结束统计:\n"
             f"   - 总帧数: {self.total_frames}\n"
-            f"   - 最终FPS: {self.fps:.1f}"
+            f"   - 最终FPS: {self.fps:.1f}\n"
+            f"   - 丢帧: {self.scheduler.dropped_frames} | 跳过节拍: {self.scheduler.skipped_ticks}"
         )
+        latency_summary = self.metrics.format_summary()
+        if latency_summary:
+            runtime_stats += f"\n   - 分阶段延迟:\n{latency_summary}"
         default_logger.info(runtime_stats)
         default_logger.info("资源已释放，喵期待下次为主人服务~")
-        print("✅ 资源已释放，喵期待下次为主人服务~")
+        if self.overlay is not None:
+            # 无界面/异步模式的标准输出可能是检测结果流，不能混进别的文字
+            print("✅ 资源已释放，喵期待下次为主人服务~")
 
 
 def main():
@@ -3,11 +3,14 @@
 使用PyQt5创建透明覆盖层
 """
 from PyQt5.QtWidgets import QWidget, QApplication
-from PyQt5.QtCore import Qt, QTimer, QPoint
-from PyQt5.QtGui import QPainter, QPen, QColor, QFont
+from PyQt5.QtCore import Qt, QTimer, QPoint, QRect
+from PyQt5.QtGui import QPainter, QPen, QColor, QFont, QFontMetrics, QRegion, QPixmap
 import sys
-from typing import List, Tuple
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
 from .yolo_detector import DetectionResult
+from .metrics import PipelineMetrics
 import numpy as np
 
 
@@ -17,7 +20,24 @@ class TransparentOverlay(QWidget):
     在屏幕上直接绘制检测框，温柔地为主人服务~
     """
 
-    def __init__(self, detections: List[DetectionResult] = None):
+    def __init__(
+        self,
+        detections: List[DetectionResult] = None,
+        label_cache_size: int = 256,
+        render_fps: Optional[int] = None,
+        interpolation: str = "interpolate",
+        max_extrapolation: float = 1.0
+    ):
+        """
+        初始化透明覆盖窗口
+
+        Args:
+            detections: 初始检测结果
+            label_cache_size: 标签精灵缓存的最大数量
+            render_fps: 渲染帧率，None跟随显示器刷新率，0表示不插值（检测完成即重绘）
+            interpolation: 插值模式，"interpolate" 或 "extrapolate"
+            max_extrapolation: 外推时最多向前预测的检测周期数
+        """
         super().__init__()
 
         # 设置窗口属性
@@ -53,27 +73,340 @@ class TransparentOverlay(QWidget):
 
         # 默认字体
         self.label_font = QFont("Arial", 12, QFont.Bold)
+        self._label_metrics = QFontMetrics(self.label_font)
+
+        # 绘制资源缓存（每种颜色只创建一次画笔~）
+        self._box_pens = [QPen(color, 3) for color in self.box_colors]  # 3像素宽的边框
+        self._label_bg_colors = []
+        for color in self.box_colors:
+            bg_color = QColor(color)
+            bg_color.setAlpha(200)  # 半透明
+            self._label_bg_colors.append(bg_color)
+
+        # 标签精灵缓存 (类别名, 置信度, 颜色索引) -> QPixmap，LRU淘汰
+        self.label_cache_size = label_cache_size
+        self._label_cache: "OrderedDict[Tuple, QPixmap]" = OrderedDict()
+        self.label_cache_hits = 0
+        self.label_cache_misses = 0
+
+        # 绘制耗时统计
+        self.paint_count = 0
+        self.paint_time_total = 0.0
+        self.last_paint_time = 0.0
+
+        # 分阶段延迟统计（由应用设置），以及等待绘制的那批检测的捕获时间
+        self.metrics: Optional[PipelineMetrics] = None
+        self._pending_capture_time: Optional[float] = None
+
+        # 脏矩形记录（只重绘变化的区域，全屏合成太贵啦~）
+        self._painted_rects: List[QRect] = []
+        self._painted_signature: Tuple = ()
+        self.last_repaint_area = 0
+        self.total_repaint_area = 0
+        self.repaint_requests = 0
+        self.skipped_repaints = 0
+
+        # 渲染循环：按显示器刷新率在两次跟踪状态之间插值，和检测帧率解耦~
+        if interpolation not in ("interpolate", "extrapolate"):
+            raise ValueError(f"未知的插值模式: {interpolation}")
+        self.interpolation = interpolation
+        self.max_extrapolation = max_extrapolation
+        self.render_fps = self._resolve_render_fps(render_fps)
+        self._prev_state: Dict[int, Tuple[int, int, int, int]] = {}
+        self._prev_time = 0.0
+        self._curr_time = 0.0
+        self._curr_detections: List[DetectionResult] = []
+        self._render_timer = QTimer(self)
+        self._render_timer.setTimerType(Qt.PreciseTimer)
+        self._render_timer.timeout.connect(self._render_tick)
 
-    def update_detections(self, detections: List[DetectionResult]):
+    @staticmethod
+    def _resolve_render_fps(render_fps: Optional[int]) -> int:
+        """None表示跟随显示器刷新率（取不到时按60），其余原样使用"""
+        if render_fps is None:
+            return round(QApplication.primaryScreen().refreshRate()) or 60
+        return render_fps
+
+    def set_render_fps(self, render_fps: Optional[int]):
+        """
+        修改渲染帧率（热更新用），0表示停止渲染循环、退回到检测驱动重绘
+
+        Args:
+            render_fps: 渲染帧率，None跟随显示器刷新率
+        """
+        self.stop_render_loop()
+        self.render_fps = self._resolve_render_fps(render_fps)
+        self.start_render_loop()
+
+    def start_render_loop(self):
+        """启动渲染循环（render_fps为0时不启动，退回到检测驱动重绘）"""
+        if self.render_fps > 0 and not self._render_timer.isActive():
+            self._render_timer.start(max(1, int(1000 / self.render_fps)))
+
+    def stop_render_loop(self):
+        """停止渲染循环"""
+        self._render_timer.stop()
+
+    def update_detections(
+        self,
+        detections: List[DetectionResult],
+        timestamp: Optional[float] = None,
+        capture_time: Optional[float] = None
+    ):
         """
         更新检测结果 (｡♥‿♥｡)
+        渲染循环运行时只记录跟踪状态，由渲染定时器负责插值和重绘~
 
         Args:
             detections: 新的检测结果列表
+            timestamp: 状态时间戳（time.perf_counter），None表示当前时间
+            capture_time: 这批检测对应画面的捕获时间（time.perf_counter），用于统计端到端延迟
+        """
+        self._pending_capture_time = capture_time
+        if not self._render_timer.isActive():
+            self._apply_detections(detections)
+            return
+
+        now = time.perf_counter() if timestamp is None else timestamp
+        self._prev_state = {
+            d.track_id: d.box for d in self._curr_detections if d.track_id >= 0
+        }
+        self._prev_time = self._curr_time
+        self._curr_detections = detections
+        self._curr_time = now
+
+    def _render_tick(self):
+        """渲染定时器回调：计算插值后的检测框并重绘"""
+        self._apply_detections(self._interpolated_detections(time.perf_counter()))
+
+    def _interpolated_detections(self, now: float) -> List[DetectionResult]:
         """
+        根据最近两次跟踪状态计算当前时刻的检测框
+
+        Args:
+            now: 当前时间（time.perf_counter）
+
+        Returns:
+            插值/外推后的检测结果
+        """
+        interval = self._curr_time - self._prev_time
+        if not self._prev_state or interval <= 0:
+            return self._curr_detections
+
+        alpha = (now - self._curr_time) / interval
+        if self.interpolation == "interpolate":
+            # 从上一状态走向当前状态，刚好用一个检测周期走完
+            alpha = min(max(alpha, 0.0), 1.0)
+        else:
+            # 从当前状态沿速度方向外推
+            alpha = min(max(alpha, 0.0), self.max_extrapolation) + 1.0
+
+        results = []
+        for detection in self._curr_detections:
+            prev_box = self._prev_state.get(detection.track_id)
+            if prev_box is None:
+                # 新出现的目标没有速度信息，直接显示
+                results.append(detection)
+                continue
+            box = tuple(
+                int(round(p + (c - p) * alpha))
+                for p, c in zip(prev_box, detection.box)
+            )
+            results.append(DetectionResult(
+                box=box,
+                confidence=detection.confidence,
+                class_id=detection.class_id,
+                class_name=detection.class_name,
+                track_id=detection.track_id
+            ))
+        return results
+
+    def _apply_detections(self, detections: List[DetectionResult]):
+        """
+        应用要显示的检测结果，只重绘变化的区域
+
+        Args:
+            detections: 要显示的检测结果列表
+        """
+        signature = self._signature(detections)
+        if signature == self._painted_signature:
+            # 检测框完全没有移动，跳过重绘~
+            self.detections = detections
+            self.last_repaint_area = 0
+            self.skipped_repaints += 1
+            self._pending_capture_time = None  # 画面上已经是最新的了
+            return
+
+        new_rects = [self._detection_rect(d, i) for i, d in enumerate(detections)]
+
+        # 旧区域需要擦除，新区域需要绘制，合并后一起失效
+        dirty = QRegion()
+        for rect in self._painted_rects + new_rects:
+            dirty = dirty.united(QRegion(rect))
+
         self.detections = detections
-        self.update()  # 触发重绘
+        self._painted_rects = new_rects
+        self._painted_signature = signature
+
+        area = sum(r.width() * r.height() for r in dirty.rects())
+        self.last_repaint_area = area
+        self.total_repaint_area += area
+        self.repaint_requests += 1
+
+        if not dirty.isEmpty():
+            self.update(dirty)  # 只重绘脏区域
+
+    def get_repaint_stats(self) -> Dict:
+        """
+        获取重绘统计
+
+        Returns:
+            包含重绘次数、跳过次数和重绘面积的字典
+        """
+        screen_area = max(1, self.width() * self.height())
+        avg_area = self.total_repaint_area / self.repaint_requests if self.repaint_requests else 0.0
+        return {
+            "repaints": self.repaint_requests,
+            "skipped": self.skipped_repaints,
+            "last_area": self.last_repaint_area,
+            "avg_area": avg_area,
+            "avg_screen_ratio": avg_area / screen_area,
+        }
+
+    def get_paint_stats(self) -> Dict:
+        """
+        获取绘制耗时与标签缓存统计
+
+        Returns:
+            包含平均/最近绘制耗时（毫秒）和缓存命中情况的字典
+        """
+        avg_ms = self.paint_time_total / self.paint_count * 1000 if self.paint_count else 0.0
+        return {
+            "paints": self.paint_count,
+            "avg_paint_ms": avg_ms,
+            "last_paint_ms": self.last_paint_time * 1000,
+            "label_cache_size": len(self._label_cache),
+            "label_cache_hits": self.label_cache_hits,
+            "label_cache_misses": self.label_cache_misses,
+        }
+
+    def _signature(self, detections: List[DetectionResult]) -> Tuple:
+        """检测结果的绘制签名（框和标签都不变就不用重绘~）"""
+        return tuple((d.box, self._format_label(d)) for d in detections)
+
+    @staticmethod
+    def _format_label(detection: DetectionResult) -> str:
+        """生成标签文本"""
+        label_parts = []
+        if detection.class_name:
+            label_parts.append(detection.class_name)
+        if detection.confidence:
+            label_parts.append(f"{detection.confidence:.2f}")
+        return " ".join(label_parts)
+
+    def _label_sprite(self, detection: DetectionResult, color_index: int) -> QPixmap:
+        """
+        获取预渲染的标签精灵（没有就画一张放进缓存~）
+
+        Args:
+            detection: 检测结果
+            color_index: 颜色索引
+
+        Returns:
+            带半透明背景和文字的标签图片
+        """
+        key = (detection.class_name, round(detection.confidence, 2), color_index)
+        sprite = self._label_cache.get(key)
+        if sprite is not None:
+            self._label_cache.move_to_end(key)
+            self.label_cache_hits += 1
+            return sprite
+
+        self.label_cache_misses += 1
+        sprite = self._render_label(self._format_label(detection), color_index)
+        self._label_cache[key] = sprite
+        while len(self._label_cache) > self.label_cache_size:
+            self._label_cache.popitem(last=False)  # 淘汰最久没用的
+        return sprite
+
+    def _render_label(self, label: str, color_index: int) -> QPixmap:
+        """把标签文字渲染成一张透明背景的图片"""
+        text_width = self._label_metrics.horizontalAdvance(label)
+        text_height = self._label_metrics.height()
+        width, height = text_width + 10, text_height + 5
+
+        # 按设备像素比渲染，高分屏上也清晰~
+        ratio = self.devicePixelRatioF()
+        sprite = QPixmap(int(width * ratio), int(height * ratio))
+        sprite.setDevicePixelRatio(ratio)
+        sprite.fill(Qt.transparent)
+
+        painter = QPainter(sprite)
+        painter.setRenderHints(QPainter.Antialiasing)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(self._label_bg_colors[color_index])
+        painter.drawRoundedRect(0, 0, width, height, 5, 5)  # 圆角半径
+        painter.setFont(self.label_font)
+        painter.setPen(self.text_color)
+        painter.drawText(5, height - 5, label)
+        painter.end()
+        return sprite
+
+    def _label_rect(self, x1: int, y1: int, sprite: QPixmap) -> QRect:
+        """计算标签精灵在屏幕上的位置"""
+        ratio = sprite.devicePixelRatio()
+        width = round(sprite.width() / ratio)
+        height = round(sprite.height() / ratio)
+        label_y = max(y1, height)
+        return QRect(x1, label_y - height, width, height)
+
+    def _detection_rect(self, detection: DetectionResult, index: int) -> QRect:
+        """
+        计算单个检测结果占用的屏幕矩形（框 + 标签）
+
+        Args:
+            detection: 检测结果
+            index: 索引（用于选择颜色）
+
+        Returns:
+            包含边框线宽和标签的外接矩形
+        """
+        x1, y1, x2, y2 = detection.box
+        # 3像素边框 + 抗锯齿，向外多留几个像素
+        margin = 3
+        rect = QRect(x1, y1, x2 - x1, y2 - y1).adjusted(-margin, -margin, margin, margin)
+
+        if detection.class_name or detection.confidence:
+            sprite = self._label_sprite(detection, index % len(self.box_colors))
+            rect = rect.united(self._label_rect(x1, y1, sprite).adjusted(-1, -1, 1, 1))
+        return rect
 
     def paintEvent(self, event):
         """
         绘制事件 - 喵为主人绘制检测框~
         """
+        paint_start = time.perf_counter()
+
         painter = QPainter(self)
         painter.setRenderHints(QPainter.Antialiasing)  # 抗锯齿
+        painter.setClipRegion(event.region())  # 只在脏区域内绘制
+        painter.setBrush(Qt.NoBrush)
 
         # 绘制每个检测框
         for i, detection in enumerate(self.detections):
             self._draw_detection(painter, detection, i)
+        painter.end()
+
+        paint_end = time.perf_counter()
+        self.last_paint_time = paint_end - paint_start
+        self.paint_time_total += self.last_paint_time
+        self.paint_count += 1
+
+        if self.metrics:
+            self.metrics.record_span("overlay_paint", paint_start, paint_end)
+            if self._pending_capture_time is not None:
+                self.metrics.record("end_to_end", paint_end - self._pending_capture_time)
+                self._pending_capture_time = None
 
     def _draw_detection(self, painter: QPainter, detection: DetectionResult, index: int):
         """
@@ -87,45 +420,17 @@ class TransparentOverlay(QWidget):
         x1, y1, x2, y2 = detection.box
 
         # 选择颜色（循环使用粉色系）
-        color = self.box_colors[index % len(self.box_colors)]
+        color_index = index % len(self.box_colors)
 
         # 绘制边框（喵用温柔的线条~）
-        pen = QPen(color, 3)  # 3像素宽的边框
-        painter.setPen(pen)
+        painter.setPen(self._box_pens[color_index])
         painter.drawRect(x1, y1, x2 - x1, y2 - y1)
 
-        # 准备标签文本
-        label_parts = []
-        if detection.class_name:
-            label_parts.append(detection.class_name)
-        if detection.confidence:
-            label_parts.append(f"{detection.confidence:.2f}")
-
-        label = " ".join(label_parts)
-
-        if label:
-            # 计算标签背景大小
-            painter.setFont(self.label_font)
-            metrics = painter.fontMetrics()
-            text_width = metrics.horizontalAdvance(label)
-            text_height = metrics.height()
-
-            # 绘制标签背景（半透明的粉色~）
-            bg_color = QColor(color)
-            bg_color.setAlpha(200)  # 半透明
-            painter.setBrush(bg_color)
-            painter.setPen(Qt.NoPen)
-
-            label_y = max(y1, text_height + 5)
-            painter.drawRoundedRect(
-                x1, label_y - text_height - 5,
-                text_width + 10, text_height + 5,
-                5, 5  # 圆角半径
-            )
-
-            # 绘制标签文本
-            painter.setPen(self.text_color)
-            painter.drawText(x1 + 5, label_y - 5, label)
+        # 绘制预渲染的标签（一次贴图就好~）
+        if detection.class_name or detection.confidence:
+            sprite = self._label_sprite(detection, color_index)
+            label_rect = self._label_rect(x1, y1, sprite)
+            painter.drawPixmap(label_rect.topLeft(), sprite)
 
 
 def create_overlay_app():
@@ -0,0 +1,230 @@
+"""
+线程布局模块 - 喵帮各个线程池分好座位，不让它们抢CPU~ 🎀
+PyTorch、OpenCV、NumPy(BLAS) 默认都按全部核心开线程池，
+和捕获、覆盖层、后台线程挤在一起就会出现延迟尖刺。
+这里统一按 ThreadConfig 设置各库的线程数，并可以把帧循环和后台线程绑到不同的CPU上
+
+CPU列表用 taskset 的写法，例如 "0-3,6"
+"""
+import os
+import sys
+import threading
+from typing import Dict, List, Optional
+import cv2
+from .config import ThreadConfig
+from .logger import default_logger
+
+# NumPy 可能链接的各种BLAS实现（OMP_NUM_THREADS 会影响torch的默认线程数，这里不动它）
+BLAS_ENV_VARS = (
+    "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "BLIS_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS", "NUMEXPR_NUM_THREADS",
+)
+
+# 进程允许使用的CPU（cpuset限制的容器、taskset启动时比 os.cpu_count() 少）
+# 导入时就记下来：sched_getaffinity 查的是调用线程，帧循环线程绑过一次之后就只剩 pipeline_cpus 了
+_ALLOWED_CPUS = set(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else set(range(os.cpu_count() or 1))
+
+
+def parse_cpu_list(spec: Optional[str]) -> List[int]:
+    """
+    解析CPU列表
+
+    Args:
+        spec: 例如 "0-3,6"，None或空字符串表示不限制
+
+    Returns:
+        排好序的CPU编号列表
+    """
+    if not spec:
+        return []
+    cpus = set()
+    for part in str(spec).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            cpus.update(range(int(start), int(end) + 1))
+        else:
+            cpus.add(int(part))
+    return sorted(cpus)
+
+
+def format_cpu_list(cpus) -> str:
+    """把CPU编号列表写回 "0-3,6" 的形式"""
+    cpus = sorted(cpus)
+    ranges = []
+    for cpu in cpus:
+        if ranges and cpu == ranges[-1][1] + 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ",".join(str(a) if a == b else f"{a}-{b}" for a, b in ranges)
+
+
+def set_blas_threads(threads: int) -> str:
+    """
+    限制BLAS线程数
+
+    Args:
+        threads: 线程数
+
+    Returns:
+        生效方式: "threadpoolctl"（已加载的库立即生效）或 "env"（只对之后加载的库生效）
+    """
+    for name in BLAS_ENV_VARS:
+        os.environ[name] = str(threads)
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return "env"
+    threadpool_limits(limits=threads, user_api="blas")
+    return "threadpoolctl"
+
+
+def apply_thread_counts(config: ThreadConfig):
+    """
+    设置各库的线程数（None的项保持库的默认值）
+
+    只有配置了torch/OpenCV线程数时才会导入ultralytics和torch（使用推理服务时不必配置它们）
+
+    Args:
+        config: 线程配置
+    """
+    torch_configured = config.torch_threads is not None or config.torch_interop_threads is not None
+    if (torch_configured or config.opencv_threads is not None) and "ultralytics" not in sys.modules:
+        # ultralytics 导入时会把 OpenCV 设成单线程、OMP_NUM_THREADS 设成1，先让它导入完再覆盖
+        try:
+            import ultralytics  # noqa: F401
+        except ImportError:
+            pass
+
+    if config.opencv_threads is not None:
+        cv2.setNumThreads(config.opencv_threads)
+    if config.blas_threads is not None:
+        set_blas_threads(config.blas_threads)
+
+    if not torch_configured:
+        return
+    try:
+        import torch
+    except ImportError:
+        default_logger.warning("没有安装torch，torch线程数设置被忽略")
+        return
+    if config.torch_threads is not None:
+        torch.set_num_threads(config.torch_threads)
+    interop = config.torch_interop_threads
+    if interop is not None and interop != torch.get_num_interop_threads():
+        try:
+            torch.set_num_interop_threads(interop)
+        except RuntimeError as e:
+            # 只能在第一次并行计算之前设置一次
+            default_logger.warning(f"torch inter-op 线程数设置失败（需要重启生效）: {e}")
+
+
+def pin_threads(config: ThreadConfig) -> Dict[str, List[int]]:
+    """
+    绑定CPU：调用线程（帧循环）绑到 pipeline_cpus，其余Python线程绑到 background_cpus
+
+    之后由帧循环线程创建的线程（包括torch的计算线程池）会继承帧循环的绑定，
+    所以要在加载模型之前调用一次，后台服务都启动之后再调用一次
+
+    Args:
+        config: 线程配置
+
+    Returns:
+        {"pipeline": [...], "background": [...]}，实际生效的绑定
+    """
+    pipeline = parse_cpu_list(config.pipeline_cpus)
+    background = parse_cpu_list(config.background_cpus)
+    if not pipeline and not background:
+        return {}
+    if not hasattr(os, "sched_setaffinity"):
+        default_logger.warning("当前平台不支持绑定CPU，pipeline_cpus / background_cpus 被忽略")
+        return {}
+
+    available = _ALLOWED_CPUS
+    missing = sorted(set(pipeline + background) - available)
+    if missing:
+        default_logger.warning(
+            f"进程不能使用CPU {format_cpu_list(missing)}（允许: {format_cpu_list(sorted(available))}），已从绑定里去掉"
+        )
+        pipeline = [cpu for cpu in pipeline if cpu in available]
+        background = [cpu for cpu in background if cpu in available]
+
+    applied = {}
+    if pipeline:
+        try:
+            os.sched_setaffinity(0, pipeline)  # Linux上0表示调用线程
+            applied["pipeline"] = pipeline
+        except OSError as e:
+            default_logger.warning(f"帧循环绑定到CPU {format_cpu_list(pipeline)} 失败: {e}")
+    if background:
+        current = threading.current_thread()
+        for thread in threading.enumerate():
+            if thread is current or not thread.native_id:
+                continue
+            try:
+                os.sched_setaffinity(thread.native_id, background)
+            except OSError:
+                pass  # 线程刚好退出了
+        applied["background"] = background
+    return applied
+
+
+def describe_thread_layout() -> Dict:
+    """
+    当前实际生效的线程布局（日志和基准测试报告用）
+
+    Returns:
+        各库线程数和调用线程的CPU绑定
+    """
+    layout = {
+        "cpu_count": os.cpu_count(),
+        "opencv_threads": cv2.getNumThreads(),
+        "python_threads": threading.active_count(),
+    }
+    if hasattr(os, "sched_getaffinity"):
+        layout["cpus"] = format_cpu_list(os.sched_getaffinity(0))
+    if "torch" in sys.modules:
+        torch = sys.modules["torch"]
+        layout["torch_threads"] = torch.get_num_threads()
+        layout["torch_interop_threads"] = torch.get_num_interop_threads()
+    try:
+        from threadpoolctl import threadpool_info
+        blas = [info["num_threads"] for info in threadpool_info() if info.get("user_api") == "blas"]
+        if blas:
+            layout["blas_threads"] = max(blas)
+    except ImportError:
+        if os.environ.get("OPENBLAS_NUM_THREADS"):
+            layout["blas_threads"] = int(os.environ["OPENBLAS_NUM_THREADS"])
+    return layout
+
+
+def apply_thread_layout(config: ThreadConfig) -> Dict:
+    """
+    启动时应用线程配置并记录日志（要在加载模型之前调用）
+
+    Args:
+        config: 线程配置
+
+    Returns:
+        describe_thread_layout() 的结果
+    """
+    apply_thread_counts(config)
+    pinned = pin_threads(config)
+    layout = describe_thread_layout()
+
+    parts = [f"CPU {layout['cpu_count']} 核"]
+    if "torch_threads" in layout:
+        parts.append(f"torch {layout['torch_threads']} (inter-op {layout['torch_interop_threads']})")
+    elif config.torch_threads is None:
+        parts.append("torch 默认")
+    parts.append(f"OpenCV {layout['opencv_threads']}")
+    parts.append(f"BLAS {layout.get('blas_threads', '默认')}")
+    if "pipeline" in pinned:
+        parts.append(f"帧循环绑定 {format_cpu_list(pinned['pipeline'])}")
+    if "background" in pinned:
+        parts.append(f"后台线程绑定 {format_cpu_list(pinned['background'])}")
+    default_logger.info(f"🧵 线程布局: {', '.join(parts)}")
+    return layout
@@ -0,0 +1,316 @@
+"""
+追踪与剖析模块 - 喵帮主人看清每一帧的时间线~ 🎀
+把各阶段的耗时记录成Chrome trace事件（chrome://tracing / Perfetto 可以直接打开），
+还可以对有限帧数开启cProfile；关闭时几乎没有开销
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import signal
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+from .logger import default_logger
+
+
+class _NullSpan:
+    """关闭追踪时使用的空上下文（全局共享一个实例，不产生任何分配）"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """一次追踪区间（with语句结束时写入环形缓冲区）"""
+
+    __slots__ = ("_tracer", "_name", "_cat", "_args", "_start")
+
+    def __init__(self, tracer: "Tracer", name: str, cat: str, args: Optional[Dict]):
+        self._tracer = tracer
+        self._name = name
+        self._cat = cat
+        self._args = args
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._tracer.add_complete(self._name, self._start, time.perf_counter(), self._cat, self._args)
+        return False
+
+
+class Tracer:
+    """
+    Chrome trace事件记录器 (｡♥‿♥｡)
+    事件存放在固定容量的环形缓冲区里，满了会自动丢弃最旧的~
+    """
+
+    def __init__(self, capacity: int = 200000, enabled: bool = False):
+        """
+        初始化追踪器
+
+        Args:
+            capacity: 环形缓冲区容量（事件数）
+            enabled: 是否立即启用
+        """
+        self.enabled = enabled
+        self._events = deque(maxlen=capacity)
+        self._thread_names: Dict[int, str] = {}
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+
+    def enable(self, capacity: Optional[int] = None):
+        """
+        启用追踪
+
+        Args:
+            capacity: 新的缓冲区容量，None表示保持不变
+        """
+        if capacity and capacity != self._events.maxlen:
+            self._events = deque(self._events, maxlen=capacity)
+        self.enabled = True
+
+    def disable(self):
+        """关闭追踪（已记录的事件保留，仍然可以导出）"""
+        self.enabled = False
+
+    def span(self, name: str, cat: str = "pipeline", args: Optional[Dict] = None):
+        """
+        返回一个追踪区间上下文
+
+        Args:
+            name: 区间名称
+            cat: 分类
+            args: 附加参数（会显示在trace查看器里）
+
+        Returns:
+            with语句使用的上下文，关闭追踪时是共享的空上下文
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, cat, args)
+
+    def add_complete(
+        self,
+        name: str,
+        start: float,
+        end: float,
+        cat: str = "pipeline",
+        args: Optional[Dict] = None
+    ):
+        """
+        直接记录一个已完成的区间
+
+        Args:
+            name: 区间名称
+            start: 开始时间（time.perf_counter）
+            end: 结束时间（time.perf_counter）
+            cat: 分类
+            args: 附加参数
+        """
+        if not self.enabled:
+            return
+        tid = threading.get_ident()
+        if tid not in self._thread_names:
+            self._thread_names[tid] = threading.current_thread().name
+        event = {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": (start - self._origin) * 1e6,
+            "dur": (end - start) * 1e6,
+            "pid": self._pid,
+            "tid": tid,
+        }
+        if args:
+            event["args"] = args
+        self._events.append(event)
+
+    def instant(self, name: str, cat: str = "pipeline", args: Optional[Dict] = None):
+        """
+        记录一个瞬时事件
+
+        Args:
+            name: 事件名称
+            cat: 分类
+            args: 附加参数
+        """
+        if not self.enabled:
+            return
+        tid = threading.get_ident()
+        if tid not in self._thread_names:
+            self._thread_names[tid] = threading.current_thread().name
+        event = {
+            "name": name,
+            "cat": cat,
+            "ph": "i",
+            "s": "t",
+            "ts": (time.perf_counter() - self._origin) * 1e6,
+            "pid": self._pid,
+            "tid": tid,
+        }
+        if args:
+            event["args"] = args
+        self._events.append(event)
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def dump(self, path: Optional[str] = None, output_dir: str = "traces") -> Optional[str]:
+        """
+        把缓冲区里的事件导出为Chrome trace JSON
+
+        Args:
+            path: 输出文件路径，None则在output_dir下按时间生成文件名
+            output_dir: 默认输出目录
+
+        Returns:
+            写入的文件路径，没有事件时返回None
+        """
+        events = list(self._events)
+        if not events:
+            return None
+
+        metadata = [
+            {"name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid, "args": {"name": name}}
+            for tid, name in list(self._thread_names.items())
+        ]
+
+        if path is None:
+            Path(output_dir).mkdir(parents=True, exist_ok=True)
+            path = str(Path(output_dir) / f"trace_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms"}, f)
+
+        default_logger.info(f"追踪数据已导出: {path} ({len(events)} 个事件)")
+        return path
+
+
+class FrameProfiler:
+    """
+    按帧数限定的cProfile剖析器 (｡♥‿♥｡)
+    请求后对接下来的N帧开启cProfile，结束后自动保存并输出热点函数~
+    """
+
+    def __init__(self, output_dir: str = "traces", top_n: int = 20):
+        """
+        初始化剖析器
+
+        Args:
+            output_dir: .prof文件输出目录
+            top_n: 日志里输出的热点函数数量
+        """
+        self.output_dir = output_dir
+        self.top_n = top_n
+        self._profile: Optional[cProfile.Profile] = None
+        self._remaining = 0
+
+    @property
+    def active(self) -> bool:
+        """是否正在剖析"""
+        return self._remaining > 0
+
+    def request(self, frames: int):
+        """
+        请求剖析接下来的若干帧
+
+        Args:
+            frames: 帧数
+        """
+        if frames <= 0 or self.active:
+            return
+        self._remaining = frames
+        self._profile = cProfile.Profile()
+        default_logger.info(f"开始剖析接下来的 {frames} 帧...")
+
+    def frame_begin(self):
+        """一帧开始时调用"""
+        if self._remaining > 0:
+            self._profile.enable()
+
+    def frame_end(self):
+        """一帧结束时调用，帧数用完时保存结果"""
+        if self._remaining <= 0:
+            return
+        self._profile.disable()
+        self._remaining -= 1
+        if self._remaining == 0:
+            self._finish()
+
+    def _finish(self):
+        """保存剖析结果并在日志里输出热点函数"""
+        Path(self.output_dir).mkdir(parents=True, exist_ok=True)
+        path = Path(self.output_dir) / f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.prof"
+        self._profile.dump_stats(str(path))
+
+        buffer = io.StringIO()
+        pstats.Stats(self._profile, stream=buffer).sort_stats("cumulative").print_stats(self.top_n)
+        default_logger.info(f"剖析结果已保存: {path}\n{buffer.getvalue()}")
+        self._profile = None
+
+
+def install_signal_handlers(tracer: "Tracer", profiler: FrameProfiler, profile_frames: int = 100):
+    """
+    安装信号处理器（仅POSIX），运行中不用改代码就能操作~
+        SIGUSR1: 导出当前的追踪数据（追踪未启用时则启用）
+        SIGUSR2: 对接下来的 profile_frames 帧开启cProfile
+
+    Args:
+        tracer: 追踪器
+        profiler: 帧剖析器
+        profile_frames: SIGUSR2触发时剖析的帧数
+    """
+    if not hasattr(signal, "SIGUSR1") or threading.current_thread() is not threading.main_thread():
+        return
+
+    def _on_usr1(signum, frame):
+        if tracer.enabled:
+            tracer.dump()
+        else:
+            tracer.enable()
+            default_logger.info("追踪已启用，再次发送 SIGUSR1 导出")
+
+    def _on_usr2(signum, frame):
+        profiler.request(profile_frames)
+
+    signal.signal(signal.SIGUSR1, _on_usr1)
+    signal.signal(signal.SIGUSR2, _on_usr2)
+
+
+def env_profile_frames() -> int:
+    """
+    读取环境变量 YOLO_PROFILE_FRAMES（启动后剖析的帧数）
+
+    Returns:
+        帧数，没设置或不是非负整数时返回0（并警告）
+    """
+    value = os.environ.get("YOLO_PROFILE_FRAMES", "").strip()
+    if not value:
+        return 0
+    try:
+        frames = int(value)
+    except ValueError:
+        frames = -1
+    if frames < 0:
+        default_logger.warning(f"YOLO_PROFILE_FRAMES={value!r} 不是非负整数，已忽略")
+        return 0
+    return frames
+
+
+# 默认追踪器（设置环境变量 YOLO_TRACE=1 即可启用~）
+default_tracer = Tracer(enabled=os.environ.get("YOLO_TRACE", "") not in ("", "0"))
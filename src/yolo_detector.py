@@ -2,11 +2,12 @@
 YOLO目标检测模块
 负责使用YOLO模型进行目标检测
 """
-import cv2
+import logging
+import time
 import numpy as np
-from ultralytics import YOLO
 from typing import List, Dict, Tuple, Optional
 from dataclasses import dataclass
+from .buffer_pool import default_buffer_pool
 from .logger import default_logger
 
 
@@ -17,6 +18,7 @@ class DetectionResult:
     confidence: float
     class_id: int
     class_name: str
+    track_id: int = -1  # 跟踪ID（由平滑器分配，-1表示未跟踪）
 
 
 class YOLODetector:
@@ -37,7 +39,9 @@ class YOLODetector:
         model_path: str = "yolo26n.pt",
         confidence_threshold: float = 0.5,
         iou_threshold: float = 0.45,
-        classes: Optional[List[str]] = None
+        classes: Optional[List[str]] = None,
+        imgsz: int = 640,
+        postprocess: str = "ultralytics"
     ):
         """
         初始化YOLO检测器
@@ -47,19 +51,33 @@ class YOLODetector:
             confidence_threshold: 置信度阈值
             iou_threshold: IOU阈值，用于非极大值抑制
             classes: 要检测的类别列表，None表示检测所有类别
+            imgsz: 推理输入尺寸（越小越快，小目标越容易漏检）
+            postprocess: 后处理方式，"ultralytics" 或 "numpy"（先筛类别再解码，见 postprocess 模块）
         """
+        from ultralytics import YOLO  # 延迟导入：只用 DetectionResult 的进程不必加载torch
+
         default_logger.info(f"正在加载YOLO模型: {model_path}")
         self.model = YOLO(model_path)
         self.confidence_threshold = confidence_threshold
         self.iou_threshold = iou_threshold
         self.classes = classes
+        self.imgsz = imgsz
+        self.postprocess = postprocess
+        self._predictor_imgsz = None  # ultralytics 的 predictor 是按哪个输入尺寸建好的
+
+        # 最近一次检测的分阶段耗时（秒）
+        self.last_timings: Dict[str, float] = {
+            "preprocess": 0.0, "inference": 0.0, "postprocess": 0.0
+        }
 
         # 记录模型信息
         class_info = "所有类别" if classes is None else f"类别: {classes}"
         default_logger.info(f"YOLO检测器初始化完成")
         default_logger.info(f"  - 置信度阈值: {confidence_threshold}")
         default_logger.info(f"  - IOU阈值: {iou_threshold}")
+        default_logger.info(f"  - 输入尺寸: {imgsz}")
         default_logger.info(f"  - 检测范围: {class_info}")
+        default_logger.info(f"  - 后处理: {postprocess}")
 
     def detect(self, frame: np.ndarray) -> List[DetectionResult]:
         """
@@ -71,37 +89,114 @@ class YOLODetector:
         Returns:
             DetectionResult对象列表
         """
+        detections = self.detect_batch([frame])[0]
+
+        # 记录检测摘要（debug级别，没开debug时连摘要都不统计）
+        if detections and default_logger.isEnabledFor(logging.DEBUG):
+            detection_summary = {}
+            for d in detections:
+                detection_summary[d.class_name] = detection_summary.get(d.class_name, 0) + 1
+            default_logger.debug(f"检测到 {len(detections)} 个物体: {detection_summary}")
+
+        return detections
+
+    def detect_batch(self, frames: List[np.ndarray]) -> List[List[DetectionResult]]:
+        """
+        一次推理多帧（批量推理比逐帧调用更能吃满GPU/多核）
+
+        Args:
+            frames: 输入图像列表 (BGR格式)
+
+        Returns:
+            每帧一个DetectionResult列表；last_timings记录整批的耗时
+        """
+        batch_arrays = self.detect_arrays(frames)
+        convert_start = time.perf_counter()
+        batch_detections = [arrays.to_results(self.model.names) for arrays in batch_arrays]
+        self.last_timings["postprocess"] += time.perf_counter() - convert_start
+        return batch_detections
+
+    def detect_arrays(self, frames: List[np.ndarray]) -> List["DetectionArrays"]:
+        """
+        一次推理多帧，结果保持数组形式（不为每个框建对象）
+
+        Args:
+            frames: 输入图像列表 (BGR格式)
+
+        Returns:
+            每帧一个 DetectionArrays；last_timings记录整批的耗时
+        """
+        # numpy后处理复用 ultralytics 建好的 predictor（预处理、各种导出格式的推理），
+        # 第一次调用和改了输入尺寸之后先走一次 ultralytics 的完整流程把它建好
+        if self.postprocess == "numpy" and self._predictor_imgsz == self.imgsz:
+            return self._detect_arrays_numpy(frames)
+
+        # ultralytics第一次推理时会把torch线程数重置成它自己的默认值，这里还原成调用方设置的
+        torch_threads = None
+        if self.model.predictor is None:
+            import torch
+            torch_threads = torch.get_num_threads()
         results = self.model(
-            frame,
+            frames if len(frames) > 1 else frames[0],
             conf=self.confidence_threshold,
             iou=self.iou_threshold,
             classes=self.classes,
+            imgsz=self.imgsz,
             verbose=False
         )
+        if torch_threads is not None:
+            torch.set_num_threads(torch_threads)
+        self._predictor_imgsz = self.imgsz
+
+        convert_start = time.perf_counter()
+        batch_arrays = [self._convert_result(result) for result in results]
+
+        # ultralytics在speed里按毫秒记录了每张图的平均耗时，结果转换算进后处理
+        speed = results[0].speed if len(results) > 0 else {}
+        count = len(results)
+        self.last_timings = {
+            "preprocess": (speed.get("preprocess") or 0.0) * count / 1000,
+            "inference": (speed.get("inference") or 0.0) * count / 1000,
+            "postprocess": (speed.get("postprocess") or 0.0) * count / 1000 + time.perf_counter() - convert_start,
+        }
 
-        detections = []
-        if len(results) > 0 and results[0].boxes is not None:
-            boxes = results[0].boxes.xyxy.cpu().numpy()
-            confidences = results[0].boxes.conf.cpu().numpy()
-            class_ids = results[0].boxes.cls.cpu().numpy().astype(int)
-
-            for box, conf, cls_id in zip(boxes, confidences, class_ids):
-                class_name = self.model.names.get(cls_id, f"class_{cls_id}")
-                detections.append(DetectionResult(
-                    box=tuple(map(int, box)),
-                    confidence=float(conf),
-                    class_id=int(cls_id),
-                    class_name=class_name
-                ))
-
-            # 记录检测摘要（debug级别，避免刷屏）
-            if detections:
-                detection_summary = {}
-                for d in detections:
-                    detection_summary[d.class_name] = detection_summary.get(d.class_name, 0) + 1
-                default_logger.debug(f"检测到 {len(detections)} 个物体: {detection_summary}")
-
-        return detections
+        return batch_arrays
+
+    def _detect_arrays_numpy(self, frames: List[np.ndarray]) -> List["DetectionArrays"]:
+        """ultralytics 预处理 + 推理，NumpyPostprocessor 后处理"""
+        import torch
+        from .postprocess import NumpyPostprocessor
+
+        predictor = self.model.predictor
+        start = time.perf_counter()
+        image = predictor.preprocess(frames)
+        preprocessed = time.perf_counter()
+        with torch.inference_mode():
+            output = predictor.inference(image)
+        inferred = time.perf_counter()
+        postprocessor = NumpyPostprocessor(self.confidence_threshold, self.iou_threshold, self.classes)
+        batch_arrays = postprocessor(
+            output, tuple(image.shape[2:]), [frame.shape for frame in frames],
+            end2end=bool(getattr(predictor.model, "end2end", False))
+        )
+        self.last_timings = {
+            "preprocess": preprocessed - start,
+            "inference": inferred - preprocessed,
+            "postprocess": time.perf_counter() - inferred,
+        }
+        return batch_arrays
+
+    def _convert_result(self, result) -> "DetectionArrays":
+        """把ultralytics的单张图结果转换成DetectionArrays"""
+        from .postprocess import DetectionArrays
+
+        if result.boxes is None:
+            return DetectionArrays.empty()
+        return DetectionArrays(
+            result.boxes.xyxy.cpu().numpy(),
+            result.boxes.conf.cpu().numpy(),
+            result.boxes.cls.cpu().numpy().astype(np.int64)
+        )
 
     def draw_detections(
         self,
@@ -111,7 +206,7 @@ class YOLODetector:
         show_class_name: bool = True
     ) -> np.ndarray:
         """
-        在图像上绘制检测结果
+        在图像上绘制检测结果（标签小图有缓存，见 AnnotationRenderer）
 
         Args:
             frame: 输入图像
@@ -120,51 +215,16 @@ class YOLODetector:
             show_class_name: 是否显示类别名称
 
         Returns:
-            绘制后的图像
+            绘制后的图像（从缓冲池借的，用完可以 default_buffer_pool.release() 还回去）
         """
-        frame_copy = frame.copy()
-
-        for detection in detections:
-            x1, y1, x2, y2 = detection.box
-            color = self._get_color(detection.class_id)
-
-            # 绘制边界框
-            cv2.rectangle(frame_copy, (x1, y1), (x2, y2), color, 2)
-
-            # 准备标签文本
-            label_parts = []
-            if show_class_name:
-                label_parts.append(detection.class_name)
-            if show_confidence:
-                label_parts.append(f"{detection.confidence:.2f}")
-
-            label = " ".join(label_parts)
-
-            # 绘制标签背景和文本
-            if label:
-                (label_width, label_height), baseline = cv2.getTextSize(
-                    label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1
-                )
-                y1_label = max(y1, label_height + 10)
-
-                cv2.rectangle(
-                    frame_copy,
-                    (x1, y1_label - label_height - baseline - 5),
-                    (x1 + label_width, y1_label),
-                    color,
-                    -1
-                )
-                cv2.putText(
-                    frame_copy,
-                    label,
-                    (x1, y1_label - baseline),
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    0.5,
-                    (255, 255, 255),
-                    1
-                )
-
-        return frame_copy
+        from .annotation import AnnotationRenderer  # 延迟导入，避免循环依赖
+
+        renderer = getattr(self, "_annotation_renderer", None)
+        if renderer is None:
+            renderer = self._annotation_renderer = AnnotationRenderer(colors=self.DEFAULT_COLORS)
+        frame_copy = default_buffer_pool.acquire(frame.shape, frame.dtype)
+        np.copyto(frame_copy, frame)
+        return renderer.draw(frame_copy, detections, show_confidence, show_class_name)
 
     def _get_color(self, class_id: int) -> Tuple[int, int, int]:
         """
@@ -189,5 +249,6 @@ class YOLODetector:
         return {
             "classes": self.model.names,
             "confidence_threshold": self.confidence_threshold,
-            "iou_threshold": self.iou_threshold
+            "iou_threshold": self.iou_threshold,
+            "imgsz": self.imgsz
         }